@@ -0,0 +1,290 @@
+from django.apps import apps
+from scrapy import Request, signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+
+from scraper.signals import items_not_saved, items_saved
+
+
+def request_fingerprint(crawler, request):
+    """Chave de uma requisição no `CrawlState`."""
+    return crawler.request_fingerprinter.fingerprint(request).hex()
+
+
+class CrawlStateMiddleware:
+    """Pula as páginas que não mudaram desde a última coleta.
+
+    Só acompanha os spiders que definem `response_fingerprint(response)`,
+    que calcula a impressão digital do conteúdo relevante da página ou
+    retorna `None` para as páginas que não devem ser acompanhadas. Devem ser
+    acompanhadas apenas páginas cujo callback gera os itens finais (ex.: os
+    meses de licitações); páginas que geram novas requisições são ignoradas,
+    já que o resultado delas depende de outras páginas.
+
+    A impressão digital de cada resposta é comparada com a salva em
+    `CrawlState`; se for a mesma, os itens da página são descartados. Uma
+    impressão nova só é salva depois que o `ItemWriterPipeline` confirma a
+    gravação de todos os itens da página e se o spider terminar normalmente.
+    Requisições com `meta={"crawl_state": False}` nunca são puladas.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.known = {}
+        self.pages = {}  # páginas com itens ainda não gravados
+        self.items = {}  # id do item: (página, item)
+        self.seen = {}
+        self.finished = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        # o estado fica no banco, então o Django precisa estar configurado
+        # (ex.: coletas iniciadas pelo `manage.py crawl`)
+        if not crawler.settings.getbool("CRAWL_STATE_ENABLED") or not apps.ready:
+            raise NotConfigured
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_opened, signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signals.spider_closed)
+        crawler.signals.connect(middleware.items_saved, items_saved)
+        crawler.signals.connect(middleware.items_not_saved, items_not_saved)
+        crawler.signals.connect(middleware.item_not_saved, signals.item_dropped)
+        crawler.signals.connect(middleware.item_not_saved, signals.item_error)
+        # enviado depois de todos os `spider_closed`, inclusive o que salva
+        # os itens pendentes
+        crawler.signals.connect(middleware.engine_stopped, signals.engine_stopped)
+        return middleware
+
+    def spider_opened(self, spider):
+        from web.datasets.models import CrawlState
+
+        self.spider = spider
+        if not hasattr(spider, "response_fingerprint"):
+            return
+        states = CrawlState.objects.filter(spider=spider.name)
+        self.known = dict(states.values_list("request_fingerprint", "fingerprint"))
+
+    def spider_closed(self, spider, reason):
+        self.finished = reason == "finished"
+
+    def engine_stopped(self):
+        if not self.finished or not self.seen:
+            return
+
+        from web.datasets.bulk import bulk_upsert
+        from web.datasets.models import CrawlState
+
+        states = [
+            CrawlState(
+                spider=self.spider.name,
+                request_fingerprint=key,
+                url=url,
+                fingerprint=fingerprint,
+            )
+            for key, (url, fingerprint) in self.seen.items()
+        ]
+        bulk_upsert(
+            CrawlState,
+            states,
+            ("spider", "request_fingerprint"),
+            update_fields=["url", "fingerprint"],
+        )
+
+    def items_saved(self, items, spider):
+        for item in items:
+            entry = self.items.pop(id(item), None)
+            if entry is None:
+                continue
+            page = entry[0]
+            page["pending"] -= 1
+            self.record(page)
+
+    def items_not_saved(self, items, spider):
+        for item in items:
+            self.item_not_saved(item, spider=spider)
+
+    def item_not_saved(self, item, spider, **kwargs):
+        entry = self.items.pop(id(item), None)
+        if entry is not None:
+            self.pages.pop(entry[0]["key"], None)
+
+    def record(self, page):
+        """Marca a página como vista quando todos os itens foram gravados."""
+        if page["pending"] or not page["done"]:
+            return
+        if self.pages.pop(page["key"], None) is None:
+            return  # um dos itens não foi gravado
+        self.seen[page["key"]] = (page["url"], page["fingerprint"])
+        self.crawler.stats.inc_value("crawl_state/changed", spider=self.spider)
+
+    def process_spider_output(self, response, result, spider):
+        request = response.request
+        get_fingerprint = getattr(spider, "response_fingerprint", None)
+        if (
+            get_fingerprint is None
+            or response.status != 200
+            or request.meta.get("crawl_state") is False
+        ):
+            yield from result
+            return
+
+        fingerprint = get_fingerprint(response)
+        if fingerprint is None:
+            yield from result
+            return
+
+        key = request_fingerprint(self.crawler, request)
+        if self.known.get(key) == fingerprint:
+            self.crawler.stats.inc_value("crawl_state/unchanged", spider=spider)
+            return
+
+        page = {
+            "key": key,
+            "url": response.url,
+            "fingerprint": fingerprint,
+            "pending": 0,
+            "done": False,
+        }
+        self.pages[key] = page
+        for output in result:
+            if isinstance(output, Request):
+                self.pages.pop(key, None)
+            elif key in self.pages:
+                self.items[id(output)] = (page, output)
+                page["pending"] += 1
+            yield output
+        # só é marcada como vista se o callback terminou sem erros
+        page["done"] = True
+        self.record(page)
+
+
+class ConditionalRequestMiddleware:
+    """Envia requisições condicionais com os validadores da última coleta.
+
+    Só é usado nos spiders com `conditional_requests = True`. O `ETag` e o
+    `Last-Modified` de cada resposta são guardados em `CrawlState` e enviados
+    na coleta seguinte (`If-None-Match` e `If-Modified-Since`); quando o
+    servidor responde `304`, a requisição é descartada sem chegar ao spider.
+
+    Uma página que não mudou não gera as requisições que geraria, então os
+    validadores só são salvos se a coleta terminar normalmente e sem erros
+    (download, callback ou gravação de itens); senão os da coleta anterior
+    continuam valendo e as páginas alteradas são baixadas de novo. Páginas
+    cujo conteúdo não reflete o das páginas que elas geram (ex.: uma lista de
+    links para meses que mudam) devem usar `meta={"crawl_state": False}`.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.retry_http_codes = set(
+            int(code) for code in crawler.settings.getlist("RETRY_HTTP_CODES")
+        )
+        self.known = {}
+        self.seen = {}
+        self.failed = False
+        self.finished = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CRAWL_STATE_ENABLED") or not apps.ready:
+            raise NotConfigured
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_opened, signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signals.spider_closed)
+        crawler.signals.connect(middleware.engine_stopped, signals.engine_stopped)
+        for signal in (
+            signals.spider_error,
+            signals.item_error,
+            signals.item_dropped,
+            items_not_saved,
+        ):
+            crawler.signals.connect(middleware.fail, signal)
+        return middleware
+
+    def spider_opened(self, spider):
+        from web.datasets.models import CrawlState
+
+        self.spider = spider
+        if not getattr(spider, "conditional_requests", False):
+            return
+        states = CrawlState.objects.filter(spider=spider.name).exclude(
+            etag="", last_modified=""
+        )
+        self.known = {
+            key: (etag, last_modified)
+            for key, etag, last_modified in states.values_list(
+                "request_fingerprint", "etag", "last_modified"
+            )
+        }
+
+    def spider_closed(self, spider, reason):
+        self.finished = reason == "finished"
+
+    def fail(self, **kwargs):
+        self.failed = True
+
+    def engine_stopped(self):
+        if not self.finished or self.failed or not self.seen:
+            return
+
+        from web.datasets.bulk import bulk_upsert
+        from web.datasets.models import CrawlState
+
+        states = [
+            CrawlState(
+                spider=self.spider.name,
+                request_fingerprint=key,
+                url=url,
+                etag=etag,
+                last_modified=last_modified,
+            )
+            for key, (url, etag, last_modified) in self.seen.items()
+        ]
+        bulk_upsert(
+            CrawlState,
+            states,
+            ("spider", "request_fingerprint"),
+            update_fields=["url", "etag", "last_modified"],
+        )
+
+    def is_tracked(self, request, spider):
+        return (
+            getattr(spider, "conditional_requests", False)
+            and request.method in ("GET", "HEAD")
+            and request.meta.get("crawl_state") is not False
+        )
+
+    def process_request(self, request, spider):
+        if not self.is_tracked(request, spider):
+            return None
+
+        etag, last_modified = self.known.get(
+            request_fingerprint(self.crawler, request), ("", "")
+        )
+        if etag:
+            request.headers.setdefault("If-None-Match", etag)
+        if last_modified:
+            request.headers.setdefault("If-Modified-Since", last_modified)
+        return None
+
+    def process_response(self, request, response, spider):
+        if not self.is_tracked(request, spider):
+            return response
+
+        key = request_fingerprint(self.crawler, request)
+        if response.status == 304 and key in self.known:
+            self.crawler.stats.inc_value("crawl_state/not_modified", spider=spider)
+            raise IgnoreRequest(f"Página não modificada: {request.url}")
+
+        if response.status in self.retry_http_codes:
+            self.failed = True  # as tentativas se esgotaram
+        elif response.status == 200:
+            etag = response.headers.get("ETag", b"").decode("latin-1")[:255]
+            last_modified = response.headers.get("Last-Modified", b"")
+            last_modified = last_modified.decode("latin-1")[:255]
+            if etag or last_modified or key in self.known:
+                self.seen[key] = (response.url, etag, last_modified)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if not isinstance(exception, IgnoreRequest):
+            self.failed = True
+        return None
@@ -26,6 +26,19 @@ EXTENSIONS = {
 }
 SENTRY_DSN = os.getenv("SENTRY_DSN", "")
 
+# middlewares
+SPIDER_MIDDLEWARES = {
+    "scraper.middlewares.CrawlStateMiddleware": 100,
+}
+DOWNLOADER_MIDDLEWARES = {
+    # antes do `RetryMiddleware`, para ver só as falhas definitivas
+    "scraper.middlewares.ConditionalRequestMiddleware": 540,
+}
+# pula as páginas que não mudaram desde a última coleta, nos spiders que
+# definem `response_fingerprint` (ver `CrawlStateMiddleware`) ou
+# `conditional_requests` (ver `ConditionalRequestMiddleware`)
+CRAWL_STATE_ENABLED = True
+
 # pipelines
 ITEM_PIPELINES = {
     "spidermon.contrib.scrapy.pipelines.ItemValidationPipeline": 200,
@@ -35,6 +48,8 @@ ITEM_PIPELINES = {
 # http cache
 HTTPCACHE_ENABLED = True
 HTTPCACHE_EXPIRATION_SECS = 86400  # 24 horas
+# um `304` só vale para a requisição condicional que o recebeu
+HTTPCACHE_IGNORE_HTTP_CODES = [304]
 
 # testing
 SPIDERMON_ENABLED = True
@@ -0,0 +1,7 @@
+"""Sinais enviados pelo `ItemWriterPipeline` depois de gravar um lote.
+
+Os dois recebem `items` (os itens do lote) e `spider`.
+"""
+
+items_saved = object()
+items_not_saved = object()
@@ -1,7 +1,9 @@
 import re
 from datetime import date, timedelta
+from hashlib import sha1
 
 import scrapy
+from dateutil.relativedelta import relativedelta
 
 from scraper.items import CityHallBidItem, CityHallContractItem, CityHallPaymentsItem
 from web.datasets.parsers import from_str_to_datetime
@@ -20,6 +22,8 @@ class BidsSpider(BaseSpider):
     name = "cityhall_bids"
     start_urls = ["http://www.feiradesantana.ba.gov.br/seadm/licitacoes.asp"]
     initial_date = date(2001, 1, 1)
+    month_page_pattern = re.compile(r"licitacoes_pm\.asp[\?|&]cat=(\w+)\&dt=(\d+-\d+)")
+    conditional_requests = True
 
     @staticmethod
     def get_modality(modality_text):
@@ -65,6 +69,12 @@ class BidsSpider(BaseSpider):
 
         return month_year >= self.start_date
 
+    def start_requests(self):
+        # os links dos meses não mudam quando um mês muda, então a página
+        # inicial sempre é baixada
+        for url in self.start_urls:
+            yield scrapy.Request(url, dont_filter=True, meta={"crawl_state": False})
+
     def parse(self, response):
         urls = response.xpath("//table/tbody/tr/td[1]/div/a//@href").extract()
         base_url = "http://www.feiradesantana.ba.gov.br"
@@ -81,24 +91,49 @@ class BidsSpider(BaseSpider):
             if self.follow_this_date(url):
                 yield response.follow(url, self.parse_page)
 
-    def parse_page(self, response):
-        raw_modalities = response.xpath("//tr/td[1]/table/tr/td/text()").extract()
-        raw_descriptions = response.xpath(
-            "//table/tr[2]/td/table/tr[6]/td/table/tr/td[2]/table[1]"
-        )
-        raw_bids_history = response.xpath(
-            "//table/tr[2]/td/table/tr[6]/td/table/tr/td[2]/table[2]"
+    @staticmethod
+    def select_bids(response):
+        """Trechos de uma página de mês com os dados das licitações."""
+        return (
+            response.xpath("//tr/td[1]/table/tr/td/text()"),
+            response.xpath("//table/tr[2]/td/table/tr[6]/td/table/tr/td[2]/table[1]"),
+            response.xpath("//table/tr[2]/td/table/tr[6]/td/table/tr/td[2]/table[2]"),
+            response.xpath("//tr/td[3]/table/tr/td/text()"),
         )
-        raw_date = response.xpath("//tr/td[3]/table/tr/td/text()").extract()
+
+    def response_fingerprint(self, response):
+        """Hash dos dados das licitações de uma página de mês.
+
+        Usado pelo `CrawlStateMiddleware`: um mês sem alterações é
+        descartado antes de os itens serem montados e salvos. O resto da
+        página (menus, contadores etc.) não entra no hash. A página inicial,
+        com os links dos meses, é sempre processada.
+        """
+        if not self.month_page_pattern.search(response.url):
+            return None
+        digest = sha1()
+        for selection in self.select_bids(response):
+            for fragment in selection.getall():
+                digest.update(fragment.encode() + b"\0")
+        return digest.hexdigest()
+
+    def parse_page(self, response):
+        (
+            raw_modalities,
+            raw_descriptions,
+            raw_bids_history,
+            raw_date,
+        ) = self.select_bids(response)
+        raw_modalities = raw_modalities.extract()
+        raw_date = raw_date.extract()
         descriptions = self._parse_descriptions(raw_descriptions)
         bids_history = self._parse_bids_history(raw_bids_history)
         modalities = self._parse_modalities(raw_modalities)
         date = self._parse_date(raw_date)
         bid_data = zip(modalities, descriptions, bids_history, date)
 
-        url_pattern = re.compile(r"licitacoes_pm\.asp[\?|&]cat=(\w+)\&dt=(\d+-\d+)")
         for modality_and_code, (description, document_url), history, date in bid_data:
-            match = url_pattern.search(response.url)
+            match = self.month_page_pattern.search(response.url)
             month, year = match.group(2).split("-")
 
             item = CityHallBidItem(
@@ -178,7 +213,71 @@ class BidsSpider(BaseSpider):
         return [date[1:] for date in raw_date]
 
 
-class ContractsSpider(BaseSpider):
+class DateRangeSearchSpider(BaseSpider):
+    """Busca no portal da transparência por intervalos de datas.
+
+    Em vez de um dia por vez, a busca é feita em janelas de `window_months`
+    meses e cada janela é paginada. O portal informa o total de páginas do
+    resultado e serve todas elas, sem limite de páginas ou de itens, então
+    uma janela maior não perde resultados. Dias sem resultados deixam de
+    custar uma requisição cada.
+
+    As subclasses definem `url`, `data` e `parse_page`, que extrai os itens
+    de uma página do resultado.
+    """
+
+    url = None
+    data = {}
+    window_months = 1
+
+    def start_requests(self):
+        start_date = self.start_date
+        self.logger.info(f"Data inicial: {start_date}")
+        # até ontem, como na busca por dia
+        end_date = datetime_utcnow_aware().date() - timedelta(days=1)
+
+        for start, end in self.windows(start_date, end_date):
+            yield self.search(start, end)
+
+    def windows(self, start_date, end_date):
+        """Janelas de meses completos entre `start_date` e `end_date`."""
+        start = start_date
+        while start <= end_date:
+            next_start = date(start.year, start.month, 1) + relativedelta(
+                months=self.window_months
+            )
+            end = min(next_start - timedelta(days=1), end_date)
+            yield start, end
+            start = next_start
+
+    def search(self, start, end, page=None, last_page=None):
+        data = self.data.copy()
+        data["POST_DATA"] = f"{start:%d/%m/%Y} - {end:%d/%m/%Y}"
+        if page is None:
+            return scrapy.FormRequest(
+                self.url,
+                formdata=data,
+                callback=self.parse,
+                meta={"date_range": (start, end)},
+            )
+
+        data["POST_PAGINA"] = str(page)
+        data["POST_PAGINAS"] = str(last_page)
+        return scrapy.FormRequest(self.url, formdata=data, callback=self.parse_page)
+
+    def parse(self, response):
+        # ['��� Anterior', '1', '2', '33', 'Pr��ximo ���']
+        pages = response.css("div.pagination li a ::text").extract()
+        if not pages:
+            return
+
+        start, end = response.meta["date_range"]
+        last_page = int(pages[-2])
+        for page in range(1, last_page + 1):
+            yield self.search(start, end, page, last_page)
+
+
+class ContractsSpider(DateRangeSearchSpider):
     """Coleta contratos da página de contratos.
 
     http://www.transparencia.feiradesantana.ba.gov.br/index.php?view=contratos
@@ -195,34 +294,6 @@ class ContractsSpider(BaseSpider):
     }
     initial_date = date(2010, 1, 1)
 
-    def start_requests(self):
-        start_date = self.start_date
-        self.logger.info(f"Data inicial: {start_date}")
-        today = datetime_utcnow_aware().date()
-
-        while start_date < today:
-            formatted_date = start_date.strftime("%d/%m/%Y")
-            data = self.data.copy()
-            data["POST_DATA"] = f"{formatted_date} - {formatted_date}"
-            yield scrapy.FormRequest(
-                self.url, formdata=data, callback=self.parse, meta={"data": data}
-            )
-            start_date = start_date + timedelta(days=1)
-
-    def parse(self, response):
-        # ['��� Anterior', '1', '2', '33', 'Pr��ximo ���']
-        pages = response.css("div.pagination li a ::text").extract()
-        if pages:
-            last_page = int(pages[-2])
-
-            for page in range(1, last_page + 1):
-                data = response.meta["data"]
-                data["POST_PAGINA"] = str(page)
-                data["POST_PAGINAS"] = str(last_page)
-                yield scrapy.FormRequest(
-                    self.url, formdata=data, callback=self.parse_page
-                )
-
     def parse_page(self, response):
         """Extrai informações sobre um contrato.
 
@@ -284,7 +355,7 @@ class ContractsSpider(BaseSpider):
         return valid_details
 
 
-class PaymentsSpider(BaseSpider):
+class PaymentsSpider(DateRangeSearchSpider):
     """Coleta pagamentos realizados.
 
     http://www.transparencia.feiradesantana.ba.gov.br/index.php?view=despesa
@@ -302,34 +373,6 @@ class PaymentsSpider(BaseSpider):
     }
     initial_date = date(2010, 1, 1)
 
-    def start_requests(self):
-        start_date = self.start_date
-        self.logger.info(f"Data inicial: {start_date}")
-        today = datetime_utcnow_aware().date()
-
-        while start_date < today:
-            formatted_date = start_date.strftime("%d/%m/%Y")
-            data = self.data.copy()
-            data["POST_DATA"] = f"{formatted_date} - {formatted_date}"
-            yield scrapy.FormRequest(
-                self.url, formdata=data, callback=self.parse, meta={"data": data}
-            )
-            start_date = start_date + timedelta(days=1)
-
-    def parse(self, response):
-        # ['��� Anterior', '1', '2', '33', 'Pr��ximo ���']
-        pages = response.css("div.pagination li a ::text").extract()
-        if pages:
-            last_page = int(pages[-2])
-
-            for page in range(1, last_page + 1):
-                data = response.meta["data"]
-                data["POST_PAGINA"] = str(page)
-                data["POST_PAGINAS"] = str(last_page)
-                yield scrapy.FormRequest(
-                    self.url, formdata=data, callback=self.parse_page
-                )
-
     def parse_page(self, response):
         """Extrai informações sobre um pagamento.
 
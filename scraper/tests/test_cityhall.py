@@ -0,0 +1,120 @@
+from datetime import date
+from urllib.parse import parse_qs
+
+import pytest
+from scrapy.http import HtmlResponse
+
+from ..spiders.cityhall import BidsSpider, ContractsSpider, PaymentsSpider
+
+
+def pagination(last_page):
+    if not last_page:
+        return "<div></div>"
+    items = "".join(f"<li><a>{page}</a></li>" for page in range(1, last_page + 1))
+    return (
+        '<div class="pagination"><ul><li><a>Anterior</a></li>'
+        f"{items}<li><a>Próximo</a></li></ul></div>"
+    )
+
+
+def search_response(spider, start, end, last_page):
+    request = spider.search(start, end)
+    return HtmlResponse(
+        request.url,
+        body=pagination(last_page),
+        encoding="utf-8",
+        request=request,
+    )
+
+
+def formdata(request):
+    return {key: value[0] for key, value in parse_qs(request.body.decode()).items()}
+
+
+@pytest.mark.parametrize("spider_class", [ContractsSpider, PaymentsSpider])
+def test_windows_cover_every_day_once(spider_class):
+    spider = spider_class()
+
+    windows = list(spider.windows(date(2019, 12, 15), date(2020, 3, 10)))
+
+    assert windows == [
+        (date(2019, 12, 15), date(2019, 12, 31)),
+        (date(2020, 1, 1), date(2020, 1, 31)),
+        (date(2020, 2, 1), date(2020, 2, 29)),
+        (date(2020, 3, 1), date(2020, 3, 10)),
+    ]
+
+
+def test_search_a_date_range():
+    request = ContractsSpider().search(date(2020, 1, 1), date(2020, 1, 31))
+
+    assert formdata(request)["POST_DATA"] == "01/01/2020 - 31/01/2020"
+    assert request.meta["date_range"] == (date(2020, 1, 1), date(2020, 1, 31))
+
+
+def test_paginate_windows():
+    spider = PaymentsSpider()
+    response = search_response(spider, date(2020, 1, 1), date(2020, 1, 31), 3)
+
+    requests = list(spider.parse(response))
+
+    assert [formdata(request)["POST_PAGINA"] for request in requests] == [
+        "1",
+        "2",
+        "3",
+    ]
+    assert all(request.callback == spider.parse_page for request in requests)
+    assert formdata(requests[0])["POST_DATA"] == "01/01/2020 - 31/01/2020"
+    assert formdata(requests[-1])["POST_PAGINAS"] == "3"
+
+
+def test_ignore_windows_without_results():
+    spider = ContractsSpider()
+    response = search_response(spider, date(2020, 1, 1), date(2020, 1, 31), 0)
+
+    assert list(spider.parse(response)) == []
+
+
+BID_PAGE = """
+<html><body><p>Visitantes: {visitors}</p>
+<table>
+<tr><td><table><tr><td>Pregão Eletrônico 047-2018</td></tr></table></td>
+<td></td><td><table><tr><td> 10/09/2018 09:00</td></tr></table></td></tr>
+<tr><td><table><tr></tr><tr></tr><tr></tr><tr></tr><tr></tr>
+<tr><td><table><tr><td></td><td>
+<table><tr><td>{description}</td></tr></table>
+<table><tr><td></td><td>10/09/2018</td><td><div>Edital</div></td></tr></table>
+</td></tr></table></td></tr>
+</table></td></tr>
+</table></body></html>
+"""
+BID_MONTH_URL = (
+    "http://www.feiradesantana.ba.gov.br/seadm/licitacoes_pm.asp?cat=PMFS&dt=09-2018"
+)
+
+
+def bid_page(url=BID_MONTH_URL, visitors=1, description="Aquisição de pneus"):
+    body = BID_PAGE.format(visitors=visitors, description=description)
+    return HtmlResponse(url, body=body, encoding="utf-8")
+
+
+class TestBidsSpiderFingerprint:
+    def test_ignore_changes_outside_the_bids(self):
+        spider = BidsSpider()
+
+        assert spider.response_fingerprint(
+            bid_page(visitors=1)
+        ) == spider.response_fingerprint(bid_page(visitors=2))
+
+    def test_change_when_bids_change(self):
+        spider = BidsSpider()
+
+        assert spider.response_fingerprint(
+            bid_page(description="Aquisição de pneus")
+        ) != spider.response_fingerprint(bid_page(description="Aquisição de óleo"))
+
+    def test_do_not_track_the_page_with_the_months(self):
+        spider = BidsSpider()
+        response = bid_page(url=BidsSpider.start_urls[0])
+
+        assert spider.response_fingerprint(response) is None
@@ -0,0 +1,314 @@
+from hashlib import sha1
+
+import pytest
+from model_bakery import baker
+from scrapy import Request, Spider
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import HtmlResponse, Response
+from scrapy.utils.test import get_crawler
+
+from web.datasets.models import CrawlState
+
+from ..middlewares import (
+    ConditionalRequestMiddleware,
+    CrawlStateMiddleware,
+    request_fingerprint,
+)
+from ..signals import items_not_saved, items_saved
+
+
+class FakeSpider(Spider):
+    name = "fake"
+
+    def response_fingerprint(self, response):
+        return sha1(response.body).hexdigest()
+
+
+class UntrackedSpider(Spider):
+    name = "untracked"
+
+
+class ConditionalSpider(Spider):
+    name = "conditional"
+    conditional_requests = True
+
+
+def make_response(body, url="https://example.com/lista?mes=1"):
+    request = Request(url)
+    return HtmlResponse(url, body=body, encoding="utf-8", request=request)
+
+
+def process(middleware, spider, response, output=None):
+    """Passa a saída do callback pelo middleware."""
+    if output is None:
+        output = [{"url": response.url}]
+    return list(middleware.process_spider_output(response, iter(output), spider))
+
+
+def crawl(middleware, spider, responses, reason="finished"):
+    """Simula uma coleta em que todos os itens são gravados."""
+    middleware.spider_opened(spider)
+    passed = []
+    for response in responses:
+        items = process(middleware, spider, response)
+        middleware.items_saved(items, spider)
+        passed.extend(items)
+    middleware.spider_closed(spider, reason)
+    middleware.engine_stopped()
+    return passed
+
+
+@pytest.fixture
+def crawler():
+    return get_crawler(FakeSpider, {"CRAWL_STATE_ENABLED": True})
+
+
+@pytest.fixture
+def spider(crawler):
+    return FakeSpider.from_crawler(crawler)
+
+
+@pytest.fixture
+def middleware(crawler):
+    return CrawlStateMiddleware.from_crawler(crawler)
+
+
+def test_disabled():
+    crawler = get_crawler(FakeSpider, {"CRAWL_STATE_ENABLED": False})
+    with pytest.raises(NotConfigured):
+        CrawlStateMiddleware.from_crawler(crawler)
+
+
+@pytest.mark.django_db
+class TestCrawlStateMiddleware:
+    def test_skip_unchanged_pages(self, crawler, spider, middleware):
+        first = make_response("<p>janeiro</p>")
+        assert len(crawl(middleware, spider, [first])) == 1
+        assert CrawlState.objects.get().url == first.url
+
+        middleware = CrawlStateMiddleware.from_crawler(crawler)
+        unchanged = make_response("<p>janeiro</p>")
+        changed = make_response("<p>fevereiro</p>", url="https://example.com/p/2")
+
+        assert crawl(middleware, spider, [unchanged, changed]) == [{"url": changed.url}]
+        assert crawler.stats.get_value("crawl_state/unchanged") == 1
+        assert CrawlState.objects.count() == 2
+
+    def test_process_changed_pages(self, crawler, spider, middleware):
+        crawl(middleware, spider, [make_response("a")])
+
+        middleware = CrawlStateMiddleware.from_crawler(crawler)
+        passed = crawl(middleware, spider, [make_response("b")])
+
+        assert len(passed) == 1
+        assert CrawlState.objects.get().fingerprint == sha1(b"b").hexdigest()
+
+    def test_record_pages_only_after_their_items_are_saved(self, spider, middleware):
+        middleware.spider_opened(spider)
+        response = make_response("a")
+        first, second = process(middleware, spider, response, [{"id": 1}, {"id": 2}])
+
+        middleware.items_saved([first], spider)
+        assert middleware.seen == {}
+
+        middleware.items_saved([second], spider)
+        assert list(middleware.seen.values()) == [
+            (response.url, sha1(b"a").hexdigest())
+        ]
+
+    def test_do_not_record_pages_with_items_not_saved(self, spider, middleware):
+        middleware.spider_opened(spider)
+        first, second = process(
+            middleware, spider, make_response("a"), [{"id": 1}, {"id": 2}]
+        )
+
+        middleware.items_not_saved([first], spider)
+        middleware.items_saved([second], spider)
+        middleware.spider_closed(spider, "finished")
+        middleware.engine_stopped()
+
+        assert CrawlState.objects.count() == 0
+
+    def test_do_not_record_pages_with_dropped_items(self, spider, middleware):
+        middleware.spider_opened(spider)
+        (item,) = process(middleware, spider, make_response("a"))
+
+        middleware.item_not_saved(item, spider=spider, response=None, exception=None)
+
+        assert middleware.seen == {}
+        assert middleware.pages == {}
+
+    def test_ignore_pages_that_make_requests(self, spider, middleware):
+        middleware.spider_opened(spider)
+        output = [{"id": 1}, Request("https://example.com/detalhe")]
+        item, _ = process(middleware, spider, make_response("a"), output)
+
+        middleware.items_saved([item], spider)
+
+        assert middleware.seen == {}
+
+    def test_record_pages_without_items(self, spider, middleware):
+        middleware.spider_opened(spider)
+
+        assert process(middleware, spider, make_response("a"), []) == []
+        assert len(middleware.seen) == 1
+
+    def test_do_not_save_state_of_interrupted_crawls(self, spider, middleware):
+        crawl(middleware, spider, [make_response("a")], reason="shutdown")
+
+        assert CrawlState.objects.count() == 0
+
+    def test_do_not_skip_requests_marked_to_always_run(
+        self, crawler, spider, middleware
+    ):
+        crawl(middleware, spider, [make_response("a")])
+
+        response = make_response("a")
+        response.request.meta["crawl_state"] = False
+        middleware = CrawlStateMiddleware.from_crawler(crawler)
+
+        assert len(crawl(middleware, spider, [response])) == 1
+
+    def test_do_not_track_pages_without_fingerprint(self, spider, middleware):
+        spider.response_fingerprint = lambda response: None
+
+        assert len(crawl(middleware, spider, [make_response("a")])) == 1
+        assert CrawlState.objects.count() == 0
+
+    def test_do_not_track_spiders_without_fingerprint(self):
+        crawler = get_crawler(UntrackedSpider, {"CRAWL_STATE_ENABLED": True})
+        spider = UntrackedSpider.from_crawler(crawler)
+        middleware = CrawlStateMiddleware.from_crawler(crawler)
+
+        crawl(middleware, spider, [make_response("a")])
+        middleware = CrawlStateMiddleware.from_crawler(crawler)
+
+        assert len(crawl(middleware, spider, [make_response("a")])) == 1
+        assert CrawlState.objects.count() == 0
+
+    def test_listen_to_the_item_writer_signals(self, crawler, spider, middleware):
+        middleware.spider_opened(spider)
+        first, second = process(
+            middleware, spider, make_response("a"), [{"id": 1}, {"id": 2}]
+        )
+
+        crawler.signals.send_catch_log(items_saved, items=[first], spider=spider)
+        crawler.signals.send_catch_log(items_not_saved, items=[second], spider=spider)
+
+        assert middleware.seen == {}
+        assert middleware.pages == {}
+        assert middleware.items == {}
+
+
+@pytest.mark.django_db
+class TestConditionalRequestMiddleware:
+    url = "https://example.com/lista?mes=1"
+    validators = {"ETag": '"v1"', "Last-Modified": "Sun, 18 Oct 2026 10:00:00 GMT"}
+
+    @pytest.fixture
+    def crawler(self):
+        return get_crawler(ConditionalSpider, {"CRAWL_STATE_ENABLED": True})
+
+    @pytest.fixture
+    def spider(self, crawler):
+        return ConditionalSpider.from_crawler(crawler)
+
+    def download(self, crawler, spider, status=200, headers=None, **kwargs):
+        """Simula uma coleta de uma página com o middleware."""
+        middleware = ConditionalRequestMiddleware.from_crawler(crawler)
+        middleware.spider_opened(spider)
+        request = Request(self.url, **kwargs)
+        middleware.process_request(request, spider)
+        response = Response(self.url, status=status, headers=headers or {})
+        try:
+            middleware.process_response(request, response, spider)
+        except IgnoreRequest:
+            response = None
+        return middleware, request, response
+
+    def finish(self, middleware, spider, reason="finished"):
+        middleware.spider_closed(spider, reason)
+        middleware.engine_stopped()
+
+    def test_disabled(self):
+        crawler = get_crawler(ConditionalSpider, {"CRAWL_STATE_ENABLED": False})
+        with pytest.raises(NotConfigured):
+            ConditionalRequestMiddleware.from_crawler(crawler)
+
+    def test_send_validators_of_the_last_crawl(self, crawler, spider):
+        middleware, request, _ = self.download(crawler, spider)
+        assert b"If-None-Match" not in request.headers
+        middleware, _, _ = self.download(crawler, spider, headers=self.validators)
+        self.finish(middleware, spider)
+
+        _, request, _ = self.download(crawler, spider)
+
+        assert request.headers["If-None-Match"] == b'"v1"'
+        assert request.headers["If-Modified-Since"] == b"Sun, 18 Oct 2026 10:00:00 GMT"
+        state = CrawlState.objects.get()
+        assert (state.url, state.etag) == (self.url, '"v1"')
+
+    def test_ignore_pages_not_modified(self, crawler, spider):
+        middleware, _, _ = self.download(crawler, spider, headers=self.validators)
+        self.finish(middleware, spider)
+
+        middleware, _, response = self.download(crawler, spider, status=304)
+
+        assert response is None
+        assert crawler.stats.get_value("crawl_state/not_modified") == 1
+
+    def test_do_not_save_validators_of_crawls_with_errors(self, crawler, spider):
+        middleware, _, _ = self.download(crawler, spider, headers=self.validators)
+        crawler.signals.send_catch_log(items_not_saved, items=[{}], spider=spider)
+        self.finish(middleware, spider)
+
+        assert CrawlState.objects.count() == 0
+
+    def test_do_not_save_validators_of_crawls_with_download_errors(
+        self, crawler, spider
+    ):
+        middleware, request, _ = self.download(crawler, spider, headers=self.validators)
+        middleware.process_exception(request, TimeoutError(), spider)
+        self.finish(middleware, spider)
+
+        assert CrawlState.objects.count() == 0
+
+    def test_do_not_save_validators_of_interrupted_crawls(self, crawler, spider):
+        middleware, _, _ = self.download(crawler, spider, headers=self.validators)
+        self.finish(middleware, spider, reason="shutdown")
+
+        assert CrawlState.objects.count() == 0
+
+    def test_do_not_send_validators_for_requests_marked_to_always_run(
+        self, crawler, spider
+    ):
+        middleware, _, _ = self.download(crawler, spider, headers=self.validators)
+        self.finish(middleware, spider)
+
+        _, request, response = self.download(
+            crawler, spider, status=200, meta={"crawl_state": False}
+        )
+
+        assert b"If-None-Match" not in request.headers
+        assert response is not None
+
+    def test_do_not_track_spiders_without_conditional_requests(self):
+        crawler = get_crawler(UntrackedSpider, {"CRAWL_STATE_ENABLED": True})
+        spider = UntrackedSpider.from_crawler(crawler)
+
+        middleware, _, _ = self.download(crawler, spider, headers=self.validators)
+        self.finish(middleware, spider)
+
+        assert CrawlState.objects.count() == 0
+
+    def test_keep_the_content_fingerprint(self, crawler, spider):
+        key = request_fingerprint(crawler, Request(self.url))
+        baker.make(
+            CrawlState, spider=spider.name, request_fingerprint=key, fingerprint="abc"
+        )
+
+        middleware, _, _ = self.download(crawler, spider, headers=self.validators)
+        self.finish(middleware, spider)
+
+        state = CrawlState.objects.get()
+        assert (state.fingerprint, state.etag) == ("abc", '"v1"')
@@ -0,0 +1,93 @@
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from web.datasets.cache import get_generation
+
+
+def response_cache_key(request, view):
+    """Chave da resposta de uma listagem.
+
+    Considera a URL com os parâmetros em ordem, se o usuário está
+    autenticado e a geração atual dos dados, então as respostas guardadas
+    deixam de ser usadas assim que uma coleta ou sincronização grava dados.
+    """
+    params = urlencode(
+        sorted((key, sorted(values)) for key, values in request.query_params.lists()),
+        doseq=True,
+    )
+    url = f"{request.build_absolute_uri(request.path)}?{params}"
+    scope = "autenticado" if request.user.is_authenticated else "anonimo"
+    digest = md5(url.encode()).hexdigest()
+    return f"api:{get_generation()}:{view.__class__.__name__}:{scope}:{digest}"
+
+
+class CachedListMixin:
+    """Guarda em cache as respostas da listagem da view.
+
+    Só é usado com um cache compartilhado entre os processos
+    (`API_CACHE_ENABLED`), para que as invalidações sejam vistas por todos.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.API_CACHE_ENABLED:
+            return super().list(request, *args, **kwargs)
+
+        key = response_cache_key(request, self)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalListMixin:
+    """Responde listagens com `ETag` e `Last-Modified`.
+
+    Os validadores vêm da data da última atualização e da quantidade de
+    itens filtrados, calculados em uma única consulta, e do formato da
+    resposta (`Vary: Accept`). Com um cache compartilhado, o `ETag` também
+    considera a geração dos dados, então gravações em registros relacionados
+    (ex.: os eventos de um diário) o invalidam. Clientes que enviam
+    `If-None-Match` ou `If-Modified-Since` recebem `304` quando nada mudou,
+    sem que os itens sejam buscados e serializados.
+    """
+
+    def get_validators(self, request, queryset):
+        stats = queryset.aggregate(last_modified=Max("updated_at"), total=Count("pk"))
+        last_modified = stats["last_modified"]
+        version = ":".join(
+            (
+                str(last_modified and last_modified.isoformat()),
+                str(stats["total"]),
+                request.accepted_renderer.format,
+                str(get_generation()) if settings.API_CACHE_ENABLED else "",
+            )
+        )
+        etag = quote_etag(md5(version.encode()).hexdigest())
+        return etag, last_modified and int(last_modified.timestamp())
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(
+            request, self.filter_queryset(self.get_queryset())
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+
+        response.headers["ETag"] = etag
+        if last_modified:
+            response.headers["Last-Modified"] = http_date(last_modified)
+        patch_vary_headers(response, ("Accept",))
+        return response
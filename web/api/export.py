@@ -0,0 +1,68 @@
+import csv
+import json
+
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
+
+
+class Echo:
+    """Arquivo falso que devolve o que é escrito, para o `csv.writer`."""
+
+    def write(self, value):
+        return value
+
+
+def export_fields(model):
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if not isinstance(field, SearchVectorField)
+    ]
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(fields, rows):
+    for row in rows:
+        item = dict(zip(fields, row))
+        yield json.dumps(item, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+class ExportMixin:
+    """Exporta todos os itens filtrados da view em CSV ou NDJSON.
+
+    Aceita os mesmos filtros da listagem. As linhas são lidas do banco com
+    um cursor no servidor, em tuplas (sem instanciar os modelos), e enviadas
+    conforme são lidas, então a memória usada não depende do total de itens.
+    """
+
+    export_name = None
+    swagger_schema = None
+
+    def export(self, request, fmt, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        fields = export_fields(queryset.model)
+        rows = queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        lines = csv_lines if fmt == "csv" else ndjson_lines
+
+        response = StreamingHttpResponse(
+            lines(fields, rows), content_type=EXPORT_FORMATS[fmt]
+        )
+        filename = f"{self.export_name or queryset.model._meta.model_name}.{fmt}"
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def get(self, request, *args, **kwargs):
+        return self.export(request, *args, **kwargs)
@@ -1,11 +1,50 @@
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import Exists, F, OuterRef, Subquery
 from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
 
-from web.datasets.models import CityHallBid, Gazette
+from web.datasets.models import (
+    CityCouncilBid,
+    CityCouncilContract,
+    CityCouncilExpense,
+    CityCouncilExpenseSummary,
+    CityCouncilRevenue,
+    CityCouncilRevenueSummary,
+    CityHallBid,
+    File,
+    Gazette,
+)
+
+
+class SearchVectorFilter(filters.CharFilter):
+    """Busca textual no `search_vector` do modelo (ou de uma relação).
+
+    Os vetores são mantidos por triggers no banco e indexados (GIN), então a
+    busca não percorre a tabela como um `icontains`.
+    """
+
+    config = "portuguese"
+
+    def __init__(self, field_name="search_vector", **kwargs):
+        super().__init__(field_name=field_name, **kwargs)
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        if self.distinct:
+            qs = qs.distinct()
+        query = SearchQuery(value, config=self.config)
+        return self.get_method(qs)(**{self.field_name: query})
 
 
 class GazetteFilter(filters.FilterSet):
     start_date = filters.DateFilter(field_name="date", lookup_expr="gte")
     end_date = filters.DateFilter(field_name="date", lookup_expr="lte")
+    # busca textual nos eventos (o vetor cobre título, secretaria e resumo)
+    busca = SearchVectorFilter("events__search_vector", distinct=True)
 
     class Meta:
         model = Gazette
@@ -17,14 +56,143 @@ class GazetteFilter(filters.FilterSet):
             "events__secretariat",
             "events__summary",
             "year_and_edition",
+            "busca",
         ]
 
 
 class CityHallBidFilter(filters.FilterSet):
     start_date = filters.DateFilter(field_name="session_at", lookup_expr="gte")
     end_date = filters.DateFilter(field_name="session_at", lookup_expr="lte")
-    description = filters.CharFilter(field_name="description", lookup_expr="icontains")
+    description = SearchVectorFilter()
 
     class Meta:
         model = CityHallBid
         fields = ["public_agency", "description", "modality", "start_date", "end_date"]
+
+
+class CityCouncilBidFilter(filters.FilterSet):
+    start_date = filters.DateFilter(field_name="session_at", lookup_expr="gte")
+    end_date = filters.DateFilter(field_name="session_at", lookup_expr="lte")
+    description = SearchVectorFilter()
+
+    class Meta:
+        model = CityCouncilBid
+        fields = [
+            "modality",
+            "code",
+            "description",
+            "start_date",
+            "end_date",
+            "excluded",
+        ]
+
+
+class CityCouncilContractFilter(filters.FilterSet):
+    start_date = filters.DateFilter(field_name="start_date", lookup_expr="gte")
+    end_date = filters.DateFilter(field_name="start_date", lookup_expr="lte")
+    # o vetor cobre descrição, detalhes e contratado
+    description = SearchVectorFilter()
+
+    class Meta:
+        model = CityCouncilContract
+        fields = [
+            "company_or_person_document",
+            "description",
+            "start_date",
+            "end_date",
+            "excluded",
+        ]
+
+
+class CityCouncilExpenseFilter(filters.FilterSet):
+    start_date = filters.DateFilter(field_name="date", lookup_expr="gte")
+    end_date = filters.DateFilter(field_name="date", lookup_expr="lte")
+    # o vetor cobre o resumo e o favorecido
+    summary = SearchVectorFilter()
+
+    class Meta:
+        model = CityCouncilExpense
+        fields = ["phase", "document", "summary", "start_date", "end_date", "excluded"]
+
+
+class CityCouncilRevenueFilter(filters.FilterSet):
+    start_date = filters.DateFilter(field_name="published_at", lookup_expr="gte")
+    end_date = filters.DateFilter(field_name="published_at", lookup_expr="lte")
+
+    class Meta:
+        model = CityCouncilRevenue
+        fields = ["revenue_type", "start_date", "end_date", "excluded"]
+
+
+class SummaryFilter(filters.FilterSet):
+    """Filtra os resumos pelos meses que contêm as datas informadas."""
+
+    start_date = filters.DateFilter(method="filter_start_date")
+    end_date = filters.DateFilter(field_name="month", lookup_expr="lte")
+
+    def filter_start_date(self, queryset, name, value):
+        return queryset.filter(month__gte=value.replace(day=1))
+
+
+class CityCouncilExpenseSummaryFilter(SummaryFilter):
+    class Meta:
+        model = CityCouncilExpenseSummary
+        fields = ["phase", "document", "function", "modality", "start_date", "end_date"]
+
+
+class CityCouncilRevenueSummaryFilter(SummaryFilter):
+    class Meta:
+        model = CityCouncilRevenueSummary
+        fields = ["revenue_type", "modality", "start_date", "end_date"]
+
+
+class PostgresFullTextSearchFilter(BaseFilterBackend):
+    """Busca textual no conteúdo dos arquivos (`File.search_vector`).
+
+    Serve para qualquer modelo com a relação genérica `files`. Os itens são
+    ordenados pela relevância (`search_rank`) do arquivo mais relevante e,
+    com `?destaque=true`, recebem um trecho do conteúdo com os termos
+    encontrados (`search_headline`).
+    """
+
+    search_param = api_settings.SEARCH_PARAM
+    headline_param = "destaque"
+    config = "portuguese"
+
+    def get_search_query(self, request):
+        term = request.query_params.get(self.search_param, "").strip()
+        if not term:
+            return None
+        return SearchQuery(term, config=self.config, search_type="websearch")
+
+    def wants_headline(self, request):
+        value = request.query_params.get(self.headline_param, "")
+        return value.lower() in ("1", "true", "sim")
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if query is None:
+            return queryset
+
+        files = (
+            File.objects.filter(
+                content_type=ContentType.objects.get_for_model(queryset.model),
+                object_id=OuterRef("pk"),
+                search_vector=query,
+            )
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank")
+        )
+        queryset = queryset.filter(Exists(files)).annotate(
+            search_rank=Subquery(files.values("rank")[:1])
+        )
+        if self.wants_headline(request):
+            headline = SearchHeadline(
+                "content", query, config=self.config, max_fragments=3
+            )
+            queryset = queryset.annotate(
+                search_headline=Subquery(
+                    files.annotate(headline=headline).values("headline")[:1]
+                )
+            )
+        return queryset.order_by(F("search_rank").desc(), "-pk")
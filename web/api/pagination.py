@@ -0,0 +1,101 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as DecodeError
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class DatasetPagination(PageNumberPagination):
+    """Paginação por número de página ou, opcionalmente, por cursor.
+
+    Com `?paginacao=cursor` as páginas são buscadas a partir da chave do
+    último item da página anterior (ordenação decrescente pelos campos em
+    `keyset_fields` da view, com nulos por último). Não há `OFFSET` nem
+    contagem, então páginas distantes custam o mesmo que a primeira.
+    """
+
+    mode_query_param = "paginacao"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Cursor inválido."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_fields = getattr(view, "keyset_fields", None)
+        self.use_cursor = bool(
+            self.keyset_fields
+            and request.query_params.get(self.mode_query_param) == "cursor"
+        )
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(
+            *(F(field).desc(nulls_last=True) for field in self.keyset_fields)
+        )
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            try:
+                queryset = queryset.filter(self.after(self.decode_cursor(encoded)))
+            except (ValidationError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def after(self, position):
+        """Filtro dos itens que vêm depois de `position` na ordenação.
+
+        Equivale a `(a, b, c) < (x, y, z)` considerando que valores nulos
+        ficam no fim da ordenação.
+        """
+        condition = Q(pk__in=[])  # nenhum item
+        equal = Q()
+        for field, value in zip(self.keyset_fields, position):
+            if value is None:
+                # nada vem depois de um nulo neste campo
+                equal &= Q(**{f"{field}__isnull": True})
+                continue
+            after_value = Q(**{f"{field}__lt": value}) | Q(**{f"{field}__isnull": True})
+            condition |= equal & after_value
+            equal &= Q(**{field: value})
+        return condition
+
+    def encode_cursor(self, item):
+        if isinstance(item, dict):  # linha de `.values()`
+            position = [item[field] for field in self.keyset_fields]
+        else:
+            position = [getattr(item, field) for field in self.keyset_fields]
+        data = json.dumps([None if v is None else str(v) for v in position])
+        return b64encode(data.encode()).decode()
+
+    def decode_cursor(self, encoded):
+        try:
+            position = json.loads(b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError, DecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.keyset_fields):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({"next": self.get_next_link(), "results": data})
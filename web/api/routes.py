@@ -1,12 +1,23 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework import routers
 
 from web.api.views import (
+    CityCouncilAgendaExportView,
     CityCouncilAgendaView,
+    CityCouncilAttendanceListExportView,
     CityCouncilAttendanceListView,
+    CityCouncilBidExportView,
+    CityCouncilContractExportView,
+    CityCouncilExpenseExportView,
+    CityCouncilExpenseSummaryView,
+    CityCouncilMinuteExportView,
     CityCouncilMinuteView,
+    CityCouncilRevenueExportView,
+    CityCouncilRevenueSummaryView,
+    CityHallBidExportView,
     CityHallBidView,
     FrontendEndpoint,
+    GazetteExportView,
     GazetteView,
     HealthCheckView,
 )
@@ -15,8 +26,56 @@ router = routers.DefaultRouter()
 router.register("", HealthCheckView, basename="root")
 router.register("datasets/gazettes", GazetteView, basename="gazettes")
 
+EXPORT_SUFFIX = r"export\.(?P<fmt>csv|ndjson)$"
+
 
 urlpatterns = [
+    # antes das rotas do router para que `export.csv` não seja lido como um id
+    re_path(
+        rf"^datasets/gazettes/{EXPORT_SUFFIX}",
+        GazetteExportView.as_view({"get": "export"}),
+        name="gazettes-export",
+    ),
+    re_path(
+        rf"^datasets/city-council/agenda/{EXPORT_SUFFIX}",
+        CityCouncilAgendaExportView.as_view(),
+        name="city-council-agenda-export",
+    ),
+    re_path(
+        rf"^datasets/city-council/attendance-list/{EXPORT_SUFFIX}",
+        CityCouncilAttendanceListExportView.as_view(),
+        name="city-council-attendance-list-export",
+    ),
+    re_path(
+        rf"^datasets/city-council/minute/{EXPORT_SUFFIX}",
+        CityCouncilMinuteExportView.as_view(),
+        name="city-council-minute-export",
+    ),
+    re_path(
+        rf"^datasets/city-council/bids/{EXPORT_SUFFIX}",
+        CityCouncilBidExportView.as_view(),
+        name="city-council-bids-export",
+    ),
+    re_path(
+        rf"^datasets/city-council/contracts/{EXPORT_SUFFIX}",
+        CityCouncilContractExportView.as_view(),
+        name="city-council-contracts-export",
+    ),
+    re_path(
+        rf"^datasets/city-council/expenses/{EXPORT_SUFFIX}",
+        CityCouncilExpenseExportView.as_view(),
+        name="city-council-expenses-export",
+    ),
+    re_path(
+        rf"^datasets/city-council/revenues/{EXPORT_SUFFIX}",
+        CityCouncilRevenueExportView.as_view(),
+        name="city-council-revenues-export",
+    ),
+    re_path(
+        rf"^datasets/city-hall/bids/{EXPORT_SUFFIX}",
+        CityHallBidExportView.as_view(),
+        name="city-hall-bids-export",
+    ),
     path("", include(router.urls)),
     path(
         "datasets/city-council/agenda/",
@@ -33,6 +92,16 @@ urlpatterns = [
         CityCouncilMinuteView.as_view(),
         name="city-council-minute",
     ),
+    path(
+        "datasets/city-council/expenses/summary/",
+        CityCouncilExpenseSummaryView.as_view(),
+        name="city-council-expenses-summary",
+    ),
+    path(
+        "datasets/city-council/revenues/summary/",
+        CityCouncilRevenueSummaryView.as_view(),
+        name="city-council-revenues-summary",
+    ),
     path("datasets/city-hall/bids/", CityHallBidView.as_view(), name="city-hall-bids"),
     path("datasets/endpoints", FrontendEndpoint.as_view(), name="frontend-endpoints"),
 ]
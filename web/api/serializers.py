@@ -1,4 +1,10 @@
-from rest_framework import serializers
+from datetime import date
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
 from web.datasets.models import (
     CityCouncilAgenda,
@@ -11,17 +17,108 @@ from web.datasets.models import (
     GazetteEvent,
 )
 
+# campos cuja representação é o próprio valor vindo do banco
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+DATETIME = object()  # convertido com o fuso ativo, buscado uma vez por lista
+
+
+def converter(field):
+    """Função que gera a representação de um valor não nulo do campo."""
+    if isinstance(field, IDENTITY_FIELDS):
+        return None
+    if isinstance(field, serializers.DateTimeField):
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        iso = output_format and output_format.lower() == ISO_8601
+        if iso and settings.USE_TZ and not hasattr(field, "timezone"):
+            return DATETIME
+    elif isinstance(field, serializers.DateField):
+        output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+        if output_format and output_format.lower() == ISO_8601:
+            return date.isoformat
+    return field.to_representation
+
+
+def datetime_converter(tz):
+    def convert(value):
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+class FastListSerializer(serializers.ListSerializer):
+    """Serialização somente leitura de listas sem a maquinaria do DRF por item.
+
+    Os itens podem ser linhas de `.values(*columns)` ou instâncias (é lido o
+    `__dict__`). A tabela `(nome, coluna, conversor)` é montada uma vez a
+    partir dos campos do serializer filho, de modo que o resultado é o mesmo
+    do `to_representation` padrão. Para ser usada, o serializer filho deve
+    declarar `list_serializer_class = FastListSerializer` no `Meta`.
+    """
+
+    tables = {}  # tabela de campos de cada serializer filho
+
+    @staticmethod
+    def compile(child):
+        table = []
+        for name, field in child.fields.items():
+            if field.write_only:
+                continue
+            model_field = child.Meta.model._meta.get_field(field.source)
+            table.append((name, model_field.attname, converter(field)))
+        return table
+
+    @property
+    def table(self):
+        child = type(self.child)
+        if child not in self.tables:
+            self.tables[child] = self.compile(self.child)
+        return self.tables[child]
+
+    @property
+    def columns(self):
+        return [column for _, column, _ in self.table]
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+
+        to_datetime = datetime_converter(timezone.get_current_timezone())
+        table = [
+            (name, column, to_datetime if convert is DATETIME else convert)
+            for name, column, convert in self.table
+        ]
+        result = []
+        for item in data:
+            row = item if isinstance(item, dict) else item.__dict__
+            obj = {}
+            for name, column, convert in table:
+                value = row[column]
+                obj[name] = (
+                    value if convert is None or value is None else convert(value)
+                )
+            result.append(obj)
+        return result
+
 
 class CityCouncilAgendaSerializer(serializers.ModelSerializer):
     class Meta:
         model = CityCouncilAgenda
         fields = "__all__"
+        list_serializer_class = FastListSerializer
 
 
 class CityCouncilAttendanceListSerializer(serializers.ModelSerializer):
     class Meta:
         model = CityCouncilAttendanceList
         fields = "__all__"
+        list_serializer_class = FastListSerializer
 
 
 class FileSerializer(serializers.ModelSerializer):
@@ -30,13 +127,26 @@ class FileSerializer(serializers.ModelSerializer):
         fields = ["url"]
 
 
+class SearchResultSerializerMixin:
+    """Inclui a relevância e o trecho da busca textual quando presentes."""
+
+    search_fields = ("search_rank", "search_headline")
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for field in self.search_fields:
+            if hasattr(instance, field):
+                data[field] = getattr(instance, field)
+        return data
+
+
 class GazetteEventSerializer(serializers.ModelSerializer):
     class Meta:
         model = GazetteEvent
         fields = ["title", "secretariat", "summary", "published_on"]
 
 
-class GazetteSerializer(serializers.ModelSerializer):
+class GazetteSerializer(SearchResultSerializerMixin, serializers.ModelSerializer):
     events = GazetteEventSerializer(many=True)
     files = FileSerializer(many=True, required=False)
 
@@ -64,12 +174,13 @@ class CityHallBidEventSerializer(serializers.ModelSerializer):
     class Meta:
         model = CityHallBidEvent
         fields = "__all__"
+        list_serializer_class = FastListSerializer
 
 
-class CityHallBidSerializer(serializers.ModelSerializer):
+class CityHallBidSerializer(SearchResultSerializerMixin, serializers.ModelSerializer):
     events = CityHallBidEventSerializer(many=True, read_only=True)
     files = FileSerializer(many=True, read_only=True)
 
     class Meta:
         model = CityHallBid
-        fields = "__all__"
+        exclude = ["search_vector"]
@@ -2,10 +2,18 @@ from datetime import date
 
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from model_bakery import baker
 from rest_framework.test import APIClient
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -50,3 +58,17 @@ def last_of_three_gazettes():
     return baker.make_recipe(
         "datasets.Gazette", date=date(2021, 4, 21), power="executivo"
     )
+
+
+@pytest.fixture
+def count_queries(api_client_authenticated):
+    """Conta as consultas feitas para responder uma requisição."""
+
+    def count(url, **params):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = api_client_authenticated.get(url, data=params)
+        assert response.status_code == 200
+        return len(context)
+
+    return count
@@ -0,0 +1,165 @@
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+from django.utils.http import http_date
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from web.datasets.cache import bump_generation
+
+pytestmark = pytest.mark.django_db
+
+
+class TestCachedListMixin:
+    url = reverse("gazettes-list")
+
+    def test_serve_repeated_requests_from_cache(
+        self, api_client_authenticated, django_assert_num_queries
+    ):
+        baker.make_recipe("datasets.Gazette", power="executivo")
+        first = api_client_authenticated.get(self.url, data={"power": "executivo"})
+
+        with django_assert_num_queries(1):  # apenas os validadores
+            second = api_client_authenticated.get(self.url, data={"power": "executivo"})
+
+        assert second.status_code == HTTPStatus.OK
+        assert second.json() == first.json()
+
+    def test_params_order_does_not_matter(
+        self, api_client_authenticated, django_assert_num_queries
+    ):
+        api_client_authenticated.get(f"{self.url}?power=executivo&page=1")
+
+        with django_assert_num_queries(1):  # apenas os validadores
+            api_client_authenticated.get(f"{self.url}?page=1&power=executivo")
+
+    def test_different_params_are_cached_separately(self, api_client_authenticated):
+        baker.make_recipe("datasets.Gazette", power="executivo")
+        baker.make_recipe("datasets.Gazette", power="legislativo")
+
+        executivo = api_client_authenticated.get(self.url, data={"power": "executivo"})
+        everything = api_client_authenticated.get(self.url)
+
+        assert len(executivo.json()["results"]) == 1
+        assert len(everything.json()["results"]) == 2
+
+    def test_new_generation_invalidates_cache(self, api_client_authenticated):
+        api_client_authenticated.get(self.url)
+        baker.make_recipe("datasets.Gazette")
+
+        cached = api_client_authenticated.get(self.url)
+        bump_generation()
+        fresh = api_client_authenticated.get(self.url)
+
+        assert len(cached.json()["results"]) == 0
+        assert len(fresh.json()["results"]) == 1
+
+    def test_skip_cache_without_a_shared_backend(
+        self, api_client_authenticated, settings
+    ):
+        settings.API_CACHE_ENABLED = False
+        api_client_authenticated.get(self.url)
+        baker.make_recipe("datasets.Gazette")
+
+        response = api_client_authenticated.get(self.url)
+
+        assert len(response.json()["results"]) == 1
+
+    def test_do_not_serve_cache_to_anonymous_users(self, api_client_authenticated):
+        api_client_authenticated.get(self.url)
+
+        response = APIClient().get(self.url)
+
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+class TestConditionalListMixin:
+    url = reverse("city-council-minute")
+
+    def test_send_validators(self, api_client_authenticated):
+        minute = baker.make_recipe("datasets.CityCouncilMinute")
+
+        response = api_client_authenticated.get(self.url)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["ETag"]
+        assert response.headers["Last-Modified"] == http_date(
+            int(minute.updated_at.timestamp())
+        )
+        assert "Accept" in response.headers["Vary"]
+
+    def test_not_modified_with_same_etag(
+        self, api_client_authenticated, django_assert_num_queries
+    ):
+        baker.make_recipe("datasets.CityCouncilMinute")
+        etag = api_client_authenticated.get(self.url).headers["ETag"]
+
+        with django_assert_num_queries(1):
+            response = api_client_authenticated.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+        assert not response.content
+
+    def test_not_modified_since_last_update(self, api_client_authenticated):
+        baker.make_recipe("datasets.CityCouncilMinute")
+        last_modified = api_client_authenticated.get(self.url).headers["Last-Modified"]
+
+        response = api_client_authenticated.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_etag_changes_with_updates(self, api_client_authenticated):
+        minute = baker.make_recipe("datasets.CityCouncilMinute")
+        etag = api_client_authenticated.get(self.url).headers["ETag"]
+
+        minute.title = "Ata da sessão extraordinária"
+        minute.save()
+        response = api_client_authenticated.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["ETag"] != etag
+
+    def test_etag_changes_with_a_new_generation(self, api_client_authenticated):
+        minute = baker.make_recipe("datasets.CityCouncilMinute")
+        etag = api_client_authenticated.get(self.url).headers["ETag"]
+
+        # ex.: um arquivo novo da ata, sem alterar a própria ata
+        baker.make_recipe("datasets.File", content_object=minute)
+        bump_generation()
+        response = api_client_authenticated.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["ETag"] != etag
+
+    def test_etag_depends_on_filters(self, api_client_authenticated):
+        baker.make_recipe("datasets.CityCouncilMinute", title="test")
+        baker.make_recipe("datasets.CityCouncilMinute")
+
+        everything = api_client_authenticated.get(self.url)
+        filtered = api_client_authenticated.get(self.url, data={"query": "test"})
+
+        assert everything.headers["ETag"] != filtered.headers["ETag"]
+
+    def test_etag_depends_on_format(self, api_client_authenticated):
+        baker.make_recipe("datasets.CityCouncilMinute")
+
+        json = api_client_authenticated.get(self.url)
+        browsable = api_client_authenticated.get(self.url, HTTP_ACCEPT="text/html")
+
+        assert json.headers["ETag"] != browsable.headers["ETag"]
+
+    def test_without_a_shared_cache(
+        self, api_client_authenticated, settings, django_assert_num_queries
+    ):
+        settings.API_CACHE_ENABLED = False
+        baker.make_recipe("datasets.CityCouncilMinute")
+        etag = api_client_authenticated.get(self.url).headers["ETag"]
+
+        with django_assert_num_queries(1):
+            response = api_client_authenticated.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
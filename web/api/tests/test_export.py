@@ -0,0 +1,75 @@
+import csv
+import json
+from datetime import date
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+pytestmark = pytest.mark.django_db
+
+
+def content(response):
+    return b"".join(response.streaming_content).decode()
+
+
+class TestExportViews:
+    def test_export_csv(self, api_client_authenticated):
+        expense = baker.make(
+            "datasets.CityCouncilExpense", phase="empenho", value="10.50"
+        )
+        url = reverse("city-council-expenses-export", kwargs={"fmt": "csv"})
+
+        response = api_client_authenticated.get(url)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response["Content-Type"] == "text/csv; charset=utf-8"
+        assert 'filename="expenses.csv"' in response["Content-Disposition"]
+        rows = list(csv.DictReader(content(response).splitlines()))
+        assert len(rows) == 1
+        assert rows[0]["id"] == str(expense.pk)
+        assert rows[0]["value"] == "10.50"
+        assert "search_vector" not in rows[0]
+
+    def test_export_ndjson(self, api_client_authenticated):
+        gazettes = baker.make_recipe("datasets.Gazette", _quantity=2)
+        url = reverse("gazettes-export", kwargs={"fmt": "ndjson"})
+
+        response = api_client_authenticated.get(url)
+
+        assert response.status_code == HTTPStatus.OK
+        lines = content(response).splitlines()
+        items = [json.loads(line) for line in lines]
+        assert {item["id"] for item in items} == {gazette.pk for gazette in gazettes}
+
+    def test_apply_list_filters(self, api_client_authenticated):
+        baker.make_recipe(
+            "datasets.CityCouncilAgenda", details="test", date=date(2020, 3, 18)
+        )
+        baker.make_recipe("datasets.CityCouncilAgenda", date=date(2020, 5, 20))
+        url = reverse("city-council-agenda-export", kwargs={"fmt": "ndjson"})
+
+        response = api_client_authenticated.get(url, data={"query": "test"})
+
+        items = [json.loads(line) for line in content(response).splitlines()]
+        assert [item["details"] for item in items] == ["test"]
+
+    def test_export_related_ids_without_loading_models(
+        self, api_client_authenticated, django_assert_num_queries
+    ):
+        baker.make_recipe("datasets.CityHallBid", _quantity=3)
+        url = reverse("city-hall-bids-export", kwargs={"fmt": "csv"})
+
+        with django_assert_num_queries(1):
+            response = api_client_authenticated.get(url)
+            rows = content(response).splitlines()
+
+        assert len(rows) == 4
+
+    def test_unknown_format(self, api_client_authenticated):
+        response = api_client_authenticated.get(
+            "/api/datasets/city-council/expenses/export.xml"
+        )
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,129 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.postgres.search import SearchVector
+from django.urls import reverse
+from model_bakery import baker
+
+from web.datasets.models import File
+
+pytestmark = pytest.mark.django_db
+
+
+def make_file(content_object, content):
+    baker.make_recipe("datasets.File", content_object=content_object, content=content)
+    File.objects.update(search_vector=SearchVector("content", config="portuguese"))
+
+
+class TestPostgresFullTextSearchFilter:
+    gazettes_url = reverse("gazettes-list")
+    bids_url = reverse("city-hall-bids")
+
+    def test_filter_gazettes_by_file_content(self, api_client_authenticated):
+        gazette = baker.make_recipe("datasets.Gazette")
+        make_file(gazette, "Decreto sobre a pavimentação das ruas do bairro.")
+        other = baker.make_recipe("datasets.Gazette")
+        make_file(other, "Nomeação de servidores da secretaria de saúde.")
+
+        response = api_client_authenticated.get(
+            self.gazettes_url, data={"query": "pavimentações"}
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()["results"]
+        assert [item["year_and_edition"] for item in results] == [
+            gazette.year_and_edition
+        ]
+        assert results[0]["search_rank"] > 0
+        assert "search_headline" not in results[0]
+
+    def test_order_by_rank(self, api_client_authenticated):
+        less_relevant = baker.make_recipe("datasets.CityHallBid")
+        make_file(less_relevant, "Aquisição de merenda e outros materiais.")
+        more_relevant = baker.make_recipe("datasets.CityHallBid")
+        make_file(more_relevant, "Merenda escolar. Merenda para creches.")
+
+        response = api_client_authenticated.get(
+            self.bids_url, data={"query": "merenda"}
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        ids = [item["id"] for item in response.json()["results"]]
+        assert ids == [more_relevant.pk, less_relevant.pk]
+
+    def test_headline(self, api_client_authenticated):
+        bid = baker.make_recipe("datasets.CityHallBid")
+        make_file(bid, "Contratação de empresa para reforma de escolas.")
+
+        response = api_client_authenticated.get(
+            self.bids_url, data={"query": "reforma", "destaque": "true"}
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        result = response.json()["results"][0]
+        assert "<b>reforma</b>" in result["search_headline"]
+
+    def test_without_query(self, api_client_authenticated):
+        baker.make_recipe("datasets.CityHallBid", _quantity=2)
+
+        response = api_client_authenticated.get(self.bids_url, data={"query": ""})
+
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()["results"]
+        assert len(results) == 2
+        assert "search_rank" not in results[0]
+
+
+class TestSearchVectorFilter:
+    def test_filter_bids_by_description(self, api_client_authenticated):
+        bid = baker.make_recipe(
+            "datasets.CityHallBid", description="Pavimentação de ruas do bairro"
+        )
+        baker.make_recipe("datasets.CityHallBid", description="Merenda escolar")
+
+        response = api_client_authenticated.get(
+            reverse("city-hall-bids"), data={"description": "pavimentações"}
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert [item["id"] for item in response.json()["results"]] == [bid.pk]
+
+    def test_filter_gazettes_by_events(self, api_client_authenticated):
+        gazette = baker.make_recipe("datasets.Gazette")
+        for title in ("Decreto de nomeação", "Decreto de exoneração"):
+            baker.make_recipe("datasets.GazetteEvent", gazette=gazette, title=title)
+        other = baker.make_recipe("datasets.Gazette")
+        baker.make_recipe("datasets.GazetteEvent", gazette=other, title="Portaria")
+
+        response = api_client_authenticated.get(
+            reverse("gazettes-list"), data={"busca": "decretos"}
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()["results"]
+        assert [item["year_and_edition"] for item in results] == [
+            gazette.year_and_edition
+        ]
+
+    def test_keep_exact_event_filters(self, api_client_authenticated):
+        gazette = baker.make_recipe("datasets.Gazette")
+        baker.make_recipe(
+            "datasets.GazetteEvent",
+            gazette=gazette,
+            title="Decreto",
+            secretariat="Secretaria de Saúde",
+            summary="Nomeia servidores",
+        )
+        url = reverse("gazettes-list")
+
+        def editions(**params):
+            response = api_client_authenticated.get(url, data=params)
+            return [item["year_and_edition"] for item in response.json()["results"]]
+
+        assert editions(events__title="Decreto") == [gazette.year_and_edition]
+        assert editions(events__title="servidores") == []
+        assert editions(events__title="Secretaria de Saúde") == []
+        assert editions(events__secretariat="Saúde") == []
+        assert editions(events__summary="Nomeia servidores") == [
+            gazette.year_and_edition
+        ]
@@ -0,0 +1,92 @@
+from datetime import date, datetime
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import make_aware
+from model_bakery import baker
+
+from web.api.pagination import DatasetPagination
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def page_size(mocker):
+    mocker.patch.object(DatasetPagination, "page_size", 2)
+
+
+def walk(client, url, key="id"):
+    ids, pages = [], 0
+    response = client.get(url, data={"paginacao": "cursor"})
+    while True:
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert "count" not in data
+        ids.extend(item[key] for item in data["results"])
+        pages += 1
+        if not data["next"]:
+            return ids, pages
+        response = client.get(data["next"])
+
+
+class TestCursorPagination:
+    def test_walk_gazettes_with_cursor(self, api_client_authenticated, page_size):
+        for edition, gazette_date in enumerate(
+            [date(2021, 4, 21), date(2021, 3, 5), date(2021, 3, 5), None, None]
+        ):
+            baker.make_recipe(
+                "datasets.Gazette", date=gazette_date, year_and_edition=str(edition)
+            )
+
+        editions, pages = walk(
+            api_client_authenticated, reverse("gazettes-list"), "year_and_edition"
+        )
+
+        assert editions == ["0", "2", "1", "4", "3"]
+        assert pages == 3
+
+    def test_walk_city_hall_bids_with_cursor(self, api_client_authenticated, page_size):
+        bids = [
+            baker.make_recipe(
+                "datasets.CityHallBid",
+                session_at=make_aware(datetime(2020, 3, day, 9, 30, 15, 123)),
+            )
+            for day in (1, 2, 3)
+        ]
+
+        ids, _ = walk(api_client_authenticated, reverse("city-hall-bids"))
+
+        assert ids == [bid.pk for bid in reversed(bids)]
+
+    def test_do_not_count_items(self, api_client_authenticated, page_size):
+        baker.make_recipe("datasets.CityCouncilMinute", _quantity=3)
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client_authenticated.get(
+                reverse("city-council-minute"), data={"paginacao": "cursor"}
+            )
+
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()["results"]) == 2
+        # a única contagem é a dos validadores do ETag, feita junto do MAX
+        counts = [query["sql"] for query in context if "COUNT(" in query["sql"]]
+        assert len(counts) == 1
+        assert "MAX(" in counts[0]
+
+    def test_keep_page_number_pagination_by_default(self, api_client_authenticated):
+        baker.make_recipe("datasets.CityCouncilAgenda", _quantity=3)
+
+        response = api_client_authenticated.get(reverse("city-council-agenda"))
+
+        assert response.json()["count"] == 3
+
+    @pytest.mark.parametrize("cursor", ["invalido", "WyJhYmMiLCAiMSJd"])
+    def test_invalid_cursor(self, api_client_authenticated, cursor):
+        response = api_client_authenticated.get(
+            reverse("gazettes-list"), data={"paginacao": "cursor", "cursor": cursor}
+        )
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
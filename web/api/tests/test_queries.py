@@ -0,0 +1,62 @@
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+
+pytestmark = pytest.mark.django_db
+
+
+def make_files(content_object):
+    # com `s3_url` e `content` o backup e a extração não são disparados
+    baker.make_recipe(
+        "datasets.File",
+        content_object=content_object,
+        s3_url="https://dadosabertosdefeira.com/arquivo.pdf",
+        content="conteúdo",
+        _quantity=2,
+    )
+
+
+def make_gazette():
+    gazette = baker.make_recipe("datasets.Gazette")
+    baker.make_recipe("datasets.GazetteEvent", gazette=gazette, _quantity=2)
+    make_files(gazette)
+
+
+def make_city_hall_bid():
+    bid = baker.make_recipe("datasets.CityHallBid")
+    baker.make("datasets.CityHallBidEvent", bid=bid, _quantity=2)
+    make_files(bid)
+
+
+def make_minute():
+    minute = baker.make_recipe("datasets.CityCouncilMinute")
+    make_files(minute)
+
+
+ENDPOINTS = [
+    ("gazettes-list", make_gazette),
+    ("city-hall-bids", make_city_hall_bid),
+    ("city-council-minute", make_minute),
+    ("city-council-agenda", lambda: baker.make_recipe("datasets.CityCouncilAgenda")),
+    (
+        "city-council-attendance-list",
+        lambda: baker.make_recipe("datasets.CityCouncilAttendanceList"),
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "url_name,make_item", ENDPOINTS, ids=[name for name, _ in ENDPOINTS]
+)
+@pytest.mark.parametrize(
+    "params", [{}, {"paginacao": "cursor"}], ids=["page", "cursor"]
+)
+def test_queries_do_not_grow_with_items(url_name, make_item, params, count_queries):
+    url = reverse(url_name)
+    make_item()
+    with_one_item = count_queries(url, **params)
+
+    for _ in range(4):
+        make_item()
+
+    assert count_queries(url, **params) == with_one_item
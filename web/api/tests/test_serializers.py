@@ -2,7 +2,10 @@ from datetime import date, datetime
 
 import pytest
 from dateutil.parser import parse
+from django.utils import timezone
 from model_bakery import baker
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
 
 from web.api.serializers import (
     CityCouncilAgendaSerializer,
@@ -10,6 +13,7 @@ from web.api.serializers import (
     CityCouncilMinuteSerializer,
     CityHallBidEventSerializer,
     CityHallBidSerializer,
+    FastListSerializer,
     FileSerializer,
 )
 
@@ -168,3 +172,56 @@ class TestCityHallBidSerializer:
             data["crawled_at"]
         )
         assert serializer.validated_data["crawled_from"] == data["crawled_from"]
+
+
+class TestFastListSerializer:
+    @pytest.mark.parametrize(
+        "serializer_class,model",
+        [
+            (CityCouncilAgendaSerializer, "datasets.CityCouncilAgenda"),
+            (CityCouncilAttendanceListSerializer, "datasets.CityCouncilAttendanceList"),
+            (CityHallBidEventSerializer, "datasets.CityHallBidEvent"),
+        ],
+    )
+    def test_renders_the_same_json_as_the_default_serializer(
+        self, serializer_class, model
+    ):
+        baker.make(model, _quantity=3, _fill_optional=True)
+        baker.make(model, notes=None)
+        queryset = serializer_class.Meta.model.objects.order_by("pk")
+        expected = JSONRenderer().render(
+            ListSerializer(queryset, child=serializer_class()).data
+        )
+
+        serializer = serializer_class(queryset, many=True)
+        assert isinstance(serializer, FastListSerializer)
+        assert JSONRenderer().render(serializer.data) == expected
+
+        rows = queryset.values(*serializer.columns)
+        assert JSONRenderer().render(serializer_class(rows, many=True).data) == (
+            expected
+        )
+
+    def test_nested_events_with_empty_values(self):
+        bid = baker.make_recipe("datasets.CityHallBid")
+        baker.make("datasets.CityHallBidEvent", bid=bid, published_at=None)
+        queryset = bid.events.all()
+
+        data = CityHallBidSerializer(bid).data
+
+        expected = ListSerializer(queryset, child=CityHallBidEventSerializer()).data
+        assert data["events"] == expected
+        assert data["events"][0]["published_at"] is None
+
+    def test_uses_the_active_timezone(self):
+        baker.make_recipe("datasets.CityCouncilAgenda")
+        queryset = CityCouncilAgendaSerializer.Meta.model.objects.all()
+
+        with timezone.override("UTC"):
+            data = CityCouncilAgendaSerializer(queryset, many=True).data
+            expected = ListSerializer(
+                queryset, child=CityCouncilAgendaSerializer()
+            ).data
+
+        assert data == expected
+        assert data[0]["crawled_at"].endswith("Z")
@@ -7,6 +7,7 @@ from django.urls import reverse
 from model_bakery import baker
 
 from web.api.tests.constants import AVAILABLE_ENDPOINTS_BY_PUBLIC_AGENCY
+from web.datasets.models import CityCouncilExpenseSummary, CityCouncilRevenueSummary
 
 pytestmark = pytest.mark.django_db
 
@@ -312,3 +313,85 @@ class TestFrontendEndpointView:
 
         assert response.data == AVAILABLE_ENDPOINTS_BY_PUBLIC_AGENCY
         assert response.status_code == HTTPStatus.OK
+
+
+class TestSummaryViews:
+    def make_expense(self, day, value, **kwargs):
+        kwargs.setdefault("phase", "pagamento")
+        baker.make_recipe(
+            "datasets.CityCouncilExpense",
+            date=day,
+            value=value,
+            document="123",
+            function="01 - LEGISLATIVA",
+            modality="isento",
+            excluded=False,
+            **kwargs,
+        )
+
+    def test_expenses_summary(self, api_client_authenticated):
+        self.make_expense(date(2020, 1, 10), 10, company_or_person="Fulano")
+        self.make_expense(date(2020, 1, 20), 5, company_or_person="Fulano")
+        self.make_expense(date(2020, 1, 20), 2, company_or_person="Beltrano")
+        self.make_expense(date(2020, 2, 1), 1, company_or_person="Fulano")
+        self.make_expense(date(2020, 2, 1), 3, phase="empenho")
+        CityCouncilExpenseSummary.refresh()
+
+        response = api_client_authenticated.get(
+            reverse("city-council-expenses-summary"),
+            data={"group_by": "company_or_person", "phase": "pagamento"},
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["results"] == [
+            {
+                "month": "2020-02-01",
+                "company_or_person": "Fulano",
+                "total": "1.00",
+                "count": 1,
+            },
+            {
+                "month": "2020-01-01",
+                "company_or_person": "Beltrano",
+                "total": "2.00",
+                "count": 1,
+            },
+            {
+                "month": "2020-01-01",
+                "company_or_person": "Fulano",
+                "total": "15.00",
+                "count": 2,
+            },
+        ]
+
+    def test_revenues_summary_by_year(self, api_client_authenticated):
+        for published_at in (date(2019, 12, 1), date(2020, 1, 1), date(2020, 5, 1)):
+            baker.make_recipe(
+                "datasets.CityCouncilRevenue",
+                published_at=published_at,
+                revenue_type="orcamentaria",
+                value=2,
+                excluded=False,
+            )
+        CityCouncilRevenueSummary.refresh()
+
+        response = api_client_authenticated.get(
+            reverse("city-council-revenues-summary"),
+            data={"group_by": "revenue_type", "period": "year"},
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["results"] == [
+            {"year": 2020, "revenue_type": "orcamentaria", "total": "4.00", "count": 2},
+            {"year": 2019, "revenue_type": "orcamentaria", "total": "2.00", "count": 1},
+        ]
+
+    @pytest.mark.parametrize(
+        "data", [{"group_by": "value"}, {"period": "week"}], ids=["group_by", "period"]
+    )
+    def test_invalid_parameters(self, api_client_authenticated, data):
+        response = api_client_authenticated.get(
+            reverse("city-council-revenues-summary"), data=data
+        )
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -1,16 +1,30 @@
 from datetime import datetime
 
+from django.db.models import F, Prefetch, Sum
+from django.db.models.functions import ExtractYear
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter
-from rest_framework.generics import ListAPIView
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import GenericAPIView, ListAPIView
 from rest_framework.permissions import AllowAny
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet, ViewSet
 
+from web.api.cache import CachedListMixin, ConditionalListMixin
 from web.api.constants import AVAILABLE_ENDPOINTS_BY_PUBLIC_AGENCY
-from web.api.filters import CityHallBidFilter, GazetteFilter
+from web.api.export import ExportMixin
+from web.api.filters import (
+    CityCouncilBidFilter,
+    CityCouncilContractFilter,
+    CityCouncilExpenseFilter,
+    CityCouncilExpenseSummaryFilter,
+    CityCouncilRevenueFilter,
+    CityCouncilRevenueSummaryFilter,
+    CityHallBidFilter,
+    GazetteFilter,
+    PostgresFullTextSearchFilter,
+)
 from web.api.serializers import (
     CityCouncilAgendaSerializer,
     CityCouncilAttendanceListSerializer,
@@ -21,12 +35,39 @@ from web.api.serializers import (
 from web.datasets.models import (
     CityCouncilAgenda,
     CityCouncilAttendanceList,
+    CityCouncilBid,
+    CityCouncilContract,
+    CityCouncilExpense,
+    CityCouncilExpenseSummary,
     CityCouncilMinute,
+    CityCouncilRevenue,
+    CityCouncilRevenueSummary,
     CityHallBid,
+    File,
     Gazette,
+    GazetteEvent,
 )
 
 
+def prefetch_files():
+    """Busca os arquivos apenas com os campos usados pelo `FileSerializer`."""
+    return Prefetch(
+        "files", queryset=File.objects.only("url", "content_type", "object_id")
+    )
+
+
+class ValuesListMixin:
+    """Busca as páginas da listagem com `.values()`.
+
+    Evita instanciar os modelos quando o serializer da listagem é um
+    `FastListSerializer`, que lê apenas as colunas que vai exibir.
+    """
+
+    def paginate_queryset(self, queryset):
+        columns = self.get_serializer(many=True).columns
+        return super().paginate_queryset(queryset.values(*columns))
+
+
 class HealthCheckView(ViewSet):
     permission_classes = [AllowAny]
 
@@ -34,8 +75,11 @@ class HealthCheckView(ViewSet):
         return Response({"status": "available", "time": datetime.now()})
 
 
-class CityCouncilAgendaView(ListAPIView):
+class CityCouncilAgendaView(
+    ConditionalListMixin, CachedListMixin, ValuesListMixin, ListAPIView
+):
     queryset = CityCouncilAgenda.objects.all()
+    keyset_fields = ("date", "id")
     serializer_class = CityCouncilAgendaSerializer
 
     def get_queryset(self):
@@ -54,8 +98,11 @@ class CityCouncilAgendaView(ListAPIView):
         return self.queryset.filter(**kwargs)
 
 
-class CityCouncilAttendanceListView(ListAPIView):
+class CityCouncilAttendanceListView(
+    ConditionalListMixin, CachedListMixin, ValuesListMixin, ListAPIView
+):
     queryset = CityCouncilAttendanceList.objects.all()
+    keyset_fields = ("date", "id")
     serializer_class = CityCouncilAttendanceListSerializer
 
     def get_queryset(self):
@@ -78,8 +125,9 @@ class CityCouncilAttendanceListView(ListAPIView):
         return self.queryset.filter(**kwargs)
 
 
-class CityCouncilMinuteView(ListAPIView):
-    queryset = CityCouncilMinute.objects.all()
+class CityCouncilMinuteView(ConditionalListMixin, CachedListMixin, ListAPIView):
+    queryset = CityCouncilMinute.objects.prefetch_related(prefetch_files())
+    keyset_fields = ("date", "pk")
     serializer_class = CityCouncilMinuteSerializer
 
     def get_queryset(self):
@@ -98,18 +146,129 @@ class CityCouncilMinuteView(ListAPIView):
         return self.queryset.filter(**kwargs)
 
 
-class GazetteView(ReadOnlyModelViewSet):
-    queryset = Gazette.objects.all()
+class GazetteView(ConditionalListMixin, CachedListMixin, ReadOnlyModelViewSet):
+    queryset = Gazette.objects.prefetch_related(
+        Prefetch(
+            "events",
+            queryset=GazetteEvent.objects.only(
+                "gazette_id", "title", "secretariat", "summary", "published_on"
+            ),
+        ),
+        prefetch_files(),
+    )
+    keyset_fields = ("date", "pk")
     serializer_class = GazetteSerializer
     filterset_class = GazetteFilter
-    filter_backends = [SearchFilter, DjangoFilterBackend]
+    filter_backends = [PostgresFullTextSearchFilter, DjangoFilterBackend]
 
 
-class CityHallBidView(ListAPIView):
-    queryset = CityHallBid.objects.prefetch_related("events").prefetch_related("files")
+class CityHallBidView(ConditionalListMixin, CachedListMixin, ListAPIView):
+    queryset = CityHallBid.objects.prefetch_related("events", prefetch_files())
+    keyset_fields = ("session_at", "pk")
     serializer_class = CityHallBidSerializer
     filterset_class = CityHallBidFilter
-    filter_backends = [SearchFilter, DjangoFilterBackend]
+    filter_backends = [PostgresFullTextSearchFilter, DjangoFilterBackend]
+
+
+class CityCouncilAgendaExportView(ExportMixin, CityCouncilAgendaView):
+    export_name = "agenda"
+
+
+class CityCouncilAttendanceListExportView(ExportMixin, CityCouncilAttendanceListView):
+    export_name = "attendance-list"
+
+
+class CityCouncilMinuteExportView(ExportMixin, CityCouncilMinuteView):
+    export_name = "minute"
+
+
+class CityCouncilBidExportView(ExportMixin, GenericAPIView):
+    queryset = CityCouncilBid.objects.all()
+    filterset_class = CityCouncilBidFilter
+    export_name = "bids"
+
+
+class CityCouncilContractExportView(ExportMixin, GenericAPIView):
+    queryset = CityCouncilContract.objects.all()
+    filterset_class = CityCouncilContractFilter
+    export_name = "contracts"
+
+
+class CityCouncilExpenseExportView(ExportMixin, GenericAPIView):
+    queryset = CityCouncilExpense.objects.all()
+    filterset_class = CityCouncilExpenseFilter
+    export_name = "expenses"
+
+
+class CityCouncilRevenueExportView(ExportMixin, GenericAPIView):
+    queryset = CityCouncilRevenue.objects.all()
+    filterset_class = CityCouncilRevenueFilter
+    export_name = "revenues"
+
+
+class GazetteExportView(ExportMixin, GazetteView):
+    export_name = "gazettes"
+
+
+class CityHallBidExportView(ExportMixin, CityHallBidView):
+    export_name = "bids"
+
+
+class SummaryView(ListAPIView):
+    """Totais pré-calculados de um dataset (ver `SummaryMixin`).
+
+    `?group_by=` escolhe as dimensões agrupadas, separadas por vírgula (todas
+    por padrão), e `?period=year` soma os meses de cada ano. A consulta é
+    feita apenas na tabela de resumo, sem ler os itens do dataset.
+    """
+
+    periods = ("month", "year")
+    swagger_schema = None
+
+    def get_group_by(self):
+        dimensions = self.queryset.model.dimensions
+        group_by = self.request.query_params.get("group_by")
+        if not group_by:
+            return list(dimensions)
+
+        group_by = [name.strip() for name in group_by.split(",") if name.strip()]
+        invalid = [name for name in group_by if name not in dimensions]
+        if invalid:
+            raise ValidationError(
+                {"group_by": f"Dimensões inválidas: {', '.join(invalid)}."}
+            )
+        return group_by
+
+    def list(self, request, *args, **kwargs):
+        period = request.query_params.get("period", "month")
+        if period not in self.periods:
+            raise ValidationError({"period": f"Use {' ou '.join(self.periods)}."})
+        group_by = self.get_group_by()
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if period == "year":
+            queryset = queryset.annotate(year=ExtractYear("month"))
+        totals = (
+            queryset.order_by()
+            .values(period, *group_by)
+            .annotate(total=Sum("total"), count=Sum("count"))
+            .order_by(F(period).desc(nulls_last=True), *group_by)
+        )
+
+        page = self.paginate_queryset(totals)
+        for row in page:
+            row["total"] = str(row["total"])
+        return self.get_paginated_response(page)
+
+
+class CityCouncilExpenseSummaryView(SummaryView):
+    queryset = CityCouncilExpenseSummary.objects.all()
+    filterset_class = CityCouncilExpenseSummaryFilter
+
+
+class CityCouncilRevenueSummaryView(SummaryView):
+    queryset = CityCouncilRevenueSummary.objects.all()
+    filterset_class = CityCouncilRevenueSummaryFilter
 
 
 class FrontendEndpoint(APIView):
@@ -10,8 +10,10 @@ from .models import (
     CityCouncilBid,
     CityCouncilContract,
     CityCouncilExpense,
+    CityCouncilExpenseSummary,
     CityCouncilMinute,
     CityCouncilRevenue,
+    CityCouncilRevenueSummary,
     CityHallBid,
     File,
     Gazette,
@@ -58,12 +60,7 @@ class GazetteAdmin(FileURLsMixin, PublicModelAdmin):
     )
 
     def get_queryset(self, request):
-        return (
-            super()
-            .get_queryset(request)
-            .prefetch_related("files", "events")
-            .defer("files__content")
-        )
+        return super().get_queryset(request).prefetch_related("files", "events")
 
     def get_search_results(self, request, queryset, search_term):
         if not search_term:
@@ -159,6 +156,21 @@ class CityCouncilExpenseAdmin(PublicModelAdmin):
     )
 
 
+class CityCouncilExpenseSummaryAdmin(PublicModelAdmin):
+    search_fields = ["company_or_person", "document"]
+    list_filter = ["month", "phase", "modality", "function"]
+    list_display = (
+        "month",
+        "phase",
+        "company_or_person",
+        "document",
+        "function",
+        "modality",
+        "total",
+        "count",
+    )
+
+
 class CityCouncilMinuteAdmin(FileURLsMixin, PublicModelAdmin):
     search_fields = ["title", "files__search_vector"]
     list_filter = ["date", "event_type"]
@@ -172,12 +184,7 @@ class CityCouncilMinuteAdmin(FileURLsMixin, PublicModelAdmin):
     )
 
     def get_queryset(self, request):
-        return (
-            super()
-            .get_queryset(request)
-            .prefetch_related("files")
-            .defer("files__content")
-        )
+        return super().get_queryset(request).prefetch_related("files")
 
     def get_search_results(self, request, queryset, search_term):
         if not search_term:
@@ -207,7 +214,6 @@ class CityHallBidAdmin(FileURLsMixin, PublicModelAdmin):
             super()
             .get_queryset(request)
             .prefetch_related("files", "events", "events__files")
-            .defer("files__content", "events__files__content")
         )
 
     def get_search_results(self, request, queryset, search_term):
@@ -312,6 +318,11 @@ class CityCouncilRevenueAdmin(PublicModelAdmin):
     )
 
 
+class CityCouncilRevenueSummaryAdmin(PublicModelAdmin):
+    list_filter = ["month", "revenue_type", "modality"]
+    list_display = ("month", "revenue_type", "modality", "total", "count")
+
+
 class TCMBADocumentAdmin(FileURLsMixin, PublicModelAdmin):
     search_fields = ["original_filename", "unit", "category"]
     list_filter = ["month", "year", "period", "unit", "category"]
@@ -336,7 +347,9 @@ models_and_admins = [
     (CityCouncilBid, CityCouncilBidAdmin),
     (CityCouncilContract, CityCouncilContractAdmin),
     (CityCouncilExpense, CityCouncilExpenseAdmin),
+    (CityCouncilExpenseSummary, CityCouncilExpenseSummaryAdmin),
     (CityCouncilRevenue, CityCouncilRevenueAdmin),
+    (CityCouncilRevenueSummary, CityCouncilRevenueSummaryAdmin),
     (CityCouncilMinute, CityCouncilMinuteAdmin),
     (Gazette, GazetteAdmin),
     (CityHallBid, CityHallBidAdmin),
@@ -0,0 +1,116 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from web.datasets.history import record_changed, record_created
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def natural_key(instance, unique_fields):
+    """Chave natural de uma instância normalizada como o banco a armazena.
+
+    Datas e horários são convertidos com `get_prep_value` para que valores
+    vindos dos spiders (ex.: `datetime` sem timezone) possam ser comparados
+    com os valores lidos do banco.
+    """
+    return tuple(_prep_value(instance, name) for name in unique_fields)
+
+
+def _prep_value(instance, name):
+    field = instance._meta.get_field(name)
+    return field.get_prep_value(getattr(instance, field.attname))
+
+
+def _has_history(model):
+    return hasattr(model._meta, "history_fields")
+
+
+def _find_existing(model, instances, unique_fields, queryset):
+    attnames = [model._meta.get_field(name).attname for name in unique_fields]
+    lookups = [
+        Q(**dict(zip(attnames, natural_key(instance, unique_fields))))
+        for instance in instances
+    ]
+    existing = {}
+    for start in range(0, len(lookups), DEFAULT_BATCH_SIZE):
+        chunk = lookups[start : start + DEFAULT_BATCH_SIZE]
+        for found in queryset.filter(reduce(or_, chunk)):
+            existing.setdefault(natural_key(found, unique_fields), found)
+    return existing
+
+
+def bulk_upsert(
+    model,
+    instances,
+    unique_fields,
+    update_fields=None,
+    queryset=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    create=True,
+):
+    """Cria ou atualiza instâncias em lote a partir de uma chave natural.
+
+    Equivalente a chamar `update_or_create` (ou `get_or_create`, quando
+    `update_fields` é vazio) para cada instância, mas com uma consulta para
+    encontrar os registros existentes, um `bulk_create` para os novos e um
+    `bulk_update` para os alterados. Instâncias com a mesma chave são
+    deduplicadas (a última vence). Com `create=False` apenas os registros
+    existentes são atualizados e as chaves não encontradas ficam de fora do
+    resultado.
+
+    Retorna um dicionário `{chave natural: instância salva}` e o conjunto das
+    chaves que foram criadas.
+    """
+    update_fields = list(update_fields or [])
+    queryset = queryset if queryset is not None else model._default_manager.all()
+
+    by_key = {}
+    for instance in instances:
+        by_key[natural_key(instance, unique_fields)] = instance
+    if not by_key:
+        return {}, set()
+
+    with transaction.atomic():
+        existing = _find_existing(model, by_key.values(), unique_fields, queryset)
+
+        to_create, to_update = [], []
+        for key, instance in list(by_key.items()):
+            found = existing.get(key)
+            if found is None:
+                if create:
+                    to_create.append(instance)
+                else:
+                    del by_key[key]
+                continue
+            changed = False
+            for name in update_fields:
+                if _prep_value(found, name) != _prep_value(instance, name):
+                    attname = model._meta.get_field(name).attname
+                    setattr(found, attname, getattr(instance, attname))
+                    changed = True
+            if changed:
+                to_update.append(found)
+            by_key[key] = found
+
+        if to_create:
+            model._default_manager.bulk_create(to_create, batch_size=batch_size)
+            if _has_history(model):
+                record_created(to_create)
+
+        if to_update:
+            fields = list(update_fields)
+            if hasattr(model, "updated_at"):
+                now = timezone.now()
+                for instance in to_update:
+                    instance.updated_at = now
+                fields.append("updated_at")
+            model._default_manager.bulk_update(to_update, fields, batch_size=batch_size)
+            if _has_history(model):
+                record_changed(to_update, update_fields)
+
+    created = {natural_key(instance, unique_fields) for instance in to_create}
+    return by_key, created
@@ -0,0 +1,43 @@
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_KEY = "datasets:generation"
+
+
+def get_generation():
+    """Versão atual dos dados, usada nas chaves do cache de respostas."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # um valor inicial novo evita reaproveitar chaves de antes da perda
+        # do contador (ex.: reinício do Redis)
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """Invalida as respostas em cache de todos os datasets."""
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:  # contador ainda não existe
+        return get_generation()
+
+
+def invalidates_cache(func):
+    """Incrementa a geração após a execução de uma função que grava dados.
+
+    O incremento acontece depois do commit para que uma requisição
+    simultânea não guarde os dados antigos com a geração nova.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            transaction.on_commit(bump_generation)
+
+    return wrapper
@@ -0,0 +1,235 @@
+"""Histórico de alterações guardado como diferenças (ver `Change`).
+
+Cada alteração grava apenas os campos que mudaram, no formato
+`{campo: [valor anterior, valor novo]}`; salvamentos sem alterações não
+geram registros. O estado de um registro em uma data é reconstruído a partir
+do registro atual, desfazendo as alterações posteriores (`as_of`).
+"""
+from functools import wraps
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.db.models.signals import post_delete, post_init, post_save
+from simple_history.models import HistoricalRecords
+
+CREATED, CHANGED, DELETED = "+", "~", "-"
+
+
+def tracked_fields(model):
+    return model._meta.history_fields
+
+
+def _prep(field, value):
+    # normaliza como o banco armazena (ex.: "10.00" e Decimal("10.00"),
+    # datetime sem timezone e com timezone)
+    return field.get_prep_value(value)
+
+
+def snapshot(instance, fields=None):
+    """Guarda os valores carregados para comparar no próximo salvamento.
+
+    Com `fields`, apenas os valores desses campos são atualizados.
+    """
+    values = instance.__dict__
+    current = {
+        field.attname: values[field.attname]
+        for field in tracked_fields(type(instance))
+        if field.attname in values
+        and (fields is None or {field.name, field.attname} & set(fields))
+    }
+    if fields is None:
+        instance._history_snapshot = current
+    else:
+        instance._history_snapshot = {
+            **getattr(instance, "_history_snapshot", {}),
+            **current,
+        }
+
+
+def changed_fields(instance, update_fields=None):
+    """Campos alterados desde que a instância foi carregada (ou salva).
+
+    Retorna `{attname: [anterior, novo]}` com os valores normalizados.
+    """
+    before = getattr(instance, "_history_snapshot", {})
+    current = instance.__dict__
+    changes = {}
+    for field in tracked_fields(type(instance)):
+        name = field.attname
+        if update_fields is not None and field.name not in update_fields:
+            continue
+        if name not in before or name not in current:
+            continue  # campos adiados não são comparados
+        old, new = _prep(field, before[name]), _prep(field, current[name])
+        if old != new:
+            changes[name] = [old, new]
+    return changes
+
+
+def _current_user():
+    request = getattr(HistoricalRecords.context, "request", None)
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+
+def build_change(instance, change_type, changes):
+    from web.datasets.models import Change
+
+    return Change(
+        content_type=ContentType.objects.get_for_model(type(instance)),
+        object_id=instance.pk,
+        change_type=change_type,
+        changes=changes,
+        user=_current_user(),
+    )
+
+
+def record_created(instances):
+    """Registra a criação de instâncias salvas com `bulk_create`."""
+    from web.datasets.models import Change
+
+    changes = [build_change(instance, CREATED, {}) for instance in instances]
+    Change.objects.bulk_create(changes)
+    for instance in instances:
+        snapshot(instance)
+
+
+def record_changed(instances, update_fields=None):
+    """Registra as alterações de instâncias salvas com `bulk_update`."""
+    from web.datasets.models import Change
+
+    changes = []
+    for instance in instances:
+        diff = changed_fields(instance, update_fields)
+        if diff:
+            changes.append(build_change(instance, CHANGED, diff))
+        snapshot(instance)
+    Change.objects.bulk_create(changes)
+
+
+def _post_save(sender, instance, created, raw, update_fields, **kwargs):
+    if raw:
+        return
+    if created:
+        build_change(instance, CREATED, {}).save()
+    else:
+        diff = changed_fields(instance, update_fields)
+        if diff:
+            build_change(instance, CHANGED, diff).save()
+    snapshot(instance)
+
+
+def _post_delete(sender, instance, **kwargs):
+    values = {
+        field.attname: [_prep(field, getattr(instance, field.attname)), None]
+        for field in tracked_fields(sender)
+        if field.attname in instance.__dict__
+    }
+    build_change(instance, DELETED, values).save()
+
+
+def _post_init(sender, instance, **kwargs):
+    snapshot(instance)
+
+
+def _refreshes_snapshot(refresh_from_db):
+    # `refresh_from_db` (usado também para carregar campos adiados) não
+    # dispara `post_init`
+    @wraps(refresh_from_db)
+    def wrapper(self, using=None, fields=None, **kwargs):
+        refresh_from_db(self, using=using, fields=fields, **kwargs)
+        snapshot(self, fields)
+
+    return wrapper
+
+
+class HistoryManager(models.Manager):
+    """Alterações de um modelo (`Model.history`) ou de um registro
+    (`instance.history`)."""
+
+    def __init__(self, tracked, instance=None):
+        from web.datasets.models import Change
+
+        super().__init__()
+        self.model = Change
+        self.tracked = tracked
+        self.instance = instance
+
+    def get_queryset(self):
+        queryset = (
+            super()
+            .get_queryset()
+            .filter(content_type=ContentType.objects.get_for_model(self.tracked))
+        )
+        if self.instance is not None:
+            queryset = queryset.filter(object_id=self.instance.pk)
+        return queryset
+
+    def as_of(self, when, pk=None):
+        """Reconstrói o registro como era em `when`.
+
+        Retorna `None` se o registro ainda não existia nessa data.
+        """
+        pk = self.instance.pk if pk is None else pk
+        later = self.get_queryset().filter(object_id=pk, changed_at__gt=when)
+        instance = self.tracked._base_manager.filter(pk=pk).first()
+        values = {}
+        for change in later.order_by("-changed_at", "-pk"):
+            if change.change_type == CREATED:
+                return None
+            if change.change_type == DELETED:
+                instance = None
+                values = {}
+            for name, (old, _) in change.changes.items():
+                values[name] = old
+
+        if instance is None:
+            if not values:
+                return None
+            instance = self.tracked(pk=pk)
+        fields = {field.attname: field for field in tracked_fields(self.tracked)}
+        for name, value in values.items():
+            if name in fields:
+                setattr(instance, name, fields[name].to_python(value))
+        return instance
+
+
+class HistoryDescriptor:
+    def __init__(self, model):
+        self.model = model
+
+    def __get__(self, instance, owner):
+        return HistoryManager(self.model, instance)
+
+
+class DiffHistory:
+    """Substitui `HistoricalRecords`, gravando apenas os campos alterados.
+
+    Campos com `auto_now` (ex.: `updated_at`) e os de `excluded_fields` não
+    entram no histórico.
+    """
+
+    def __init__(self, excluded_fields=None):
+        self.excluded_fields = set(excluded_fields or [])
+
+    def contribute_to_class(self, cls, name):
+        self.name = name
+        models.signals.class_prepared.connect(self.finalize, sender=cls, weak=False)
+
+    def finalize(self, sender, **kwargs):
+        if sender._meta.abstract:
+            return
+        sender._meta.history_fields = tuple(
+            field
+            for field in sender._meta.concrete_fields
+            if not field.primary_key
+            and not getattr(field, "auto_now", False)
+            and field.name not in self.excluded_fields
+        )
+        setattr(sender, self.name, HistoryDescriptor(sender))
+        sender.refresh_from_db = _refreshes_snapshot(sender.refresh_from_db)
+        post_init.connect(_post_init, sender=sender, weak=False)
+        post_save.connect(_post_save, sender=sender, weak=False)
+        post_delete.connect(_post_delete, sender=sender, weak=False)
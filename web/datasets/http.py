@@ -0,0 +1,95 @@
+from logging import debug
+from threading import Lock
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_CONNECTIONS = 10  # quantidade de hosts mantidos no pool
+POOL_MAXSIZE = 10  # conexões mantidas por host
+TIMEOUT = (10, 60)  # segundos para conectar e para ler a resposta
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    raise_on_status=False,
+)
+
+_session = None
+_lock = Lock()
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """Adaptador com pool de conexões, retentativas e timeout padrão."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("pool_connections", POOL_CONNECTIONS)
+        kwargs.setdefault("pool_maxsize", POOL_MAXSIZE)
+        kwargs.setdefault("max_retries", RETRY)
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = TIMEOUT
+        return super().send(request, **kwargs)
+
+
+def create_session():
+    session = Session()
+    session.headers.update({"User-Agent": "Maria Quitéria"})
+    adapter = PooledHTTPAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """Sessão HTTP compartilhada pelo processo.
+
+    Reaproveita conexões (keep-alive) com os mesmos hosts, como o site da
+    prefeitura de onde os arquivos são baixados. A sessão é criada no
+    primeiro uso para que cada processo (ex.: worker do Celery) tenha o seu
+    próprio pool.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def pool_stats():
+    """Métricas de uso do pool de conexões por host.
+
+    `hits` são as requisições que reaproveitaram uma conexão aberta e
+    `misses` as que precisaram abrir uma nova conexão.
+    """
+    if _session is None:
+        return {}
+
+    stats = {}
+    for adapter in set(_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            host = f"{pool.scheme}://{pool.host}:{pool.port}"
+            misses = pool.num_connections
+            stats[host] = {
+                "requests": pool.num_requests,
+                "hits": max(pool.num_requests - misses, 0),
+                "misses": misses,
+            }
+    return stats
+
+
+def log_pool_stats(**kwargs):
+    """Registra as métricas do pool (conectado ao fim de cada task do Celery).
+
+    Usa o nível `DEBUG` para não encher o log dos workers a cada task.
+    """
+    for host, stats in pool_stats().items():
+        debug(
+            f"Pool HTTP {host}: {stats['requests']} requisições, "
+            f"{stats['hits']} conexões reaproveitadas, {stats['misses']} abertas."
+        )
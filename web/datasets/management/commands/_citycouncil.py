@@ -1,6 +1,8 @@
 from django.contrib.admin.options import get_content_type_for_model
 
-from web.datasets.management.commands._file import save_file
+from web.datasets.bulk import bulk_upsert, natural_key
+from web.datasets.cache import invalidates_cache
+from web.datasets.management.commands._file import save_file, save_files
 from web.datasets.models import (
     CityCouncilAgenda,
     CityCouncilAttendanceList,
@@ -8,7 +10,11 @@ from web.datasets.models import (
     CityCouncilMinute,
 )
 
+ATTENDANCE_LIST_KEY = ("date", "council_member")
+MINUTE_KEY = ("date", "crawled_from")
 
+
+@invalidates_cache
 def save_agenda(item):
     agenda, _ = CityCouncilAgenda.objects.update_or_create(
         date=item["date"],
@@ -20,6 +26,7 @@ def save_agenda(item):
     return agenda
 
 
+@invalidates_cache
 def save_attendance_list(item):
     attendance, _ = CityCouncilAttendanceList.objects.update_or_create(
         date=item["date"],
@@ -33,6 +40,28 @@ def save_attendance_list(item):
     return attendance
 
 
+@invalidates_cache
+def save_attendance_lists(items):
+    """Versão em lote de `save_attendance_list`."""
+    attendances, _ = bulk_upsert(
+        CityCouncilAttendanceList,
+        [
+            CityCouncilAttendanceList(
+                date=item["date"],
+                council_member=item["council_member"],
+                crawled_at=item["crawled_at"],
+                crawled_from=item["crawled_from"],
+                status=item.get("status"),
+            )
+            for item in items
+        ],
+        ATTENDANCE_LIST_KEY,
+        update_fields=["crawled_at", "crawled_from", "status"],
+    )
+    return list(attendances.values())
+
+
+@invalidates_cache
 def save_expense(item):
     attendance, _ = CityCouncilExpense.objects.get_or_create(
         published_at=item["published_at"],
@@ -59,6 +88,7 @@ def save_expense(item):
     return attendance
 
 
+@invalidates_cache
 def save_minute(item):
     minute, created = CityCouncilMinute.objects.get_or_create(
         date=item["date"],
@@ -74,3 +104,31 @@ def save_minute(item):
         for file_ in item["files"]:
             save_file(file_, content_type, minute.pk)
     return minute
+
+
+@invalidates_cache
+def save_minutes(items):
+    """Versão em lote de `save_minute`, incluindo arquivos."""
+    instances = [
+        CityCouncilMinute(
+            date=item["date"],
+            crawled_from=item["crawled_from"],
+            title=item["title"],
+            event_type=item["event_type"],
+            crawled_at=item["crawled_at"],
+        )
+        for item in items
+    ]
+    minutes, created = bulk_upsert(CityCouncilMinute, instances, MINUTE_KEY)
+
+    content_type = get_content_type_for_model(CityCouncilMinute)
+    files = []
+    for item, instance in zip(items, instances):
+        key = natural_key(instance, MINUTE_KEY)
+        if key in created and item.get("files"):
+            created.remove(key)  # arquivos apenas do primeiro item criado
+            minute = minutes[key]
+            files.extend((file_, content_type, minute.pk) for file_ in item["files"])
+
+    save_files(files)
+    return list(minutes.values())
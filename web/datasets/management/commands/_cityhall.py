@@ -1,10 +1,16 @@
 from django.contrib.admin.options import get_content_type_for_model
 
+from web.datasets.bulk import bulk_upsert, natural_key
+from web.datasets.cache import invalidates_cache
 from web.datasets.models import CityHallBid, CityHallBidEvent
 
-from ._file import save_file
+from ._file import save_file, save_files
 
+BID_KEY = ("session_at", "public_agency", "codes")
+BID_EVENT_KEY = ("crawled_from", "bid", "published_at", "summary")
 
+
+@invalidates_cache
 def save_bid(item):
     bid, created = CityHallBid.objects.update_or_create(
         session_at=item["session_at"],
@@ -35,3 +41,55 @@ def save_bid(item):
         if created and event.get("url"):
             save_file(event.get("url"), content_type, event_obj.pk)
     return bid
+
+
+@invalidates_cache
+def save_bids(items):
+    """Versão em lote de `save_bid`, incluindo histórico e arquivos."""
+    instances = [
+        CityHallBid(
+            session_at=item["session_at"],
+            public_agency=item["public_agency"],
+            codes=item["codes"],
+            crawled_from=item["crawled_from"],
+            crawled_at=item["crawled_at"],
+            description=item["description"],
+            modality=item["modality"],
+        )
+        for item in items
+    ]
+    bids, created = bulk_upsert(
+        CityHallBid,
+        instances,
+        BID_KEY,
+        update_fields=["crawled_from", "crawled_at", "description", "modality"],
+    )
+
+    bid_content_type = get_content_type_for_model(CityHallBid)
+    files, events, event_urls = [], [], {}
+    for item, instance in zip(items, instances):
+        key = natural_key(instance, BID_KEY)
+        bid = bids[key]
+        if key in created and item.get("files"):
+            created.remove(key)  # arquivos apenas do primeiro item criado
+            files.extend((file_, bid_content_type, bid.pk) for file_ in item["files"])
+        for event in item["history"]:
+            event_obj = CityHallBidEvent(
+                crawled_from=item["crawled_from"],
+                bid=bid,
+                published_at=event["published_at"],
+                summary=event["event"],
+                crawled_at=item["crawled_at"],
+            )
+            events.append(event_obj)
+            if event.get("url"):
+                event_urls[natural_key(event_obj, BID_EVENT_KEY)] = event["url"]
+
+    saved_events, created_events = bulk_upsert(CityHallBidEvent, events, BID_EVENT_KEY)
+    event_content_type = get_content_type_for_model(CityHallBidEvent)
+    for key in created_events:
+        if key in event_urls:
+            files.append((event_urls[key], event_content_type, saved_events[key].pk))
+
+    save_files(files)
+    return list(bids.values())
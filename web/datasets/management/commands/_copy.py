@@ -0,0 +1,138 @@
+import io
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models, transaction
+
+CHUNK_SIZE = 10_000
+# campos atualizados a cada importação, que não indicam mudança nos dados
+METADATA_FIELDS = {"crawled_at", "crawled_from"}
+
+
+def copy_fields(model):
+    return [
+        field
+        for field in model._meta.concrete_fields
+        if not field.primary_key and not isinstance(field, SearchVectorField)
+    ]
+
+
+def to_copy_line(instance, fields):
+    """Converte uma instância em uma linha CSV no formato do `COPY`.
+
+    Campos vazios (`NULL`) não têm aspas, diferenciando-os de strings vazias.
+    As restrições do banco são verificadas aqui para que a linha seja
+    rejeitada antes de interromper o `COPY`.
+    """
+    values = []
+    for field in fields:
+        value = field.pre_save(instance, add=True)
+        if value is None:
+            if not field.null:
+                raise ValueError(f"Campo obrigatório vazio: {field.name}")
+            values.append("")
+            continue
+        value = field.to_python(value)
+        if isinstance(field, models.CharField) and len(value) > field.max_length:
+            raise ValueError(
+                f"Campo {field.name} maior que {field.max_length} caracteres"
+            )
+        value = str(field.get_db_prep_save(value, connection))
+        values.append('"' + value.replace('"', '""') + '"')
+    return ",".join(values) + "\n"
+
+
+def _match(fields, left, right):
+    conditions = []
+    for field in fields:
+        operator = "IS NOT DISTINCT FROM" if field.null else "="
+        conditions.append(f"{left}.{field.column} {operator} {right}.{field.column}")
+    return " AND ".join(conditions)
+
+
+def copy_import(model, items, unique_fields, reject):
+    """Importa itens com `COPY` para uma tabela temporária e os mescla.
+
+    `items` é um iterável de pares `(linha original, item adaptado)`. Itens
+    inválidos são enviados para `reject(linha, erro)`. Depois da carga, os
+    registros existentes (de acordo com `unique_fields`) são atualizados com
+    os campos presentes nos itens e os demais são inseridos; registros sem
+    diferenças não são reescritos. A importação ignora sinais e o histórico
+    dos modelos (`Change`): as alterações feitas por ela não aparecem em
+    `Model.history`.
+
+    Retorna as chaves primárias dos registros inseridos e o total de
+    registros atualizados.
+    """
+    fields = copy_fields(model)
+    table = model._meta.db_table
+    staging = f"{table}_staging"
+    columns = ", ".join(field.column for field in fields)
+    copy_sql = f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    item_fields = {"updated_at"}
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {staging} "
+            f"(LIKE {table} INCLUDING DEFAULTS INCLUDING IDENTITY)"
+        )
+
+        buffer, buffered = io.StringIO(), 0
+        for row, item in items:
+            try:
+                line = to_copy_line(model(**item), fields)
+            except Exception as e:
+                reject(row, e)
+                continue
+            item_fields.update(item)
+            buffer.write(line)
+            buffered += 1
+            if buffered == CHUNK_SIZE:
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+                buffer, buffered = io.StringIO(), 0
+        if buffered:
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+
+        keys = [model._meta.get_field(name) for name in unique_fields]
+        pk = model._meta.pk.column
+        # a última linha do arquivo prevalece quando há chaves repetidas
+        cursor.execute(
+            f"DELETE FROM {staging} a USING {staging} b "
+            f"WHERE a.{pk} < b.{pk} AND {_match(keys, 'a', 'b')}"
+        )
+
+        to_update = [
+            field for field in fields if field.name in item_fields and field not in keys
+        ]
+        # só os registros com dados diferentes são reescritos (e disparam as
+        # triggers); datas de atualização e de coleta não contam como mudança
+        compared = [
+            field
+            for field in to_update
+            if not getattr(field, "auto_now", False)
+            and field.name not in METADATA_FIELDS
+        ]
+        updated = 0
+        if compared:
+            assignments = ", ".join(
+                f"{field.column} = s.{field.column}" for field in to_update
+            )
+            current = ", ".join(f"t.{field.column}" for field in compared)
+            new = ", ".join(f"s.{field.column}" for field in compared)
+            cursor.execute(
+                f"UPDATE {table} t SET {assignments} FROM {staging} s "
+                f"WHERE {_match(keys, 't', 's')} "
+                f"AND ROW({current}) IS DISTINCT FROM ROW({new})"
+            )
+            updated = cursor.rowcount
+
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {table} t "
+            f"WHERE {_match(keys, 't', 's')}) RETURNING {pk}"
+        )
+        inserted = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"DROP TABLE {staging}")
+
+    return inserted, updated
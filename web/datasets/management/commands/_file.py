@@ -1,10 +1,39 @@
+from functools import partial
+
+from django.db import transaction
+
+from web.datasets.bulk import bulk_upsert
+from web.datasets.cache import invalidates_cache
 from web.datasets.models import File
+from web.datasets.signals import backup_and_extract_content
+
+FILE_KEY = ("url", "content_type", "object_id")
 
 
+@invalidates_cache
 def save_file(url, content_type, object_id, checksum=None):
+    # o checksum é calculado no backup, então não faz parte da busca
     File.objects.get_or_create(
         url=url,
         content_type=content_type,
         object_id=object_id,
-        checksum=checksum,
+        defaults={"checksum": checksum},
     )
+
+
+@invalidates_cache
+def save_files(files):
+    """Salva em lote uma lista de `(url, content_type, object_id)`.
+
+    O `bulk_create` não dispara o sinal `post_save`, então o backup e a
+    extração de conteúdo dos arquivos criados são agendados manualmente
+    (após o commit, para que as tasks encontrem os registros no banco).
+    """
+    instances = [
+        File(url=url, content_type=content_type, object_id=object_id)
+        for url, content_type, object_id in files
+    ]
+    saved, created = bulk_upsert(File, instances, FILE_KEY)
+    for key in created:
+        transaction.on_commit(partial(backup_and_extract_content, File, saved[key]))
+    return saved
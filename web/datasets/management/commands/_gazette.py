@@ -3,11 +3,17 @@ from datetime import date
 
 from django.contrib.admin.options import get_content_type_for_model
 
+from web.datasets.bulk import bulk_upsert, natural_key
+from web.datasets.cache import invalidates_cache
 from web.datasets.models import Gazette, GazetteEvent
 
-from ._file import save_file
+from ._file import save_file, save_files
 
+GAZETTE_KEY = ("date", "power", "year_and_edition")
+GAZETTE_EVENT_KEY = ("gazette", "title", "secretariat", "crawled_from", "summary")
 
+
+@invalidates_cache
 def save_gazette(item):
     """Salva diários oficiais do executivo a partir de 2015."""
     gazette, created = Gazette.objects.update_or_create(
@@ -37,6 +43,52 @@ def save_gazette(item):
     return gazette
 
 
+@invalidates_cache
+def save_gazettes(items):
+    """Versão em lote de `save_gazette`, incluindo eventos e arquivos."""
+    instances = [
+        Gazette(
+            date=item["date"],
+            power=item["power"],
+            year_and_edition=item["year_and_edition"],
+            crawled_at=item["crawled_at"],
+            crawled_from=item["crawled_from"],
+        )
+        for item in items
+    ]
+    gazettes, created = bulk_upsert(
+        Gazette,
+        instances,
+        GAZETTE_KEY,
+        update_fields=["crawled_at", "crawled_from"],
+    )
+
+    content_type = get_content_type_for_model(Gazette)
+    files, events = [], []
+    for item, instance in zip(items, instances):
+        key = natural_key(instance, GAZETTE_KEY)
+        gazette = gazettes[key]
+        if key in created and item.get("files"):
+            created.remove(key)  # arquivos apenas do primeiro item criado
+            files.extend((file_, content_type, gazette.pk) for file_ in item["files"])
+        events.extend(
+            GazetteEvent(
+                gazette=gazette,
+                title=event["title"],
+                secretariat=event["secretariat"],
+                crawled_from=item["crawled_from"],
+                summary=event["summary"],
+                crawled_at=item["crawled_at"],
+            )
+            for event in item["events"]
+        )
+
+    save_files(files)
+    bulk_upsert(GazetteEvent, events, GAZETTE_EVENT_KEY)
+    return list(gazettes.values())
+
+
+@invalidates_cache
 def save_legacy_gazette(item):
     """Salva diários oficiais do executivo de antes de 2015.
 
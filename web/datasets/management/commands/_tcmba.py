@@ -29,3 +29,7 @@ def save_document(item):
             local_path=f"{item['filepath']}{item['filename']}",
             original_filename=item["original_filename"],
         )
+
+
+def save_documents(items):
+    return [save_document(item) for item in items]
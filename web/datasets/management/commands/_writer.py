@@ -0,0 +1,240 @@
+import logging
+from collections import defaultdict
+from time import monotonic
+
+from django.db import connections, transaction
+from twisted.internet.defer import Deferred, DeferredList
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+
+from scraper.items import (
+    CityCouncilAttendanceListItem,
+    CityCouncilMinuteItem,
+    CityHallBidItem,
+    GazetteItem,
+    LegacyGazetteItem,
+)
+from scraper.signals import items_not_saved, items_saved
+
+from ._citycouncil import (
+    save_attendance_list,
+    save_attendance_lists,
+    save_minute,
+    save_minutes,
+)
+from ._cityhall import save_bid, save_bids
+from ._gazette import save_gazette, save_gazettes, save_legacy_gazette
+
+logger = logging.getLogger(__name__)
+
+
+def save_legacy_gazettes(items):
+    # cada item do site antigo é um evento com o seu próprio arquivo
+    return [save_legacy_gazette(item) for item in items]
+
+
+# classe do item: (função que salva em lote, função que salva um item)
+SAVE_FUNCTIONS = {
+    CityCouncilAttendanceListItem: (save_attendance_lists, save_attendance_list),
+    CityCouncilMinuteItem: (save_minutes, save_minute),
+    CityHallBidItem: (save_bids, save_bid),
+    LegacyGazetteItem: (save_legacy_gazettes, save_legacy_gazette),
+    GazetteItem: (save_gazettes, save_gazette),
+}
+
+
+class BulkItemWriter:
+    """Acumula os itens coletados e os salva no banco em lotes.
+
+    Os itens são agrupados por tipo e salvos quando o total acumulado chega
+    a `batch_size`, quando `flush_interval` segundos se passaram desde a
+    última escrita ou quando `flush` é chamado (ex.: ao fechar o spider).
+    Se um lote falhar, os itens daquele tipo são salvos um a um para que um
+    item problemático não descarte os demais.
+
+    `save_functions` mapeia as classes dos itens às funções que os salvam
+    (padrão: `SAVE_FUNCTIONS`). Os lotes são passados para `submit(write,
+    lote)`, que por padrão grava na hora; o `ItemWriterPipeline` os envia
+    para outra thread. `write` retorna os itens que não puderam ser salvos.
+    """
+
+    def __init__(
+        self, batch_size=500, flush_interval=30, save_functions=None, submit=None
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.save_functions = save_functions or SAVE_FUNCTIONS
+        self.submit = submit or (lambda write, buffers: write(buffers))
+        self.buffers = defaultdict(list)
+        self.pending = 0
+        self.last_flush = monotonic()
+
+    def add(self, item):
+        item_class = type(item)
+        if item_class not in self.save_functions:
+            return
+        self.buffers[item_class].append(item)
+        self.pending += 1
+
+        elapsed = monotonic() - self.last_flush
+        if self.pending >= self.batch_size or elapsed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        buffers, self.buffers = self.buffers, defaultdict(list)
+        self.pending = 0
+        self.last_flush = monotonic()
+        if buffers:
+            return self.submit(self.write, buffers)
+
+    def write(self, buffers):
+        failed = []
+        for item_class, items in buffers.items():
+            save_in_bulk, save_one = self.save_functions[item_class]
+            try:
+                with transaction.atomic():
+                    save_in_bulk(items)
+            except Exception:
+                logger.exception(
+                    f"Falha ao salvar lote de {len(items)} {item_class.__name__}. "
+                    "Salvando itens individualmente."
+                )
+                for item in items:
+                    try:
+                        save_one(item)
+                    except Exception:
+                        logger.exception(f"Falha ao salvar item: {item}")
+                        failed.append(item)
+        return failed
+
+
+def use_item_writer(settings, **writer_settings):
+    """Ativa o `ItemWriterPipeline` nas configurações do Scrapy.
+
+    `writer_settings` são as configurações `ITEM_WRITER_*` sem o prefixo
+    (ex.: `batch_size=100`).
+    """
+    pipelines = settings.getdict("ITEM_PIPELINES")
+    pipelines[f"{__name__}.ItemWriterPipeline"] = 900
+    settings.set("ITEM_PIPELINES", pipelines)
+    for name, value in writer_settings.items():
+        settings.set(f"ITEM_WRITER_{name.upper()}", value)
+
+
+def write_in_thread(write, buffers):
+    try:
+        return write(buffers)
+    finally:
+        # cada thread tem a sua conexão; fechá-la evita conexões esquecidas
+        # quando o pool encerra as threads
+        connections.close_all()
+
+
+class ItemWriterPipeline:
+    """Grava os itens no banco sem bloquear o reactor do Scrapy.
+
+    Os itens são acumulados pelo `BulkItemWriter` e cada lote é gravado por
+    um pool de threads (`ITEM_WRITER_THREADS`). Quando há
+    `ITEM_WRITER_MAX_PENDING` lotes esperando gravação, os novos itens só
+    são liberados quando o lote mais antigo termina, freando a coleta em vez
+    de acumular itens na memória. Ao fechar o spider, os itens restantes são
+    gravados e o spider só termina depois de todas as gravações.
+
+    Depois de cada lote são enviados os sinais `items_saved` e
+    `items_not_saved` (ver `scraper.signals`), usados pelo
+    `CrawlStateMiddleware` para saber quais páginas foram gravadas.
+    """
+
+    def __init__(
+        self, batch_size, flush_interval, max_pending, threads, save_functions=None
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.save_functions = save_functions
+        self.threadpool = ThreadPool(0, threads, name="item-writer")
+        self.in_flight = []
+        self.signals = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        pipeline = cls(
+            batch_size=settings.getint("ITEM_WRITER_BATCH_SIZE", 500),
+            flush_interval=settings.getint("ITEM_WRITER_FLUSH_INTERVAL", 30),
+            max_pending=settings.getint("ITEM_WRITER_MAX_PENDING", 2),
+            threads=settings.getint("ITEM_WRITER_THREADS", 1),
+            save_functions=settings.get("ITEM_WRITER_SAVE_FUNCTIONS"),
+        )
+        pipeline.signals = crawler.signals
+        return pipeline
+
+    def open_spider(self, spider):
+        self.spider = spider
+        self.threadpool.start()
+        self.writer = BulkItemWriter(
+            self.batch_size, self.flush_interval, self.save_functions, self.submit
+        )
+
+    def submit(self, write, buffers):
+        from twisted.internet import reactor
+
+        deferred = deferToThreadPool(
+            reactor, self.threadpool, write_in_thread, write, buffers
+        )
+        self.in_flight.append(deferred)
+        deferred.addCallbacks(
+            self.saved,
+            self.not_saved,
+            callbackArgs=(buffers,),
+            errbackArgs=(buffers,),
+        )
+        deferred.addBoth(self.done, deferred)
+        return deferred
+
+    def saved(self, failed, buffers):
+        failed = failed or []
+        failed_ids = {id(item) for item in failed}
+        items = [
+            item
+            for items in buffers.values()
+            for item in items
+            if id(item) not in failed_ids
+        ]
+        self.send(items_saved, items)
+        if failed:
+            self.send(items_not_saved, failed)
+
+    def not_saved(self, failure, buffers):
+        logger.error(failure.getTraceback())
+        self.send(
+            items_not_saved, [item for items in buffers.values() for item in items]
+        )
+
+    def send(self, signal, items):
+        if self.signals is not None:
+            self.signals.send_catch_log(signal=signal, items=items, spider=self.spider)
+
+    def done(self, result, deferred):
+        self.in_flight.remove(deferred)
+        return result
+
+    def process_item(self, item, spider):
+        self.writer.add(item)
+        if len(self.in_flight) < self.max_pending:
+            return item
+
+        released = Deferred()
+
+        def release(result):
+            released.callback(item)
+            return result
+
+        self.in_flight[0].addBoth(release)
+        return released
+
+    def close_spider(self, spider):
+        self.writer.flush()
+        finished = DeferredList(list(self.in_flight))
+        finished.addBoth(lambda _: self.threadpool.stop())
+        return finished
@@ -0,0 +1,91 @@
+from timeit import repeat
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+
+from web.api.serializers import (
+    CityCouncilAgendaSerializer,
+    CityCouncilAttendanceListSerializer,
+    CityHallBidEventSerializer,
+)
+from web.datasets.models import (
+    CityCouncilAgenda,
+    CityCouncilAttendanceList,
+    CityHallBid,
+)
+
+
+def agenda_page(page_size):
+    items = CityCouncilAgenda.objects.all()[:page_size]
+    return CityCouncilAgendaSerializer, list(items)
+
+
+def attendance_list_page(page_size):
+    items = CityCouncilAttendanceList.objects.all()[:page_size]
+    return CityCouncilAttendanceListSerializer, list(items)
+
+
+def bid_events_page(page_size):
+    """Eventos das licitações de uma página, como aninhados na listagem."""
+    bids = CityHallBid.objects.prefetch_related("events")[:page_size]
+    events = [event for bid in bids for event in bid.events.all()]
+    return CityHallBidEventSerializer, events
+
+
+ENDPOINTS = {
+    "city-council-agenda": agenda_page,
+    "city-council-attendance-list": attendance_list_page,
+    "city-hall-bids (events)": bid_events_page,
+}
+
+
+class Command(BaseCommand):
+    help = """Compara o tempo de serialização das listagens com o serializer
+    padrão do DRF e com o `FastListSerializer`, usando os dados do banco."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=settings.REST_FRAMEWORK["PAGE_SIZE"],
+            help="Quantidade de itens por página.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=100,
+            help="Quantidade de vezes que cada página é serializada.",
+        )
+
+    def echo(self, text, style=None):
+        self.stdout.write(style(text) if style else text)
+
+    def handle(self, *args, **options):
+        render = JSONRenderer().render
+        number = options["repeat"]
+        for endpoint, get_page in ENDPOINTS.items():
+            serializer_class, items = get_page(options["page_size"])
+            if not items:
+                self.echo(f"{endpoint}: sem dados.", self.style.WARNING)
+                continue
+
+            def default():
+                return ListSerializer(items, child=serializer_class()).data
+
+            def fast():
+                return serializer_class(items, many=True).data
+
+            if render(default()) != render(fast()):
+                self.echo(f"{endpoint}: resultados diferentes!", self.style.ERROR)
+                continue
+
+            default_time = min(repeat(default, number=number, repeat=3)) / number
+            fast_time = min(repeat(fast, number=number, repeat=3)) / number
+            self.echo(
+                f"{endpoint}: {len(items)} itens, "
+                f"padrão {default_time * 1000:.2f} ms, "
+                f"rápido {fast_time * 1000:.2f} ms "
+                f"({default_time / fast_time:.1f}x)"
+            )
@@ -1,19 +1,12 @@
 import json
 import os
+from multiprocessing import Process
 
-from django.core.management.base import BaseCommand
-from scrapy import signals
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 from scrapy.crawler import CrawlerProcess
-from scrapy.signalmanager import dispatcher
 from scrapy.utils.project import get_project_settings
 
-from scraper.items import (
-    CityCouncilAttendanceListItem,
-    CityCouncilMinuteItem,
-    CityHallBidItem,
-    GazetteItem,
-    LegacyGazetteItem,
-)
 from scraper.spiders.citycouncil import AttendanceListSpider, MinuteSpider
 from scraper.spiders.cityhall import BidsSpider
 from scraper.spiders.gazette import (
@@ -24,14 +17,13 @@ from web.datasets.models import (
     CityCouncilAttendanceList,
     CityCouncilMinute,
     CityHallBid,
+    CrawlState,
     File,
     Gazette,
     GazetteEvent,
 )
 
-from ._citycouncil import save_attendance_list, save_minute
-from ._cityhall import save_bid
-from ._gazette import save_gazette, save_legacy_gazette
+from ._writer import use_item_writer
 
 
 class Command(BaseCommand):
@@ -41,6 +33,24 @@ class Command(BaseCommand):
         drop_all_help = "Limpa o banco antes de iniciar a coleta."
         parser.add_argument("--drop-all", action="store_true", help=drop_all_help)
         parser.add_argument("--scrapy-args")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Quantidade de itens acumulados antes de salvar no banco.",
+        )
+        parser.add_argument(
+            "--flush-interval",
+            type=int,
+            default=30,
+            help="Intervalo máximo (em segundos) entre escritas no banco.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Quantidade de processos executando os coletores.",
+        )
 
     def echo(self, text, style=None):
         self.stdout.write(style(text) if style else text)
@@ -51,17 +61,56 @@ class Command(BaseCommand):
     def success(self, text):
         return self.echo(text, self.style.SUCCESS)
 
-    def save(self, signal, sender, item, response, spider):
-        if isinstance(item, CityCouncilAttendanceListItem):
-            save_attendance_list(item)
-        if isinstance(item, CityCouncilMinuteItem):
-            save_minute(item)
-        if isinstance(item, CityHallBidItem):
-            save_bid(item)
-        if isinstance(item, LegacyGazetteItem):
-            save_legacy_gazette(item)
-        if isinstance(item, GazetteItem):
-            save_gazette(item)
+    def get_spiders(self):
+        """Coletores a executar e os argumentos de cada um."""
+        attendance_lists_date = CityCouncilAttendanceList.last_collected_item_date()
+        minutes_date = CityCouncilMinute.last_collected_item_date()
+        bids_date = CityHallBid.last_collected_item_date()
+        spiders = [
+            (AttendanceListSpider, {"start_from_date": attendance_lists_date}),
+            (MinuteSpider, {"start_from_date": minutes_date}),
+            (BidsSpider, {"start_from_date": bids_date}),
+        ]
+
+        last_collected_gazette = Gazette.last_collected_item_date()
+        if last_collected_gazette is None:
+            spiders.append((LegacyGazetteSpider, {}))
+        spiders.append(
+            (
+                ExecutiveAndLegislativeGazetteSpider,
+                {"start_from_date": last_collected_gazette},
+            )
+        )
+        return spiders
+
+    def crawl(self, spiders, settings):
+        """Executa os coletores em um reactor."""
+        process = CrawlerProcess(settings=settings)
+        for spider, kwargs in spiders:
+            process.crawl(spider, **kwargs)
+        process.start()
+
+    def crawl_in_processes(self, spiders, settings, workers):
+        """Distribui os coletores entre `workers` processos.
+
+        Cada processo tem o seu próprio reactor e a sua própria conexão com
+        o banco. Retorna os coletores dos processos que falharam.
+        """
+        groups = [spiders[i::workers] for i in range(workers)]
+        # os processos não devem herdar as conexões abertas
+        connections.close_all()
+        processes = []
+        for group in filter(None, groups):
+            process = Process(target=self.crawl, args=(group, settings))
+            process.start()
+            processes.append((process, group))
+
+        failed = []
+        for process, group in processes:
+            process.join()
+            if process.exitcode != 0:
+                failed.extend(spider.name for spider, _ in group)
+        return failed
 
     def handle(self, *args, **options):
         if options.get("drop_all"):
@@ -72,35 +121,28 @@ class Command(BaseCommand):
             Gazette.objects.all().delete()
             GazetteEvent.objects.all().delete()
             File.objects.all().delete()
+            CrawlState.objects.all().delete()
 
-        dispatcher.connect(self.save, signal=signals.item_passed)
         os.environ["SCRAPY_SETTINGS_MODULE"] = "scraper.settings"
         settings = get_project_settings()
 
+        # os itens são salvos em lotes, fora do reactor
+        use_item_writer(
+            settings,
+            batch_size=options.get("batch_size", 500),
+            flush_interval=options.get("flush_interval", 30),
+        )
+
         if options.get("scrapy_args"):
             scrapy_args = json.loads(options.get("scrapy_args"))
             settings.update(scrapy_args)
 
-        process = CrawlerProcess(settings=settings)
-        process.crawl(
-            AttendanceListSpider,
-            start_from_date=CityCouncilAttendanceList.last_collected_item_date(),
-        )
-        process.crawl(
-            MinuteSpider, start_from_date=CityCouncilMinute.last_collected_item_date()
-        )
-        process.crawl(
-            BidsSpider, start_from_date=CityHallBid.last_collected_item_date()
-        )
-
-        last_collected_gazette = Gazette.last_collected_item_date()
-        if last_collected_gazette is None:
-            process.crawl(LegacyGazetteSpider)
-        process.crawl(
-            ExecutiveAndLegislativeGazetteSpider,
-            start_from_date=last_collected_gazette,
-        )
-
+        spiders = self.get_spiders()
         self.warn("Iniciando a coleta...")
-        process.start()
+        if options.get("workers", 1) > 1:
+            failed = self.crawl_in_processes(spiders, settings, options["workers"])
+            if failed:
+                raise CommandError(f"Falha nos coletores: {', '.join(failed)}")
+        else:
+            self.crawl(spiders, settings)
         self.success("Pronto!")
@@ -4,14 +4,13 @@ from datetime import date
 
 from dateutil.relativedelta import relativedelta
 from django.core.management.base import BaseCommand
-from scrapy import signals
 from scrapy.crawler import CrawlerProcess
-from scrapy.signalmanager import dispatcher
 from scrapy.utils.project import get_project_settings
 from tcmba.items import DocumentItem
 from tcmba.spiders.consulta_publica import ConsultaPublicaSpider
 
-from web.datasets.management.commands._tcmba import save_document
+from web.datasets.management.commands._tcmba import save_document, save_documents
+from web.datasets.management.commands._writer import use_item_writer
 
 
 class Command(BaseCommand):
@@ -47,10 +46,6 @@ class Command(BaseCommand):
     def success(self, text):
         return self.echo(text, self.style.SUCCESS)
 
-    def save(self, signal, sender, item, response, spider):
-        if isinstance(item, DocumentItem):
-            save_document(item)
-
     def handle(self, *args, **options):
         if not options.get("period"):
             target_date = date.today() + relativedelta(months=-2)
@@ -58,10 +53,12 @@ class Command(BaseCommand):
         else:
             target_date = options.get("period")
 
-        dispatcher.connect(self.save, signal=signals.item_passed)
         os.environ["SCRAPY_SETTINGS_MODULE"] = "scraper.settings"
         settings = get_project_settings()
         settings["COOKIES_ENABLED"] = True
+        use_item_writer(
+            settings, save_functions={DocumentItem: (save_documents, save_document)}
+        )
 
         if options.get("scrapy_args"):
             scrapy_args = json.loads(options.get("scrapy_args"))
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from web.datasets.tasks import (
+    EXTRACTION_CHUNK_SIZE,
+    EXTRACTION_WORKERS,
+    extract_contents,
+    extract_contents_chunk,
+)
+
+
+class Command(BaseCommand):
+    help = """Extrai o conteúdo dos arquivos que ainda não possuem conteúdo.
+
+    O progresso é salvo após cada lote para que uma execução interrompida
+    continue de onde parou."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXTRACTION_CHUNK_SIZE,
+            help="Quantidade de arquivos por lote.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=EXTRACTION_WORKERS,
+            help="Quantidade de downloads e extrações simultâneas.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=f"{Path.cwd()}/data/extract_contents.checkpoint",
+            help="Arquivo onde o último arquivo processado é salvo.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignora o progresso salvo e começa do início.",
+        )
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Agenda a extração como uma task no Celery.",
+        )
+
+    def echo(self, text, style=None):
+        self.stdout.write(style(text) if style else text)
+
+    def handle(self, *args, **options):
+        checkpoint = Path(options["checkpoint"])
+        after_pk = 0
+        if checkpoint.exists() and not options["restart"]:
+            after_pk = int(checkpoint.read_text().strip() or 0)
+            self.echo(f"Retomando a partir do arquivo {after_pk}.")
+
+        if options["background"]:
+            extract_contents.delay(after_pk, options["chunk_size"], options["workers"])
+            self.echo("Extração agendada.", self.style.SUCCESS)
+            return
+
+        total = 0
+        while True:
+            result = extract_contents_chunk(
+                after_pk, options["chunk_size"], options["workers"]
+            )
+            if result is None:
+                break
+            after_pk, extracted = result
+            total += extracted
+            checkpoint.parent.mkdir(parents=True, exist_ok=True)
+            checkpoint.write_text(str(after_pk))
+            self.echo(f"Último arquivo processado: {after_pk} (extraídos: {total})")
+
+        if checkpoint.exists():
+            checkpoint.unlink()
+        self.echo(f"Pronto! Conteúdo extraído de {total} arquivos.", self.style.SUCCESS)
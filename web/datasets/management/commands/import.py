@@ -4,6 +4,7 @@ from datetime import datetime
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
 from web.datasets.adapters import (
     to_citycouncil_bid,
@@ -13,6 +14,7 @@ from web.datasets.adapters import (
     to_citycouncil_expense,
     to_citycouncil_revenue,
 )
+from web.datasets.cache import bump_generation
 from web.datasets.models import (
     CityCouncilBid,
     CityCouncilContract,
@@ -20,26 +22,46 @@ from web.datasets.models import (
     CityCouncilRevenue,
     File,
 )
+from web.datasets.tasks import BACKUP_BATCH_SIZE, backup_files
+
+from ._copy import copy_import
 
 mapping = {
     "citycouncil_expenses": {
         "model": CityCouncilExpense,
         "adapter": to_citycouncil_expense,
+        "unique_fields": (
+            "external_file_code",
+            "external_file_line",
+            "number",
+            "phase",
+        ),
     },
     "citycouncil_contracts": {
         "model": CityCouncilContract,
         "adapter": to_citycouncil_contract,
+        "unique_fields": ("external_code",),
+    },
+    "citycouncil_bids": {
+        "model": CityCouncilBid,
+        "adapter": to_citycouncil_bid,
+        "unique_fields": ("external_code",),
     },
-    "citycouncil_bids": {"model": CityCouncilBid, "adapter": to_citycouncil_bid},
     "citycouncil_revenues": {
         "model": CityCouncilRevenue,
         "adapter": to_citycouncil_revenue,
+        "unique_fields": ("external_code",),
     },
     "citycouncil_contract_files": {
         "model": File,
         "adapter": to_citycouncil_contract_file,
+        "unique_fields": ("url", "content_type", "object_id", "original_filename"),
+    },
+    "citycouncil_bid_files": {
+        "model": File,
+        "adapter": to_citycouncil_bid_file,
+        "unique_fields": ("url", "content_type", "object_id", "original_filename"),
     },
-    "citycouncil_bid_files": {"model": File, "adapter": to_citycouncil_bid_file},
 }
 
 
@@ -50,6 +72,17 @@ class Command(BaseCommand):
         parser.add_argument("source")
         parser.add_argument("file")
         parser.add_argument("--drop-all", action="store_true")
+        parser.add_argument(
+            "--fast",
+            action="store_true",
+            help=(
+                "Carrega os dados com COPY em uma tabela temporária e mescla com "
+                "os registros existentes. Não dispara sinais nem registra "
+                "histórico (as alterações não aparecem em `history`); o "
+                "backup e a extração de conteúdo dos arquivos inseridos são "
+                "agendados em lotes ao final."
+            ),
+        )
 
     def echo(self, text, style=None):
         self.stdout.write(style(text) if style else text)
@@ -79,6 +112,10 @@ class Command(BaseCommand):
             if confirmation.lower() in ["s", "y"]:
                 model.objects.all().delete()
 
+        if options.get("fast"):
+            self.fast_import(source_map, options.get("source"), options.get("file"))
+            return
+
         saved = 0
         errors = 0
         with open(options.get("file"), newline="") as csv_file:
@@ -97,3 +134,57 @@ class Command(BaseCommand):
                     self.warn(f"{e}\n{str(row)}")
 
         self.success(f"Concluído!\nSalvos: {saved} Erros: {errors}")
+
+    def fast_import(self, source_map, source, path):
+        rejected_path = f"{os.path.splitext(path)[0]}-rejeitados.csv"
+        with open(path, newline="") as csv_file, open(
+            rejected_path, "w", newline=""
+        ) as rejected_file:
+            reader = csv.DictReader(csv_file)
+            rejected_writer = csv.DictWriter(
+                rejected_file, fieldnames=list(reader.fieldnames or []) + ["erro"]
+            )
+            rejected_writer.writeheader()
+            rejected = 0
+
+            def reject(row, error):
+                nonlocal rejected
+                rejected += 1
+                rejected_writer.writerow({**row, "erro": error})
+
+            def items():
+                crawled_at = datetime.now()
+                for row in reader:
+                    try:
+                        item = source_map["adapter"](row)
+                        if item is None:
+                            raise ValueError("Registro relacionado não encontrado.")
+                    except Exception as e:
+                        reject(row, e)
+                        continue
+                    if not source.endswith("_files"):
+                        item["crawled_at"] = crawled_at
+                        item["crawled_from"] = settings.CITY_COUNCIL_WEBSERVICE
+                    yield row, item
+
+            inserted, updated = copy_import(
+                source_map["model"], items(), source_map["unique_fields"], reject
+            )
+            if inserted or updated:
+                # invalida as respostas da API em cache
+                transaction.on_commit(bump_generation)
+
+        if not rejected:
+            os.remove(rejected_path)
+        self.success(
+            f"Concluído!\nSalvos: {len(inserted)} Atualizados: {updated} "
+            f"Rejeitados: {rejected}"
+        )
+        if rejected:
+            self.warn(f"Registros rejeitados salvos em {rejected_path}")
+
+        if source_map["model"] is File and inserted:
+            # o COPY não dispara o `post_save` que agenda o backup
+            for start in range(0, len(inserted), BACKUP_BATCH_SIZE):
+                backup_files.delay(inserted[start : start + BACKUP_BATCH_SIZE])
+            self.echo(f"Backup agendado para {len(inserted)} arquivos.")
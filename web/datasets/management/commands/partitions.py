@@ -0,0 +1,84 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from web.datasets.partitions import (
+    PARTITION_KEYS,
+    YEARS_AHEAD,
+    PartitionError,
+    convert,
+    create_future_partitions,
+)
+
+
+class Command(BaseCommand):
+    help = """Particiona por ano as maiores tabelas dos datasets (opcional).
+
+    Sem `--convert`, apenas cria as partições dos próximos anos nas tabelas
+    já particionadas (pode ser agendado, ex.: uma vez por mês). Com
+    `--convert`, converte as tabelas ainda não particionadas, copiando os
+    dados em uma transação (a tabela fica bloqueada durante a cópia)."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models",
+            nargs="*",
+            help=(
+                "Modelos a particionar (ex.: datasets.CityCouncilExpense). "
+                "Padrão: todos os modelos particionáveis."
+            ),
+        )
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Converte as tabelas que ainda não são particionadas.",
+        )
+        parser.add_argument(
+            "--years-ahead",
+            type=int,
+            default=YEARS_AHEAD,
+            help="Quantidade de anos futuros com partições criadas.",
+        )
+
+    def echo(self, text, style=None):
+        self.stdout.write(style(text) if style else text)
+
+    def get_models(self, labels):
+        if not labels:
+            return list(PARTITION_KEYS)
+
+        models = []
+        for label in labels:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError):
+                raise CommandError(f"Modelo não encontrado: {label}")
+            if model not in PARTITION_KEYS:
+                raise CommandError(f"{label} não é particionável.")
+            models.append(model)
+        return models
+
+    def handle(self, *args, **options):
+        for model in self.get_models(options["models"]):
+            table = model._meta.db_table
+            if options["convert"]:
+                try:
+                    years = convert(model, options["years_ahead"])
+                except PartitionError as error:
+                    raise CommandError(str(error))
+                if years is not None:
+                    self.echo(
+                        f"{table}: particionada ({', '.join(map(str, years))}).",
+                        self.style.SUCCESS,
+                    )
+                    continue
+
+            years = create_future_partitions(model, options["years_ahead"])
+            if years is None:
+                self.echo(f"{table}: não particionada (use --convert).")
+            elif years:
+                self.echo(
+                    f"{table}: partições criadas ({', '.join(map(str, years))}).",
+                    self.style.SUCCESS,
+                )
+            else:
+                self.echo(f"{table}: partições em dia.")
@@ -1,27 +1,194 @@
-from django.contrib.postgres.search import SearchVector
+import json
+import time
+from datetime import timedelta
+from multiprocessing import Pool
+from pathlib import Path
+
+from django.apps import apps
 from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.models import Max
+
+from web.datasets.models import (
+    CityCouncilBid,
+    CityCouncilContract,
+    CityCouncilExpense,
+    CityHallBid,
+    File,
+    GazetteEvent,
+)
+
+BATCH_SIZE = 1000
+
+# campos usados pelas triggers `search_vector_*` de cada tabela
+SEARCH_VECTOR_FIELDS = {
+    File: ["content"],
+    GazetteEvent: ["title", "secretariat", "summary"],
+    CityHallBid: ["description", "codes"],
+    CityCouncilContract: ["description", "details", "company_or_person"],
+    CityCouncilBid: ["description"],
+    CityCouncilExpense: ["summary", "company_or_person"],
+}
+
+
+def batch_update_sql(model, fields, concurrently=False):
+    """SQL que atualiza os vetores nulos ou desatualizados de um lote.
+
+    O lote é o intervalo `(%s, %s]` de chaves primárias. Com `concurrently`
+    as linhas bloqueadas (ex.: sendo gravadas pelo crawler) são puladas; a
+    trigger vai calcular o vetor delas quando a gravação terminar.
+    """
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    pk = quote(model._meta.pk.column)
+    document = " || ' ' || ".join(
+        f"COALESCE({quote(model._meta.get_field(name).column)}, '')" for name in fields
+    )
+    lock = "FOR UPDATE SKIP LOCKED" if concurrently else ""
+    return f"""
+        WITH batch AS (
+            SELECT {pk} AS pk, search_vector AS current,
+                to_tsvector('pg_catalog.portuguese', {document}) AS expected
+            FROM {table} WHERE {pk} > %s AND {pk} <= %s {lock}
+        ), updated AS (
+            UPDATE {table} SET search_vector = batch.expected FROM batch
+            WHERE {table}.{pk} = batch.pk
+            AND batch.current IS DISTINCT FROM batch.expected
+            RETURNING 1
+        )
+        SELECT (SELECT COUNT(*) FROM batch), (SELECT COUNT(*) FROM updated)
+    """
+
+
+def update_batch(batch):
+    """Atualiza um lote em sua própria transação.
+
+    `batch` é a tupla `(modelo, início, fim, concurrently)`. Retorna a última
+    chave do lote e as quantidades de linhas lidas e atualizadas.
+    """
+    label, start_pk, end_pk, concurrently = batch
+    model = apps.get_model(label)
+    sql = batch_update_sql(model, SEARCH_VECTOR_FIELDS[model], concurrently)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [start_pk, end_pk])
+        scanned, updated = cursor.fetchone()
+    return end_pk, scanned, updated
 
-from web.datasets.models import File
+
+def batches(model, after_pk, batch_size):
+    """Gera os intervalos `(início, fim]` de chaves com `batch_size` linhas."""
+    pks = model.objects.order_by("pk").values_list("pk", flat=True)
+    while True:
+        remaining = pks.filter(pk__gt=after_pk)
+        end_pk = remaining[batch_size - 1 : batch_size].first()
+        if end_pk is None:
+            end_pk = remaining.aggregate(last=Max("pk"))["last"]
+            if end_pk is None:
+                return
+        yield after_pk, end_pk
+        after_pk = end_pk
 
 
 class Command(BaseCommand):
     help = """Remonta os indices de busca em caso de problemas
-            com a geração de índice via trigger."""
+            com a geração de índice via trigger.
+
+    Apenas vetores nulos ou desatualizados são gravados, em lotes com uma
+    transação cada. O progresso é salvo após cada lote para que uma execução
+    interrompida continue de onde parou."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Quantidade de linhas por lote.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Quantidade de processos atualizando lotes simultaneamente.",
+        )
+        parser.add_argument(
+            "--concurrently",
+            action="store_true",
+            help="Pula linhas bloqueadas para não travar o crawler.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=f"{Path.cwd()}/data/searchvector.checkpoint",
+            help="Arquivo onde o último lote processado é salvo.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignora o progresso salvo e começa do início.",
+        )
 
     def echo(self, text, style=None):
         self.stdout.write(style(text) if style else text)
 
-    def handle(self, *args, **options):
-        file_count = File.objects.count()
+    def save_checkpoint(self, progress):
+        self.checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        self.checkpoint.write_text(json.dumps(progress))
+
+    def rebuild(self, model, after_pk, progress, options):
+        label = model._meta.label
+        total = model.objects.filter(pk__gt=after_pk).count()
         self.echo(
-            f"Criando um vetor de busca para os arquivos. "
-            f"Total de itens: {file_count:,}",
+            f"Criando um vetor de busca para {model._meta.verbose_name_plural}. "
+            f"Total de itens: {total:,}",
             self.style.SUCCESS,
         )
         self.echo("Aguarde...", self.style.SUCCESS)
 
-        search_vector = SearchVector("content", config="portuguese")
+        to_update = (
+            (label, start_pk, end_pk, options["concurrently"])
+            for start_pk, end_pk in batches(model, after_pk, options["batch_size"])
+        )
+        if self.pool:
+            results = self.pool.imap(update_batch, list(to_update))
+        else:
+            results = map(update_batch, to_update)
+
+        started_at, scanned, updated = time.monotonic(), 0, 0
+        for end_pk, batch_scanned, batch_updated in results:
+            scanned += batch_scanned
+            updated += batch_updated
+            progress[label] = end_pk
+            self.save_checkpoint(progress)
+
+            elapsed = time.monotonic() - started_at
+            eta = elapsed / scanned * max(total - scanned, 0) if scanned else 0
+            self.echo(
+                f"{scanned:,}/{total:,} itens verificados, {updated:,} "
+                f"atualizados (restante: {timedelta(seconds=round(eta))})"
+            )
+
+    def handle(self, *args, **options):
+        self.checkpoint = Path(options["checkpoint"])
+        progress = {}
+        if self.checkpoint.exists() and not options["restart"]:
+            progress = json.loads(self.checkpoint.read_text() or "{}")
+            self.echo("Retomando a partir do progresso salvo.")
+
+        self.pool = None
+        if options["workers"] > 1:
+            # os processos são criados aqui, sem herdar conexões abertas, e
+            # cada um abre a sua própria conexão com o banco
+            connections.close_all()
+            self.pool = Pool(options["workers"])
 
-        File.objects.update(search_vector=search_vector)
+        try:
+            for model in SEARCH_VECTOR_FIELDS:
+                after_pk = progress.get(model._meta.label, 0)
+                self.rebuild(model, after_pk, progress, options)
+        finally:
+            if self.pool:
+                self.pool.close()
+                self.pool.join()
 
+        if self.checkpoint.exists():
+            self.checkpoint.unlink()
         self.echo("Pronto!", self.style.SUCCESS)
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.10 on 2026-10-18 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("datasets", "0031_citycouncilagenda_git_commit_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="file",
+            name="checksum",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=128, null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 4.1.10 on 2026-10-18 20:25
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_COLUMNS = {
+    "datasets_citycouncilbid": ["description"],
+    "datasets_citycouncilcontract": ["description", "details", "company_or_person"],
+    "datasets_citycouncilexpense": ["summary", "company_or_person"],
+    "datasets_cityhallbid": ["description", "codes"],
+    "datasets_gazetteevent": ["title", "secretariat", "summary"],
+}
+
+
+def search_vector_trigger(table, columns):
+    return migrations.RunSQL(
+        sql=f"""
+        CREATE TRIGGER search_vector_update BEFORE INSERT OR UPDATE
+        ON {table} FOR EACH ROW EXECUTE PROCEDURE
+        tsvector_update_trigger(
+            search_vector, 'pg_catalog.portuguese', {', '.join(columns)}
+        );
+        """,
+        reverse_sql=f"DROP TRIGGER IF EXISTS search_vector_update ON {table};",
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("datasets", "0032_alter_file_checksum"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="citycouncilbid",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="citycouncilcontract",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="citycouncilexpense",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="cityhallbid",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="gazetteevent",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="citycouncilbid",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="datasets_ci_search__f7c4fd_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="citycouncilcontract",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="datasets_ci_search__216c8b_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="citycouncilexpense",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="datasets_ci_search__ee868a_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cityhallbid",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="datasets_ci_search__e87385_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gazetteevent",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="datasets_ga_search__f2d53b_gin"
+            ),
+        ),
+    ] + [
+        search_vector_trigger(table, columns)
+        for table, columns in SEARCH_VECTOR_COLUMNS.items()
+    ]
@@ -0,0 +1,208 @@
+# Generated by Django 4.1.10 on 2026-10-18 20:54
+
+from django.db import migrations, models
+
+
+def summary_pending_triggers(source, summary, column):
+    """Anota em `<resumo>_pending` os meses alterados na tabela de origem.
+
+    As triggers são por comando (`FOR EACH STATEMENT`), então uma carga em
+    lote anota cada mês uma única vez. Os meses já existentes são anotados
+    para que a primeira atualização preencha o resumo.
+    """
+    pending = f"{summary}_pending"
+    function = f"{source}_summary_pending"
+    month = f"date_trunc('month', {column})::date"
+    return migrations.RunSQL(
+        sql=f"""
+        CREATE TABLE {pending} (month date);
+
+        CREATE FUNCTION {function}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                INSERT INTO {pending} SELECT DISTINCT {month} FROM old_rows;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {pending} SELECT DISTINCT {month} FROM new_rows;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER summary_pending_insert AFTER INSERT ON {source}
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE {function}();
+        CREATE TRIGGER summary_pending_update AFTER UPDATE ON {source}
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE {function}();
+        CREATE TRIGGER summary_pending_delete AFTER DELETE ON {source}
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE {function}();
+
+        INSERT INTO {pending} SELECT DISTINCT {month} FROM {source};
+        """,
+        reverse_sql=f"""
+        DROP TRIGGER IF EXISTS summary_pending_insert ON {source};
+        DROP TRIGGER IF EXISTS summary_pending_update ON {source};
+        DROP TRIGGER IF EXISTS summary_pending_delete ON {source};
+        DROP FUNCTION IF EXISTS {function}();
+        DROP TABLE IF EXISTS {pending};
+        """,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("datasets", "0033_search_vectors"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CityCouncilExpenseSummary",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "month",
+                    models.DateField(db_index=True, null=True, verbose_name="Mês"),
+                ),
+                (
+                    "total",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=20, verbose_name="Total"
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(verbose_name="Quantidade")),
+                (
+                    "phase",
+                    models.CharField(
+                        choices=[
+                            ("empenho", "Empenho"),
+                            ("liquidacao", "Liquidação"),
+                            ("pagamento", "Pagamento"),
+                        ],
+                        db_index=True,
+                        max_length=20,
+                        verbose_name="Fase",
+                    ),
+                ),
+                (
+                    "company_or_person",
+                    models.TextField(
+                        blank=True,
+                        db_index=True,
+                        null=True,
+                        verbose_name="Empresa ou pessoa",
+                    ),
+                ),
+                (
+                    "document",
+                    models.CharField(
+                        blank=True,
+                        db_index=True,
+                        max_length=50,
+                        null=True,
+                        verbose_name="CNPJ ou CPF",
+                    ),
+                ),
+                (
+                    "function",
+                    models.CharField(
+                        blank=True, max_length=50, null=True, verbose_name="Função"
+                    ),
+                ),
+                (
+                    "modality",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("convenio", "Convênio"),
+                            ("tomada_de_precos", "Tomada de Preço"),
+                            ("pregao", "Pregão"),
+                            ("inexigibilidade", "Inexigibilidade"),
+                            ("convite", "Convite"),
+                            ("concorrencia", "Concorrência"),
+                            ("dispensa", "Dispensa"),
+                            ("isento", "Isento"),
+                        ],
+                        max_length=50,
+                        null=True,
+                        verbose_name="Modalidade",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Câmara de Vereadores - Resumo de Despesas",
+                "verbose_name_plural": "Câmara de Vereadores - Resumos de Despesas",
+                "ordering": [
+                    models.OrderBy(models.F("month"), descending=True, nulls_last=True)
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="CityCouncilRevenueSummary",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "month",
+                    models.DateField(db_index=True, null=True, verbose_name="Mês"),
+                ),
+                (
+                    "total",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=20, verbose_name="Total"
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(verbose_name="Quantidade")),
+                (
+                    "revenue_type",
+                    models.CharField(
+                        choices=[
+                            ("orcamentaria", "Orçamentária"),
+                            ("nao_orcamentaria", "Não-orçamentária"),
+                            ("transferencia", "Transferência"),
+                        ],
+                        db_index=True,
+                        max_length=20,
+                        verbose_name="Tipo da receita",
+                    ),
+                ),
+                (
+                    "modality",
+                    models.CharField(
+                        blank=True, max_length=60, null=True, verbose_name="Modalidade"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Câmara de Vereadores - Resumo de Receitas",
+                "verbose_name_plural": "Câmara de Vereadores - Resumos de Receitas",
+                "ordering": [
+                    models.OrderBy(models.F("month"), descending=True, nulls_last=True)
+                ],
+            },
+        ),
+        summary_pending_triggers(
+            "datasets_citycouncilexpense", "datasets_citycouncilexpensesummary", "date"
+        ),
+        summary_pending_triggers(
+            "datasets_citycouncilrevenue",
+            "datasets_citycouncilrevenuesummary",
+            "published_at",
+        ),
+    ]
@@ -0,0 +1,188 @@
+# Generated by Django 4.1.10 on 2026-10-18 21:05
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+HISTORICAL_MODELS = (
+    "CityCouncilAttendanceList",
+    "CityCouncilBid",
+    "CityCouncilContract",
+    "CityCouncilExpense",
+    "CityCouncilRevenue",
+)
+BATCH_SIZE = 1000
+
+
+def convert_history(apps, schema_editor):
+    """Converte os registros completos do `simple_history` em diferenças.
+
+    Registros históricos sem alterações (ex.: salvamentos repetidos do
+    crawler) são descartados.
+    """
+    Change = apps.get_model("datasets", "Change")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    for name in HISTORICAL_MODELS:
+        historical = apps.get_model("datasets", f"Historical{name}")
+        content_type, _ = ContentType.objects.get_or_create(
+            app_label="datasets", model=name.lower()
+        )
+        fields = [
+            field
+            for field in historical._meta.concrete_fields
+            if not field.name.startswith("history_")
+            and field.name not in ("id", "updated_at")
+        ]
+
+        changes, before, previous_id = [], None, None
+        rows = historical.objects.order_by("id", "history_date", "history_id")
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            values = {
+                field.attname: field.get_prep_value(getattr(row, field.attname))
+                for field in fields
+            }
+            if row.id != previous_id:
+                before = None
+            if row.history_type == "+":
+                diff = {}
+            elif row.history_type == "-":
+                diff = {attname: [value, None] for attname, value in values.items()}
+            elif before is None:
+                diff = None  # sem o estado anterior não há o que comparar
+            else:
+                diff = {
+                    attname: [before[attname], value]
+                    for attname, value in values.items()
+                    if before[attname] != value
+                }
+            if diff or (diff is not None and row.history_type != "~"):
+                changes.append(
+                    Change(
+                        content_type=content_type,
+                        object_id=row.id,
+                        changed_at=row.history_date,
+                        change_type=row.history_type,
+                        changes=diff,
+                        user_id=row.history_user_id,
+                    )
+                )
+            previous_id, before = row.id, values
+            if len(changes) >= BATCH_SIZE:
+                Change.objects.bulk_create(changes)
+                changes = []
+        Change.objects.bulk_create(changes)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("datasets", "0034_spending_summaries"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Change",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                (
+                    "changed_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Alterado em"
+                    ),
+                ),
+                (
+                    "change_type",
+                    models.CharField(
+                        choices=[
+                            ("+", "Criação"),
+                            ("~", "Alteração"),
+                            ("-", "Remoção"),
+                        ],
+                        max_length=1,
+                        verbose_name="Tipo",
+                    ),
+                ),
+                (
+                    "changes",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        verbose_name="Alterações",
+                    ),
+                ),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Alteração",
+                "verbose_name_plural": "Alterações",
+                "ordering": ["-changed_at", "-id"],
+                "get_latest_by": ["changed_at", "id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(
+                fields=["content_type", "object_id", "changed_at"],
+                name="datasets_ch_content_4cca71_idx",
+            ),
+        ),
+        migrations.RunPython(convert_history, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="historicalcitycouncilbid",
+            name="history_user",
+        ),
+        migrations.RemoveField(
+            model_name="historicalcitycouncilcontract",
+            name="history_user",
+        ),
+        migrations.RemoveField(
+            model_name="historicalcitycouncilexpense",
+            name="history_user",
+        ),
+        migrations.RemoveField(
+            model_name="historicalcitycouncilrevenue",
+            name="history_user",
+        ),
+        migrations.DeleteModel(
+            name="HistoricalCityCouncilAttendanceList",
+        ),
+        migrations.DeleteModel(
+            name="HistoricalCityCouncilBid",
+        ),
+        migrations.DeleteModel(
+            name="HistoricalCityCouncilContract",
+        ),
+        migrations.DeleteModel(
+            name="HistoricalCityCouncilExpense",
+        ),
+        migrations.DeleteModel(
+            name="HistoricalCityCouncilRevenue",
+        ),
+    ]
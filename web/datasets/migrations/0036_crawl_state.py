@@ -0,0 +1,49 @@
+# Generated by Django 4.1.10 on 2026-10-18 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("datasets", "0035_diff_history"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CrawlState",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Criado em"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Atualizado em"),
+                ),
+                ("spider", models.CharField(max_length=100, verbose_name="Coletor")),
+                (
+                    "request_fingerprint",
+                    models.CharField(max_length=40, verbose_name="Requisição"),
+                ),
+                ("url", models.TextField(verbose_name="URL")),
+                (
+                    "fingerprint",
+                    models.CharField(max_length=255, verbose_name="Impressão digital"),
+                ),
+            ],
+            options={
+                "verbose_name": "Estado da coleta",
+                "verbose_name_plural": "Estados da coleta",
+                "unique_together": {("spider", "request_fingerprint")},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.10 on 2026-10-18 21:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("datasets", "0036_crawl_state"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="crawlstate",
+            name="etag",
+            field=models.CharField(blank=True, max_length=255, verbose_name="ETag"),
+        ),
+        migrations.AddField(
+            model_name="crawlstate",
+            name="last_modified",
+            field=models.CharField(
+                blank=True, max_length=255, verbose_name="Last-Modified"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="crawlstate",
+            name="fingerprint",
+            field=models.CharField(
+                blank=True, max_length=255, verbose_name="Impressão digital"
+            ),
+        ),
+    ]
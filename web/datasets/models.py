@@ -1,14 +1,20 @@
 from datetime import date, datetime, timedelta
+from zlib import crc32
 
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.postgres.indexes import GinIndex
 from django.contrib.postgres.search import SearchVectorField
-from django.db import models
-from django.db.models import F
-from simple_history.models import HistoricalRecords
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
 
 from scraper.spiders.utils import get_git_commit
+from web.datasets.history import CHANGED, CREATED, DELETED, DiffHistory
 
 CITY_COUNCIL_EVENT_TYPE = (
     ("sessao_ordinaria", "Sessão Ordinária"),
@@ -56,6 +62,19 @@ SYNC_SOURCE = (
 )
 
 
+class FileQuerySet(models.QuerySet):
+    def with_content(self):
+        """Inclui o conteúdo e o vetor de busca, omitidos por padrão."""
+        return self.defer(None)
+
+
+class FileManager(models.Manager.from_queryset(FileQuerySet)):
+    def get_queryset(self):
+        # o conteúdo extraído pode ter centenas de KB por arquivo e quase
+        # nunca é exibido, então só é buscado quando usado
+        return super().get_queryset().defer("content", "search_vector")
+
+
 class File(models.Model):
     created_at = models.DateTimeField("Criado em", auto_now_add=True)
     updated_at = models.DateTimeField("Atualizado em", auto_now=True)
@@ -64,7 +83,7 @@ class File(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField(db_index=True)
     content_object = GenericForeignKey("content_type", "object_id")
-    checksum = models.CharField(max_length=128, null=True, blank=True)
+    checksum = models.CharField(max_length=128, null=True, blank=True, db_index=True)
     s3_url = models.URLField("URL externa", max_length=600, null=True, blank=True)
     s3_file_path = models.CharField(
         "Caminho interno", max_length=400, null=True, blank=True
@@ -79,6 +98,8 @@ class File(models.Model):
 
     search_vector = SearchVectorField(null=True, editable=False)
 
+    objects = FileManager()
+
     class Meta:
         verbose_name = "Arquivo"
         verbose_name_plural = "Arquivos"
@@ -94,6 +115,38 @@ class File(models.Model):
         return f"Arquivo {self.original_filename} ({self.pk}) de {obj_label}"
 
 
+class Change(models.Model):
+    """Alteração de um registro: apenas os campos alterados são guardados."""
+
+    CHANGE_TYPES = (
+        (CREATED, "Criação"),
+        (CHANGED, "Alteração"),
+        (DELETED, "Remoção"),
+    )
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey("content_type", "object_id")
+    changed_at = models.DateTimeField("Alterado em", default=timezone.now)
+    change_type = models.CharField("Tipo", max_length=1, choices=CHANGE_TYPES)
+    changes = models.JSONField(
+        "Alterações", default=dict, encoder=DjangoJSONEncoder
+    )  # {campo: [valor anterior, valor novo]}
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL
+    )
+
+    class Meta:
+        verbose_name = "Alteração"
+        verbose_name_plural = "Alterações"
+        get_latest_by = ["changed_at", "id"]
+        ordering = ["-changed_at", "-id"]
+        indexes = [models.Index(fields=["content_type", "object_id", "changed_at"])]
+
+    def __str__(self):
+        obj_label = f"{self.content_type} ({self.object_id})"
+        return f"{self.get_change_type_display()} de {obj_label}"
+
+
 class DatasetMixin(models.Model):
     created_at = models.DateTimeField("Criado em", auto_now_add=True)
     updated_at = models.DateTimeField("Atualizado em", auto_now=True)
@@ -177,7 +230,7 @@ class CityCouncilAttendanceList(DatasetMixin):
     description = models.CharField("Descrição", max_length=200, null=True, blank=True)
     council_member = models.CharField("Vereador", max_length=200, db_index=True)
     status = models.CharField("Situação", max_length=20, choices=STATUS, db_index=True)
-    history = HistoricalRecords()
+    history = DiffHistory()
 
     class Meta:
         verbose_name = "Câmara de Vereadores - Lista de Presença"
@@ -221,12 +274,14 @@ class CityCouncilContract(DatasetMixin):
     end_date = models.DateField("Data final", db_index=True)
     excluded = models.BooleanField("Excluído?", default=False)
     files = GenericRelation(File)
-    history = HistoricalRecords()
+    search_vector = SearchVectorField(null=True, editable=False)
+    history = DiffHistory(excluded_fields=["search_vector"])
 
     class Meta:
         verbose_name = "Câmara de Vereadores - Contrato"
         verbose_name_plural = "Câmara de Vereadores - Contratos"
         get_latest_by = "start_date"
+        indexes = [GinIndex(fields=["search_vector"])]
         ordering = ["-start_date"]
 
     def __repr__(self):
@@ -308,12 +363,14 @@ class CityCouncilExpense(DatasetMixin):
         blank=True,
         db_index=True,
     )
-    history = HistoricalRecords()
+    search_vector = SearchVectorField(null=True, editable=False)
+    history = DiffHistory(excluded_fields=["search_vector"])
 
     class Meta:
         verbose_name = "Câmara de Vereadores - Despesa"
         verbose_name_plural = "Câmara de Vereadores - Despesas"
         get_latest_by = "date"
+        indexes = [GinIndex(fields=["search_vector"])]
         ordering = ["-date"]
 
     def __repr__(self):
@@ -389,10 +446,12 @@ class GazetteEvent(DatasetMixin):
     published_on = models.CharField(
         "Publicado em", max_length=100, null=True, blank=True
     )
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = "Diário Oficial - Evento"
         verbose_name_plural = "Diário Oficial - Eventos"
+        indexes = [GinIndex(fields=["search_vector"])]
 
     def __repr__(self):
         gazette_info = f"{self.gazette.power} {self.gazette.year_and_edition}"
@@ -413,11 +472,13 @@ class CityHallBid(DatasetMixin):
     )
     codes = models.CharField("Códigos", max_length=300, db_index=True)
     files = GenericRelation(File)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = "Prefeitura - Licitação"
         verbose_name_plural = "Prefeitura - Licitações"
         get_latest_by = "session_at"
+        indexes = [GinIndex(fields=["search_vector"])]
         ordering = [F("session_at").desc(nulls_last=True)]
 
     def __repr__(self):
@@ -482,12 +543,14 @@ class CityCouncilBid(DatasetMixin):
     session_at = models.DateTimeField("Sessão Data / Horário", null=True, db_index=True)
     excluded = models.BooleanField("Excluído?", default=False)
     files = GenericRelation(File)
-    history = HistoricalRecords()
+    search_vector = SearchVectorField(null=True, editable=False)
+    history = DiffHistory(excluded_fields=["search_vector"])
 
     class Meta:
         verbose_name = "Câmara de Vereadores - Licitação"
         verbose_name_plural = "Câmara de Vereadores - Licitações"
         get_latest_by = "session_at"
+        indexes = [GinIndex(fields=["search_vector"])]
         ordering = [F("session_at").desc(nulls_last=True)]
 
     def __repr__(self):
@@ -520,7 +583,7 @@ class CityCouncilRevenue(DatasetMixin):
     )
     destination = models.CharField("Destinação", max_length=200, null=True, blank=True)
     excluded = models.BooleanField("Excluído?", default=False)
-    history = HistoricalRecords()
+    history = DiffHistory()
 
     class Meta:
         verbose_name = "Câmara de Vereadores - Receita"
@@ -537,6 +600,116 @@ class CityCouncilRevenue(DatasetMixin):
         return f"{model_name} {self.published_at} {self.modality} {self.value}"
 
 
+class SummaryMixin(models.Model):
+    """Totais mensais de um dataset, agrupados por `dimensions`.
+
+    As triggers da tabela de origem anotam os meses alterados na tabela
+    `<tabela do resumo>_pending` e `refresh` recalcula apenas esses meses.
+    Itens excluídos não entram nos totais.
+    """
+
+    month = models.DateField("Mês", null=True, db_index=True)
+    total = models.DecimalField("Total", max_digits=20, decimal_places=2)
+    count = models.PositiveIntegerField("Quantidade")
+
+    source = None
+    date_field = None
+    dimensions = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def pending_months(cls):
+        """Remove e retorna os meses anotados pelas triggers."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {cls._meta.db_table}_pending RETURNING month")
+            return {month for month, in cursor.fetchall()}
+
+    @classmethod
+    def refresh(cls):
+        """Recalcula os meses alterados e retorna quantos foram recalculados."""
+        with transaction.atomic():
+            # atualizações simultâneas do mesmo mês duplicariam as linhas
+            with connection.cursor() as cursor:
+                lock = crc32(cls._meta.db_table.encode())
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [lock])
+            months = cls.pending_months()
+            if not months:
+                return 0
+
+            stale, in_months = Q(), Q()
+            for month in months:
+                if month is None:
+                    stale |= Q(month__isnull=True)
+                    in_months |= Q(**{f"{cls.date_field}__isnull": True})
+                else:
+                    end = month + relativedelta(months=1)
+                    stale |= Q(month=month)
+                    in_months |= Q(
+                        **{
+                            f"{cls.date_field}__gte": month,
+                            f"{cls.date_field}__lt": end,
+                        }
+                    )
+
+            cls.objects.filter(stale).delete()
+            totals = (
+                cls.source.objects.filter(in_months, excluded=False)
+                .annotate(month=TruncMonth(cls.date_field))
+                .order_by()
+                .values("month", *cls.dimensions)
+                .annotate(total=Sum("value"), count=Count("pk"))
+            )
+            cls.objects.bulk_create(cls(**row) for row in totals)
+        return len(months)
+
+
+class CityCouncilExpenseSummary(SummaryMixin):
+    phase = models.CharField(
+        "Fase", max_length=20, choices=CityCouncilExpense.PHASE, db_index=True
+    )
+    company_or_person = models.TextField(
+        "Empresa ou pessoa", null=True, blank=True, db_index=True
+    )
+    document = models.CharField(
+        "CNPJ ou CPF", max_length=50, null=True, blank=True, db_index=True
+    )
+    function = models.CharField("Função", max_length=50, null=True, blank=True)
+    modality = models.CharField(
+        "Modalidade",
+        max_length=50,
+        null=True,
+        blank=True,
+        choices=EXPENSE_MODALITIES,
+    )
+
+    source = CityCouncilExpense
+    date_field = "date"
+    dimensions = ("phase", "company_or_person", "document", "function", "modality")
+
+    class Meta:
+        verbose_name = "Câmara de Vereadores - Resumo de Despesas"
+        verbose_name_plural = "Câmara de Vereadores - Resumos de Despesas"
+        ordering = [F("month").desc(nulls_last=True)]
+
+
+class CityCouncilRevenueSummary(SummaryMixin):
+    revenue_type = models.CharField(
+        "Tipo da receita", choices=REVENUE_TYPES, max_length=20, db_index=True
+    )
+    modality = models.CharField("Modalidade", max_length=60, null=True, blank=True)
+
+    source = CityCouncilRevenue
+    date_field = "published_at"
+    dimensions = ("revenue_type", "modality")
+
+    class Meta:
+        verbose_name = "Câmara de Vereadores - Resumo de Receitas"
+        verbose_name_plural = "Câmara de Vereadores - Resumos de Receitas"
+        ordering = [F("month").desc(nulls_last=True)]
+
+
 class SyncInformation(models.Model):
     created_at = models.DateTimeField("Criado em", auto_now_add=True)
     updated_at = models.DateTimeField("Atualizado em", auto_now=True)
@@ -561,6 +734,37 @@ class SyncInformation(models.Model):
         return f"{self.source.title()} em {created_at_label} para {date_label}"
 
 
+class CrawlState(models.Model):
+    """Estado da última resposta de cada página coletada.
+
+    Usado pelo `CrawlStateMiddleware` (hash do conteúdo) e pelo
+    `ConditionalRequestMiddleware` (`ETag` e `Last-Modified`) para pular as
+    páginas que não mudaram desde a última coleta.
+    """
+
+    created_at = models.DateTimeField("Criado em", auto_now_add=True)
+    updated_at = models.DateTimeField("Atualizado em", auto_now=True)
+    spider = models.CharField("Coletor", max_length=100)
+    request_fingerprint = models.CharField("Requisição", max_length=40)
+    url = models.TextField("URL")
+    fingerprint = models.CharField(
+        "Impressão digital", max_length=255, blank=True
+    )  # hash do conteúdo
+    etag = models.CharField("ETag", max_length=255, blank=True)
+    last_modified = models.CharField("Last-Modified", max_length=255, blank=True)
+
+    class Meta:
+        verbose_name = "Estado da coleta"
+        verbose_name_plural = "Estados da coleta"
+        unique_together = ("spider", "request_fingerprint")
+
+    def __repr__(self):
+        return f"{self.spider} {self.url} {self.fingerprint}"
+
+    def __str__(self):
+        return f"{self.spider}: {self.url}"
+
+
 class TCMBADocument(DatasetMixin):
     class PeriodCategory(models.TextChoices):
         MONTHLY = "mensal", "Mensal"
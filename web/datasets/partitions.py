@@ -0,0 +1,229 @@
+import re
+from datetime import date
+
+from django.db import connection, transaction
+
+from web.datasets.models import Change, CityCouncilExpense, File, GazetteEvent
+
+# tabelas que podem ser particionadas por ano e o campo usado na partição
+PARTITION_KEYS = {
+    CityCouncilExpense: "date",
+    GazetteEvent: "created_at",
+    File: "created_at",
+    Change: "changed_at",
+}
+YEARS_AHEAD = 1
+
+
+class PartitionError(Exception):
+    pass
+
+
+def partition_name(table, year=None):
+    return f"{table}_{year}" if year else f"{table}_default"
+
+
+def retarget(definition, table):
+    """Troca a tabela de uma definição de índice ou de trigger."""
+    return re.sub(r" ON \S+ ", f" ON {table} ", definition, count=1)
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", [table])
+    return cursor.fetchone()[0] == "p"
+
+
+def partitions(cursor, table):
+    """Anos das partições de uma tabela particionada."""
+    cursor.execute(
+        """
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = %s::regclass
+        """,
+        [table],
+    )
+    names = [name for name, in cursor.fetchall()]
+    return sorted(int(name.rsplit("_", 1)[1]) for name in names if name[-1].isdigit())
+
+
+def create_partition(cursor, table, key, year):
+    """Cria a partição de um ano, movendo as linhas dela que estão na padrão.
+
+    As triggers por linha (ex.: `search_vector_update`) ficam em cada
+    partição e são copiadas da partição padrão.
+    """
+    name, default = partition_name(table, year), partition_name(table)
+    start, end = date(year, 1, 1), date(year + 1, 1, 1)
+    in_year = f"{key} >= %s AND {key} < %s"
+    cursor.execute(
+        f"CREATE TABLE {name} (LIKE {table} "
+        "INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)"
+    )
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {default} WHERE {in_year} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        [start, end],
+    )
+    # os limites são literais (o Postgres 11 não aceita expressões como `::date`)
+    cursor.execute(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+        [start.isoformat(), end.isoformat()],
+    )
+    for trigger in row_triggers(cursor, default):
+        cursor.execute(retarget(trigger, name))
+
+
+def row_triggers(cursor, table):
+    cursor.execute(
+        """
+        SELECT pg_get_triggerdef(oid) FROM pg_trigger
+        WHERE tgrelid = %s::regclass AND NOT tgisinternal AND tgtype & 1 = 1
+        """,
+        [table],
+    )
+    return [trigger for trigger, in cursor.fetchall()]
+
+
+def create_future_partitions(model, years_ahead=YEARS_AHEAD):
+    """Cria as partições do ano atual e dos próximos `years_ahead` anos.
+
+    Retorna os anos criados ou `None` se a tabela não é particionada.
+    """
+    table, key = model._meta.db_table, model._meta.get_field(PARTITION_KEYS[model])
+    current = date.today().year
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not is_partitioned(cursor, table):
+            return None
+        existing = partitions(cursor, table)
+        created = []
+        for year in range(current, current + years_ahead + 1):
+            if year not in existing:
+                create_partition(cursor, table, key.column, year)
+                created.append(year)
+    return created
+
+
+def convert(model, years_ahead=YEARS_AHEAD):
+    """Converte uma tabela comum em uma tabela particionada por ano.
+
+    A tabela original é copiada para a nova e removida, em uma transação.
+    O Postgres exige que a chave da partição faça parte da chave primária e
+    das restrições de unicidade, então ela é acrescentada a elas; os demais
+    índices, chaves estrangeiras e triggers são recriados. Linhas com a
+    chave vazia ou fora das partições anuais vão para a partição padrão.
+
+    Retorna os anos das partições criadas ou `None` se a tabela já é
+    particionada.
+    """
+    table = model._meta.db_table
+    pk = model._meta.pk.column
+    key = model._meta.get_field(PARTITION_KEYS[model]).column
+    original = f"{table}_unpartitioned"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # evita "pending trigger events" das chaves estrangeiras adiáveis
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        if is_partitioned(cursor, table):
+            return None
+
+        cursor.execute(
+            "SELECT conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = %s::regclass",
+            [table],
+        )
+        referenced_by = [name for name, in cursor.fetchall()]
+        if referenced_by:
+            raise PartitionError(
+                f"{table} é referenciada por chaves estrangeiras: "
+                f"{', '.join(referenced_by)}"
+            )
+
+        cursor.execute(
+            """
+            SELECT con.conname, con.contype, pg_get_constraintdef(con.oid),
+                ARRAY(
+                    SELECT attname FROM unnest(con.conkey) WITH ORDINALITY k(n, i)
+                    JOIN pg_attribute ON attrelid = con.conrelid AND attnum = k.n
+                    ORDER BY k.i
+                )
+            FROM pg_constraint con
+            WHERE con.conrelid = %s::regclass AND con.contype IN ('u', 'f')
+            """,
+            [table],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT pg_get_indexdef(indexrelid) FROM pg_index
+            WHERE indrelid = %s::regclass AND NOT EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conindid = indexrelid
+            )
+            """,
+            [table],
+        )
+        indexes = [index for index, in cursor.fetchall()]
+        cursor.execute(
+            """
+            SELECT pg_get_triggerdef(oid), tgtype & 1 = 1 FROM pg_trigger
+            WHERE tgrelid = %s::regclass AND NOT tgisinternal
+            """,
+            [table],
+        )
+        triggers = cursor.fetchall()
+        cursor.execute(
+            f"SELECT DISTINCT EXTRACT(YEAR FROM {key})::int FROM {table} "
+            f"WHERE {key} IS NOT NULL"
+        )
+        current = date.today().year
+        years = {year for year, in cursor.fetchall()}
+        years.update(range(current, current + years_ahead + 1))
+
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {original}")
+        cursor.execute(
+            f"CREATE TABLE {table} (LIKE {original} INCLUDING DEFAULTS "
+            f"INCLUDING CONSTRAINTS INCLUDING STORAGE) PARTITION BY RANGE ({key})"
+        )
+        # o padrão da chave primária usa a sequência da tabela original, que
+        # é removida junto com ela
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN {pk} DROP DEFAULT")
+        cursor.execute(
+            f"CREATE TABLE {partition_name(table)} PARTITION OF {table} DEFAULT"
+        )
+        for year in sorted(years):
+            create_partition(cursor, table, key, year)
+
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {original}")
+        cursor.execute(f"DROP TABLE {original}")
+
+        sequence = f"{table}_{pk}_seq"
+        cursor.execute(f"CREATE SEQUENCE {sequence} OWNED BY {table}.{pk}")
+        cursor.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {pk} "
+            f"SET DEFAULT nextval('{sequence}'::regclass)"
+        )
+        cursor.execute(
+            f"SELECT setval('{sequence}', COALESCE(MAX({pk}), 0) + 1, false) "
+            f"FROM {table}"
+        )
+
+        cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({pk}, {key})")
+        for name, kind, definition, columns in constraints:
+            if kind == "u":
+                columns = columns if key in columns else [*columns, key]
+                definition = f"UNIQUE ({', '.join(columns)})"
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+        for index in indexes:
+            cursor.execute(retarget(index, table))
+        # as triggers por linha são criadas depois da cópia para que as linhas
+        # copiadas não passem por elas
+        for partition in [None, *sorted(years)]:
+            name = partition_name(table, partition)
+            for trigger, row_level in triggers:
+                if row_level:
+                    cursor.execute(retarget(trigger, name))
+        for trigger, row_level in triggers:
+            if not row_level:
+                cursor.execute(retarget(trigger, table))
+
+    return sorted(years)
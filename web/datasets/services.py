@@ -1,8 +1,40 @@
+import hashlib
 import os
+from collections import namedtuple
 from pathlib import Path
 
 import boto3
-import requests
+from boto3.s3.transfer import TransferConfig
+
+from web.datasets.http import get_session
+
+CHUNK_SIZE = 8 * 1024 * 1024  # 8MB, tamanho mínimo de uma parte no S3
+
+# até `max_concurrency` partes ficam em memória durante o upload
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=CHUNK_SIZE, multipart_chunksize=CHUNK_SIZE, max_concurrency=4
+)
+
+UploadedFile = namedtuple("UploadedFile", ["url", "file_path", "checksum"])
+
+
+class ChecksumReader:
+    """Envolve um arquivo calculando o SHA-256 do que é lido."""
+
+    __slots__ = ("fileobj", "hash")
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.hash = hashlib.sha256()
+
+    def read(self, size=-1):
+        chunk = self.fileobj.read(size)
+        self.hash.update(chunk)
+        return chunk
+
+    @property
+    def checksum(self):
+        return self.hash.hexdigest()
 
 
 class S3Client:
@@ -14,56 +46,96 @@ class S3Client:
         self.bucket_folder = bucket_folder
         self.bucket_region = bucket_region
 
-    def _upload_to_s3(self, temp_file_path, bucket_file_path):
-        with open(temp_file_path, "rb") as body_file:
-            self.client.put_object(
-                Bucket=self.bucket,
-                Key=bucket_file_path,
-                Body=body_file,
-            )
+    def _upload_to_s3(self, fileobj, bucket_file_path):
+        self.client.upload_fileobj(
+            fileobj, self.bucket, bucket_file_path, Config=TRANSFER_CONFIG
+        )
 
     def upload_file(self, location_or_url, relative_file_path, prefix=""):
+        """Envia um arquivo local ou uma URL para o S3 sem carregá-lo em memória.
+
+        O conteúdo é repassado em partes direto para um upload multipart e o
+        checksum (SHA-256) é calculado durante a transferência. Arquivos
+        locais são apagados após o envio.
+        """
         location = Path(location_or_url)
-        if not location.exists():
-            # se não é um arquivo local, assumimos que é uma url
-            file_name, temp_file_path = self.create_temp_file(
-                location_or_url, relative_file_path, prefix
-            )
+        is_local = location.exists()
+        if is_local:
+            file_name = location.name
         else:
-            file_name, temp_file_path = location.name, str(location)
+            # se não é um arquivo local, assumimos que é uma url
+            file_name = location_or_url[location_or_url.rfind("/") + 1 :]
+        if prefix:
+            file_name = f"{prefix}-{file_name}"
 
         bucket_file_path = f"{self.bucket_folder}/files/{relative_file_path}"
         bucket_file_path = f"{bucket_file_path}{file_name}"
-        url = (
+        url = self.get_url(bucket_file_path)
+
+        if is_local:
+            with open(location, "rb") as local_file:
+                reader = ChecksumReader(local_file)
+                self._upload_to_s3(reader, bucket_file_path)
+            self.delete_temp_file(str(location))
+        else:
+            with get_session().get(location_or_url, stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                reader = ChecksumReader(response.raw)
+                self._upload_to_s3(reader, bucket_file_path)
+
+        return UploadedFile(url, bucket_file_path, reader.checksum)
+
+    def get_url(self, bucket_file_path):
+        return (
             f"https://{self.bucket}.s3.{self.bucket_region}.amazonaws.com/"
             f"{bucket_file_path}"
         )
-        self._upload_to_s3(temp_file_path, bucket_file_path)
-        self.delete_temp_file(temp_file_path)
 
-        return url, bucket_file_path
+    def content_addressed_path(self, checksum, file_name):
+        """Caminho no bucket derivado do checksum do conteúdo do arquivo."""
+        suffix = Path(file_name).suffix.lower()
+        return f"{self.bucket_folder}/files/sha256/{checksum}{suffix}"
+
+    def move_file(self, source_path, target_path):
+        """Move um arquivo dentro do bucket (a cópia é feita pelo S3)."""
+        self.client.copy(
+            {"Bucket": self.bucket, "Key": source_path},
+            self.bucket,
+            target_path,
+            Config=TRANSFER_CONFIG,
+        )
+        self.delete_file(source_path)
+        return self.get_url(target_path)
+
+    def delete_file(self, bucket_file_path):
+        self.client.delete_object(Bucket=self.bucket, Key=bucket_file_path)
 
     @staticmethod
     def create_temp_file(url, relative_file_path="", prefix=""):
         temporary_directory = f"{Path.cwd()}/data/tmp/{relative_file_path}"
         Path(temporary_directory).mkdir(parents=True, exist_ok=True)
 
-        response = requests.get(url)
         start_index = url.rfind("/") + 1
         temp_file_name = f"{url[start_index:]}"
         if prefix:
             temp_file_name = f"{prefix}-{temp_file_name}"
         temp_file_path = f"{temporary_directory}{temp_file_name}"
-        with open(temp_file_path, "wb") as tmp_file:
-            tmp_file.write(response.content)
+        with get_session().get(url, stream=True) as response, open(
+            temp_file_path, "wb"
+        ) as tmp_file:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                tmp_file.write(chunk)
         return temp_file_name, temp_file_path
 
-    def download_file(self, s3_file_path):
+    def download_file(self, s3_file_path, prefix=""):
         temporary_directory = f"{Path.cwd()}/data/tmp/"
         Path(temporary_directory).mkdir(parents=True, exist_ok=True)
 
         start_index = s3_file_path.rfind("/") + 1
         file_name = s3_file_path[start_index:]
+        if prefix:
+            file_name = f"{prefix}-{file_name}"
 
         local_path = f"{temporary_directory}{file_name}"
         with open(local_path, "wb") as file_:
@@ -71,18 +143,31 @@ class S3Client:
 
         return local_path
 
+    def open_file(self, s3_file_path):
+        """Abre um arquivo do S3 para leitura em partes, sem salvá-lo em disco."""
+        response = self.client.get_object(Bucket=self.bucket, Key=s3_file_path)
+        return response["Body"]
+
     @staticmethod
     def delete_temp_file(temp_file_path):
         Path(temp_file_path).unlink()
 
 
 class FakeS3Client(S3Client):
-    def _upload_to_s3(self, temp_file_path, bucket_file_path):
-        pass
+    def _upload_to_s3(self, fileobj, bucket_file_path):
+        while fileobj.read(CHUNK_SIZE):
+            pass
 
-    def download_file(self, s3_file_path):
+    def download_file(self, s3_file_path, prefix=""):
         return f"{Path.cwd()}/data/tmp/{s3_file_path}"
 
+    def open_file(self, s3_file_path):
+        """Abre a cópia local do arquivo (ver `download_file`), se houver."""
+        local_path = Path(self.download_file(s3_file_path))
+        if not local_path.exists():
+            return None
+        return open(local_path, "rb")
+
 
 def get_s3_client(settings):
     if os.getenv("DJANGO_CONFIGURATION") != "Prod":
@@ -1,8 +1,12 @@
+from celery.signals import task_postrun
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from .http import log_pool_stats
 from .models import File
 
+task_postrun.connect(log_pool_stats)
+
 
 @receiver(post_save, sender=File)
 def backup_and_extract_content(sender, instance, **kwargs):
@@ -1,13 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from datetime import datetime
-from logging import info
+from functools import reduce, wraps
+from itertools import cycle
+from logging import info, warning
+from operator import or_
 from pathlib import Path
 from typing import List
+from uuid import uuid4
 
-import requests
 from celery import shared_task
 from dateutil.parser import parse
 from django.conf import settings
 from django.contrib.admin.options import get_content_type_for_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from notifiers import get_notifier
 from requests import HTTPError
 from tika import parser
@@ -18,11 +26,17 @@ from web.datasets.adapters import (
     to_citycouncil_expense,
     to_citycouncil_revenue,
 )
+from web.datasets.bulk import bulk_upsert, natural_key
+from web.datasets.cache import bump_generation, invalidates_cache
+from web.datasets.history import changed_fields
+from web.datasets.http import get_session
 from web.datasets.models import (
     CityCouncilBid,
     CityCouncilContract,
     CityCouncilExpense,
+    CityCouncilExpenseSummary,
     CityCouncilRevenue,
+    CityCouncilRevenueSummary,
     File,
     SyncInformation,
 )
@@ -30,25 +44,58 @@ from web.datasets.services import get_s3_client
 
 client = get_s3_client(settings)
 
+SYNC_BATCH_SIZE = 100
+EXTRACTION_CHUNK_SIZE = 100
+EXTRACTION_WORKERS = 4
+BACKUP_BATCH_SIZE = 500
+
 
 class WebserviceException(Exception):
     pass
 
 
+@shared_task(ignore_result=True)
+def refresh_summaries():
+    """Recalcula os meses alterados dos resumos de despesas e receitas."""
+    for summary in (CityCouncilExpenseSummary, CityCouncilRevenueSummary):
+        months = summary.refresh()
+        if months:
+            info(f"{summary._meta.verbose_name}: {months} meses atualizados")
+
+
+def refreshes_summaries(func):
+    """Agenda a atualização dos resumos após gravar despesas ou receitas.
+
+    A atualização só é agendada depois do commit, quando as triggers já
+    anotaram os meses alterados.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            transaction.on_commit(refresh_summaries.delay)
+
+    return wrapper
+
+
 @shared_task
 def content_from_file(file_pk=None, path=None, keep_file=True):
     if not any([file_pk, path]):
         raise Exception("Ou `file_pk` ou `path` devem ser informados.")
 
-    a_file = None
     if file_pk:
-        a_file = File.objects.get(pk=file_pk)
-
-        if a_file.content is not None:
-            return a_file.content
-
-        path = client.download_file(a_file.s3_file_path)
-        keep_file = False
+        a_file = File.objects.with_content().get(pk=file_pk)
+
+        if a_file.content is None:
+            content = extract_content(a_file)
+            if content is None:
+                return
+            a_file.content = content
+            a_file.save()
+            transaction.on_commit(bump_generation)
+        return a_file.content
 
     if not Path(path).exists():
         info(f"Arquivo {path} não encontrado.")
@@ -59,18 +106,125 @@ def content_from_file(file_pk=None, path=None, keep_file=True):
     if not keep_file:
         Path(path).unlink()
 
-    if a_file:
-        a_file.content = raw["content"] or ""
-        a_file.save()
-        return a_file.content
-
     return raw["content"]
 
 
+def extract_content(a_file, server_endpoint=None):
+    """Extrai o conteúdo de um arquivo do S3 em um servidor Tika.
+
+    O arquivo é repassado do S3 para o Tika em partes, sem passar pelo disco.
+    Retorna `None` se o arquivo não for encontrado.
+    """
+    server_endpoint = server_endpoint or settings.TIKA_SERVER_ENDPOINTS[0]
+    body = client.open_file(a_file.s3_file_path)
+    if body is None:
+        info(f"Arquivo {a_file.s3_file_path} não encontrado.")
+        return None
+    with closing(body):
+        raw = parser.from_buffer(body, serverEndpoint=server_endpoint)
+    return raw["content"] or ""
+
+
+def _extract_or_none(a_file, server_endpoint):
+    try:
+        return extract_content(a_file, server_endpoint)
+    except Exception as error:
+        warning(f"Falha ao extrair conteúdo do arquivo {a_file.pk}: {error}")
+
+
+@invalidates_cache
+def extract_contents_chunk(
+    after_pk=0, chunk_size=EXTRACTION_CHUNK_SIZE, workers=EXTRACTION_WORKERS
+):
+    """Extrai o conteúdo dos próximos arquivos sem conteúdo após `after_pk`.
+
+    Os arquivos são percorridos em ordem de `pk` (paginação por chave), então
+    o último `pk` retornado serve de ponto de partida para o próximo lote.
+    Os downloads e as extrações rodam em paralelo, distribuídos entre os
+    servidores de `TIKA_SERVER_ENDPOINTS`. Arquivos que falharem continuam
+    sem conteúdo.
+
+    Retorna o último `pk` processado e o total de arquivos extraídos, ou
+    `None` quando não há mais arquivos.
+    """
+    files = list(
+        File.objects.filter(
+            pk__gt=after_pk, content__isnull=True, s3_file_path__isnull=False
+        )
+        .only("pk", "s3_file_path", "checksum")
+        .order_by("pk")[:chunk_size]
+    )
+    if not files:
+        return
+
+    # arquivos com o mesmo checksum têm o mesmo conteúdo: ele é reaproveitado
+    # ou extraído apenas uma vez
+    checksums = {a_file.checksum for a_file in files if a_file.checksum}
+    known = dict(
+        File.objects.filter(checksum__in=checksums, content__isnull=False)
+        .values_list("checksum", "content")
+        .distinct("checksum")
+        .order_by("checksum")
+    )
+    to_extract = {}
+    for a_file in files:
+        key = a_file.checksum or a_file.pk
+        if key not in known:
+            to_extract.setdefault(key, a_file)
+
+    endpoints = cycle(settings.TIKA_SERVER_ENDPOINTS)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        contents = executor.map(
+            _extract_or_none,
+            to_extract.values(),
+            [next(endpoints) for _ in to_extract],
+        )
+        known.update(zip(to_extract.keys(), contents))
+
+    now = timezone.now()
+    extracted = []
+    for a_file in files:
+        content = known.get(a_file.checksum or a_file.pk)
+        if content is None:
+            continue
+        a_file.content = content
+        a_file.updated_at = now
+        extracted.append(a_file)
+    File.objects.bulk_update(extracted, ["content", "updated_at"])
+
+    return files[-1].pk, len(extracted)
+
+
+@shared_task(ignore_result=True)
+def extract_contents(
+    after_pk=0, chunk_size=EXTRACTION_CHUNK_SIZE, workers=EXTRACTION_WORKERS
+):
+    """Extrai o conteúdo de todos os arquivos sem conteúdo, um lote por vez.
+
+    Cada lote agenda o próximo a partir do último `pk` processado; para
+    retomar uma execução interrompida basta informar `after_pk`.
+    """
+    result = extract_contents_chunk(after_pk, chunk_size, workers)
+    if result is None:
+        info("Extração de conteúdo finalizada.")
+        return
+    last_pk, extracted = result
+    info(f"Conteúdo extraído de {extracted} arquivos (último pk: {last_pk}).")
+    extract_contents.delay(last_pk, chunk_size, workers)
+
+
+@shared_task
+def backup_files(file_ids):
+    """Agenda o backup e a extração de conteúdo de arquivos salvos sem
+    disparar sinais (ex.: `import --fast`)."""
+    for file_id in file_ids:
+        backup_file.apply_async((file_id,), link=content_from_file.si(file_id))
+
+
 @shared_task
 def backup_file(file_id):
     try:
-        file_obj = File.objects.get(pk=file_id, s3_url__isnull=True)
+        file_obj = File.objects.with_content().get(pk=file_id, s3_url__isnull=True)
     except File.DoesNotExist:
         info(f"O arquivo ({file_id}) não existe ou já possui backup.")
         return
@@ -79,21 +233,35 @@ def backup_file(file_id):
         info(f"O arquivo ({file_id}) não tem URL ou não existe localmente.")
         return
 
-    model_name = file_obj.content_object._meta.model_name
-    relative_file_path = (
-        f"{model_name}/{file_obj.created_at.year}/"
-        f"{file_obj.created_at.month}/{file_obj.created_at.day}/"
-    )
-
+    # o arquivo é enviado para uma área temporária enquanto o checksum é
+    # calculado; depois é descartado (se o conteúdo já existe no bucket) ou
+    # movido para um caminho derivado do checksum
     location = file_obj.local_path or file_obj.url
-    s3_url, s3_file_path = client.upload_file(
-        location, relative_file_path, prefix=file_obj.checksum
+    uploaded = client.upload_file(location, "tmp/", prefix=uuid4().hex)
+
+    same_file = (
+        File.objects.filter(checksum=uploaded.checksum, s3_url__isnull=False)
+        .exclude(pk=file_obj.pk)
+        .only("s3_url", "s3_file_path", "content")
+        .first()
     )
-    file_obj.s3_file_path = s3_file_path
-    file_obj.s3_url = s3_url
+    if same_file:
+        client.delete_file(uploaded.file_path)
+        file_obj.s3_url = same_file.s3_url
+        file_obj.s3_file_path = same_file.s3_file_path
+        if file_obj.content is None:
+            file_obj.content = same_file.content
+    else:
+        s3_file_path = client.content_addressed_path(
+            uploaded.checksum, uploaded.file_path
+        )
+        file_obj.s3_url = client.move_file(uploaded.file_path, s3_file_path)
+        file_obj.s3_file_path = s3_file_path
+
+    file_obj.checksum = uploaded.checksum
     file_obj.save()
 
-    return s3_url
+    return file_obj.s3_url
 
 
 def notify_about_retrieved_city_council_data(response):
@@ -137,13 +305,12 @@ def get_city_council_updates(formatted_date):
         date=target_date, source="camara", defaults={"succeed": False}
     )
 
-    response = requests.get(
+    response = get_session().get(
         settings.CITY_COUNCIL_WEBSERVICE_ENDPOINT,
         params={
             "data": formatted_date,  # formato aaaa-mm-dd
             "token": settings.CITY_COUNCIL_WEBSERVICE_TOKEN,
         },
-        headers={"User-Agent": "Maria Quitéria"},
     )
     try:
         response.raise_for_status()
@@ -168,25 +335,26 @@ def get_city_council_updates(formatted_date):
 
 @shared_task(ignore_result=True)
 def distribute_city_council_objects_to_sync(payload):
-    """Recebe o payload e dispara uma task para cada registro.
+    """Recebe o payload e dispara tasks para os registros em lotes.
 
     O webservice da Câmara retorna uma lista de ações (inserção,
     atualização e deleção) e os registros que sofreram cada uma
-    delas. Essa task executa cada uma de maneira separada para que,
-    caso tenham algum erro, possam ser tratados de maneira separada.
+    delas. Inserções e atualizações são enviadas em lotes de
+    `SYNC_BATCH_SIZE` registros; se um lote falhar, os seus registros
+    são reenviados um a um para que possam ser tratados separadamente.
     """
     action_methods = {
-        "inclusoesContrato": add_citycouncil_contract,
-        "alteracoesContrato": update_citycouncil_contract,
+        "inclusoesContrato": add_citycouncil_contract_batch,
+        "alteracoesContrato": update_citycouncil_contract_batch,
         "exclusoesContrato": remove_citycouncil_contract,
-        "inclusoesLicitacao": add_citycouncil_bid,
-        "alteracoesLicitacao": update_citycouncil_bid,
+        "inclusoesLicitacao": add_citycouncil_bid_batch,
+        "alteracoesLicitacao": update_citycouncil_bid_batch,
         "exclusoesLicitacao": remove_citycouncil_bid,
-        "inclusoesReceita": add_citycouncil_revenue,
-        "alteracoesReceita": update_citycouncil_revenue,
+        "inclusoesReceita": add_citycouncil_revenue_batch,
+        "alteracoesReceita": update_citycouncil_revenue_batch,
         "exclusoesReceita": remove_citycouncil_revenue,
-        "inclusoesDespesa": add_citycouncil_expense,
-        "alteracoesDespesa": update_citycouncil_expense,
+        "inclusoesDespesa": add_citycouncil_expense_batch,
+        "alteracoesDespesa": update_citycouncil_expense_batch,
         "exclusoesDespesa": remove_citycouncil_expense,
     }
     for action_name, records in payload.items():
@@ -195,8 +363,81 @@ def distribute_city_council_objects_to_sync(payload):
         if action_name.startswith("exclusoes"):
             task.delay(records)
         else:
-            for record in records:
-                task.delay(record)
+            for start in range(0, len(records), SYNC_BATCH_SIZE):
+                task.delay(records[start : start + SYNC_BATCH_SIZE])
+
+
+@invalidates_cache
+def sync_citycouncil_records(
+    records, model, adapter, unique_fields, single_task, url_key=None, create=True
+):
+    """Insere (`create=True`) ou atualiza um lote de registros da Câmara.
+
+    Os registros são adaptados em memória, os existentes são buscados com
+    uma única consulta e a escrita é feita em lote. Registros que não podem
+    ser adaptados e registros a serem atualizados que não foram encontrados
+    são reenviados individualmente para `single_task`; se a escrita do lote
+    falhar, todos os registros do lote são reenviados.
+    """
+    items, adapted, invalid = [], [], []
+    for record in records:
+        try:
+            items.append(adapter(record))
+        except Exception as error:
+            warning(f"Falha ao adaptar registro ({error}): {record}")
+            invalid.append(record)
+        else:
+            adapted.append(record)
+    for record in invalid:
+        single_task.delay(record)
+    records = adapted
+    if not records:
+        return []
+
+    try:
+        with transaction.atomic():
+            update_fields = [] if create else sorted(set().union(*items))
+            now = datetime.now()
+            instances = []
+            for item in items:
+                if create:
+                    item["crawled_at"] = now
+                    item["crawled_from"] = settings.CITY_COUNCIL_WEBSERVICE_ENDPOINT
+                instances.append(model(**item))
+
+            saved, _ = bulk_upsert(
+                model, instances, unique_fields, update_fields, create=create
+            )
+
+            objects, missing, files = [], [], []
+            content_type = get_content_type_for_model(model)
+            for record, instance in zip(records, instances):
+                obj = saved.get(natural_key(instance, unique_fields))
+                if obj is None:
+                    missing.append(record)
+                    continue
+                objects.append(obj)
+                if url_key:
+                    files.extend(
+                        (file_[url_key], content_type, obj.pk)
+                        for file_ in record.get("arquivos") or []
+                    )
+
+            from web.datasets.management.commands._file import save_files
+
+            save_files(files)
+    except Exception as error:
+        warning(
+            f"Falha ao sincronizar lote de {len(records)} registros ({error}). "
+            "Reenviando registros individualmente."
+        )
+        for record in records:
+            single_task.delay(record)
+        return []
+
+    for record in missing:
+        single_task.delay(record)
+    return objects
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
@@ -212,6 +453,7 @@ def save_citycouncil_files(files, object, url_key):
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@invalidates_cache
 def add_citycouncil_bid(record):
     new_item = to_citycouncil_bid(record)
     new_item["crawled_at"] = datetime.now()
@@ -224,24 +466,53 @@ def add_citycouncil_bid(record):
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@invalidates_cache
 def update_citycouncil_bid(record):
     bid = CityCouncilBid.objects.get(external_code=record["codLic"])
     updated_item = to_citycouncil_bid(record)
     for key, value in updated_item.items():
         setattr(bid, key, value)
-    bid.save()
+    if changed_fields(bid):
+        bid.save()
     save_citycouncil_files(record.get("arquivos"), bid, "caminhoArqLic")
 
     return bid
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+def add_citycouncil_bid_batch(records):
+    return sync_citycouncil_records(
+        records,
+        CityCouncilBid,
+        to_citycouncil_bid,
+        ("external_code",),
+        add_citycouncil_bid,
+        url_key="caminhoArqLic",
+    )
+
+
+@shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+def update_citycouncil_bid_batch(records):
+    return sync_citycouncil_records(
+        records,
+        CityCouncilBid,
+        to_citycouncil_bid,
+        ("external_code",),
+        update_citycouncil_bid,
+        url_key="caminhoArqLic",
+        create=False,
+    )
+
+
+@shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@invalidates_cache
 def remove_citycouncil_bid(records: List[dict]):
     to_be_removed = [record["codLic"] for record in records]
     CityCouncilBid.objects.filter(external_code__in=to_be_removed).update(excluded=True)
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@invalidates_cache
 def add_citycouncil_contract(record):
     new_item = to_citycouncil_contract(record)
     new_item["crawled_at"] = datetime.now()
@@ -254,18 +525,46 @@ def add_citycouncil_contract(record):
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@invalidates_cache
 def update_citycouncil_contract(record):
     contract = CityCouncilContract.objects.get(external_code=record["codCon"])
     updated_item = to_citycouncil_contract(record)
     for key, value in updated_item.items():
         setattr(contract, key, value)
-    contract.save()
+    if changed_fields(contract):
+        contract.save()
     save_citycouncil_files(record.get("arquivos"), contract, "caminho")
 
     return contract
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+def add_citycouncil_contract_batch(records):
+    return sync_citycouncil_records(
+        records,
+        CityCouncilContract,
+        to_citycouncil_contract,
+        ("external_code",),
+        add_citycouncil_contract,
+        url_key="caminho",
+    )
+
+
+@shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+def update_citycouncil_contract_batch(records):
+    return sync_citycouncil_records(
+        records,
+        CityCouncilContract,
+        to_citycouncil_contract,
+        ("external_code",),
+        update_citycouncil_contract,
+        url_key="caminho",
+        create=False,
+    )
+
+
+@shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@invalidates_cache
 def remove_citycouncil_contract(records: List[dict]):
     to_be_removed = [record["codCon"] for record in records]
     CityCouncilContract.objects.filter(external_code__in=to_be_removed).update(
@@ -274,6 +573,8 @@ def remove_citycouncil_contract(records: List[dict]):
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@refreshes_summaries
+@invalidates_cache
 def add_citycouncil_revenue(record):
     new_item = to_citycouncil_revenue(record)
     new_item["crawled_at"] = datetime.now()
@@ -285,16 +586,46 @@ def add_citycouncil_revenue(record):
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@refreshes_summaries
+@invalidates_cache
 def update_citycouncil_revenue(record):
     revenue = CityCouncilRevenue.objects.get(external_code=record["codLinha"])
     updated_item = to_citycouncil_revenue(record)
     for key, value in updated_item.items():
         setattr(revenue, key, value)
-    revenue.save()
+    if changed_fields(revenue):
+        revenue.save()
     return revenue
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@refreshes_summaries
+def add_citycouncil_revenue_batch(records):
+    return sync_citycouncil_records(
+        records,
+        CityCouncilRevenue,
+        to_citycouncil_revenue,
+        ("external_code",),
+        add_citycouncil_revenue,
+    )
+
+
+@shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@refreshes_summaries
+def update_citycouncil_revenue_batch(records):
+    return sync_citycouncil_records(
+        records,
+        CityCouncilRevenue,
+        to_citycouncil_revenue,
+        ("external_code",),
+        update_citycouncil_revenue,
+        create=False,
+    )
+
+
+@shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@refreshes_summaries
+@invalidates_cache
 def remove_citycouncil_revenue(records: List[dict]):
     to_be_removed = [record["codLinha"] for record in records]
     CityCouncilRevenue.objects.filter(external_code__in=to_be_removed).update(
@@ -303,6 +634,8 @@ def remove_citycouncil_revenue(records: List[dict]):
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@refreshes_summaries
+@invalidates_cache
 def add_citycouncil_expense(record):
     new_item = to_citycouncil_expense(record)
     new_item["crawled_at"] = datetime.now()
@@ -318,6 +651,8 @@ def add_citycouncil_expense(record):
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@refreshes_summaries
+@invalidates_cache
 def update_citycouncil_expense(record):
     expense = CityCouncilExpense.objects.get(
         external_file_code=record["codArquivo"],
@@ -326,13 +661,44 @@ def update_citycouncil_expense(record):
     updated_item = to_citycouncil_expense(record)
     for key, value in updated_item.items():
         setattr(expense, key, value)
-    expense.save()
+    if changed_fields(expense):
+        expense.save()
     return expense
 
 
 @shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@refreshes_summaries
+def add_citycouncil_expense_batch(records):
+    return sync_citycouncil_records(
+        records,
+        CityCouncilExpense,
+        to_citycouncil_expense,
+        ("external_file_code", "external_file_line", "number", "phase"),
+        add_citycouncil_expense,
+    )
+
+
+@shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@refreshes_summaries
+def update_citycouncil_expense_batch(records):
+    return sync_citycouncil_records(
+        records,
+        CityCouncilExpense,
+        to_citycouncil_expense,
+        ("external_file_code", "external_file_line"),
+        update_citycouncil_expense,
+        create=False,
+    )
+
+
+@shared_task(retry_kwargs={"max_retries": 1}, ignore_result=True)
+@refreshes_summaries
+@invalidates_cache
 def remove_citycouncil_expense(records: List[dict]):
-    for record in records:
-        CityCouncilExpense.objects.filter(
-            external_file_code=record["codigo"], external_file_line=record["linha"]
-        ).update(excluded=True)
+    if not records:
+        return
+    to_be_removed = [
+        Q(external_file_code=record["codigo"], external_file_line=record["linha"])
+        for record in records
+    ]
+    CityCouncilExpense.objects.filter(reduce(or_, to_be_removed)).update(excluded=True)
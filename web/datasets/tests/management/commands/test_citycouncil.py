@@ -6,7 +6,9 @@ from django.utils.timezone import make_aware
 from web.datasets.management.commands._citycouncil import (
     save_agenda,
     save_attendance_list,
+    save_attendance_lists,
     save_minute,
+    save_minutes,
 )
 
 
@@ -133,3 +135,61 @@ class TestSaveMinute:
         assert minute.title == item["title"]
         assert minute.event_type == item["event_type"]
         assert minute.crawled_from == item["crawled_from"]
+
+
+@pytest.mark.django_db
+class TestSaveAttendanceLists:
+    def test_save_attendance_lists(self):
+        item = {
+            "date": date(2020, 2, 3),
+            "council_member": "Roberto Luis da Silva Tourinho",
+            "status": "presente",
+            "crawled_at": make_aware(datetime(2020, 3, 21, 7, 15, 17, 276019)),
+            "crawled_from": "https://www.feiradesantana.ba.leg.br/lista/7/03-02-2020",
+        }
+        another_item = {**item, "council_member": "Competente da Silva"}
+
+        attendances = save_attendance_lists([item, another_item])
+
+        assert len(attendances) == 2
+        assert all(attendance.history.count() == 1 for attendance in attendances)
+
+    def test_update_changed_attendance_lists_with_history(self):
+        item = {
+            "date": date(2020, 2, 3),
+            "council_member": "Roberto Luis da Silva Tourinho",
+            "status": "ausente",
+            "crawled_at": make_aware(datetime(2020, 3, 21, 7, 15, 17, 276019)),
+            "crawled_from": "https://www.feiradesantana.ba.leg.br/lista/7/03-02-2020",
+        }
+        attendance = save_attendance_list(item)
+
+        item["status"] = "falta_justificada"
+        updated_attendance = save_attendance_lists([item])[0]
+
+        assert attendance.pk == updated_attendance.pk
+        attendance.refresh_from_db()
+        assert attendance.status == "falta_justificada"
+        assert attendance.history.count() == 2
+
+
+@pytest.mark.django_db
+class TestSaveMinutes:
+    def test_save_minutes(self, mock_backup_file, django_capture_on_commit_callbacks):
+        item = {
+            "crawled_at": make_aware(datetime(2020, 4, 30, 18, 18, 56, 173788)),
+            "crawled_from": "https://www.feiradesantana.ba.leg.br/atas?"
+            "mes=9&ano=2018&Acessar=OK",
+            "date": date(2018, 9, 11),
+            "event_type": None,
+            "files": ["https://www.feiradesantana.ba.leg.br/5eaabb5e91088.pdf"],
+            "title": "Ata da 4ª Reunião para Instalação da Comissão Especial",
+        }
+
+        with django_capture_on_commit_callbacks(execute=True):
+            minutes = save_minutes([item])
+            save_minutes([item])
+
+        assert len(minutes) == 1
+        assert minutes[0].files.count() == 1
+        assert mock_backup_file.call_count == 1
@@ -3,7 +3,7 @@ from datetime import datetime
 import pytest
 from django.utils.timezone import make_aware
 
-from web.datasets.management.commands._cityhall import save_bid
+from web.datasets.management.commands._cityhall import save_bid, save_bids
 
 
 @pytest.mark.django_db
@@ -197,3 +197,61 @@ class TestSaveBid:
         another_bid = save_bid(item)
 
         assert bid.pk != another_bid.pk
+
+
+@pytest.mark.django_db
+class TestSaveBids:
+    def make_item(self, codes, history=None):
+        return {
+            "crawled_at": make_aware(datetime(2020, 4, 4, 14, 29, 49, 261985)),
+            "crawled_from": "http://www.feiradesantana.ba.gov.br/servicos.asp",
+            "session_at": make_aware(datetime(2019, 4, 5, 8, 30)),
+            "public_agency": "PMFS",
+            "description": "Contratação de empresa para prestação de serviços",
+            "codes": codes,
+            "modality": "pregao_eletronico",
+            "history": history or [],
+            "files": ["http://www.feiradesantana.ba.gov.br/servicos.asp?id=2"],
+        }
+
+    def test_save_bids_with_history(
+        self, mock_backup_file, django_capture_on_commit_callbacks
+    ):
+        history = [
+            {
+                "published_at": make_aware(datetime(2019, 4, 4, 16, 20, 0)),
+                "event": "Resposta a pedido de esclarecimento",
+                "url": "http://www.feiradesantana.ba.gov.br/SMS.pdf",
+            },
+            {
+                "published_at": make_aware(datetime(2019, 4, 4, 18, 20, 0)),
+                "event": "Correção de edital",
+                "url": "",
+            },
+        ]
+        items = [
+            self.make_item("Pregão Eletrônico 047-2018", history),
+            self.make_item("Pregão Eletrônico 048-2018"),
+        ]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            bids = save_bids(items)
+
+        assert len(bids) == 2
+        bid = next(bid for bid in bids if bid.codes == items[0]["codes"])
+        assert bid.files.count() == 1
+        assert bid.events.count() == 2
+        assert bid.events.get(summary="Resposta a pedido de esclarecimento").files
+        assert mock_backup_file.call_count == 3
+
+    def test_update_existing_bid(self, mock_backup_file):
+        item = self.make_item("Pregão Eletrônico 047-2018")
+        bid = save_bid(item)
+
+        item["description"] = "Aquisição de arma de flores."
+        updated_bid = save_bids([item])[0]
+
+        assert bid.pk == updated_bid.pk
+        bid.refresh_from_db()
+        assert bid.description == "Aquisição de arma de flores."
+        assert bid.files.count() == 1
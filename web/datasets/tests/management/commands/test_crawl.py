@@ -0,0 +1,79 @@
+import pytest
+from django.core.management import CommandError, call_command
+from scrapy.settings import Settings
+
+from web.datasets.management.commands.crawl import Command
+
+
+class FakeProcess:
+    """Executa o alvo no próprio processo, falhando se ele levantar erros."""
+
+    def __init__(self, target, args):
+        self.target, self.args = target, args
+
+    def start(self):
+        try:
+            self.target(*self.args)
+            self.exitcode = 0
+        except Exception:
+            self.exitcode = 1
+
+    def join(self):
+        pass
+
+
+class FakeSpider:
+    def __init__(self, name):
+        self.name = name
+
+
+@pytest.fixture(autouse=True)
+def project_settings(mocker):
+    return mocker.patch(
+        "web.datasets.management.commands.crawl.get_project_settings",
+        return_value=Settings(),
+    )
+
+
+@pytest.fixture
+def spiders():
+    return [(FakeSpider(name), {}) for name in ("a", "b", "c")]
+
+
+@pytest.mark.django_db
+class TestCrawlCommand:
+    def test_crawl_in_a_single_process_by_default(self, mocker, spiders):
+        mocker.patch.object(Command, "get_spiders", return_value=spiders)
+        crawl = mocker.patch.object(Command, "crawl")
+
+        call_command("crawl")
+
+        assert crawl.call_count == 1
+        assert crawl.call_args[0][0] == spiders
+
+    def test_distribute_spiders_between_workers(self, mocker, spiders):
+        mocker.patch.object(Command, "get_spiders", return_value=spiders)
+        mocker.patch(
+            "web.datasets.management.commands.crawl.Process", side_effect=FakeProcess
+        )
+        crawl = mocker.patch.object(Command, "crawl")
+
+        call_command("crawl", "--workers=2")
+
+        groups = [call[0][0] for call in crawl.call_args_list]
+        assert groups == [[spiders[0], spiders[2]], [spiders[1]]]
+
+    def test_report_failed_workers(self, mocker, spiders):
+        mocker.patch.object(Command, "get_spiders", return_value=spiders)
+        mocker.patch(
+            "web.datasets.management.commands.crawl.Process", side_effect=FakeProcess
+        )
+
+        def crawl(self, group, settings):
+            if spiders[1] in group:
+                raise RuntimeError("falhou")
+
+        mocker.patch.object(Command, "crawl", crawl)
+
+        with pytest.raises(CommandError, match="b"):
+            call_command("crawl", "--workers=3")
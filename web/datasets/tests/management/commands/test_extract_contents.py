@@ -0,0 +1,44 @@
+import pytest
+from django.core.management import call_command
+
+
+class TestExtractContentsCommand:
+    def test_resume_from_checkpoint(self, mocker, tmp_path):
+        chunk = mocker.patch(
+            "web.datasets.management.commands.extract_contents."
+            "extract_contents_chunk",
+            side_effect=[(20, 2), (30, 1), None],
+        )
+        checkpoint = tmp_path / "extract_contents.checkpoint"
+        checkpoint.write_text("10")
+
+        call_command("extract_contents", checkpoint=str(checkpoint), chunk_size=2)
+
+        assert [call.args[0] for call in chunk.call_args_list] == [10, 20, 30]
+        assert not checkpoint.exists()
+
+    def test_save_checkpoint_after_each_chunk(self, mocker, tmp_path):
+        checkpoint = tmp_path / "extract_contents.checkpoint"
+        mocker.patch(
+            "web.datasets.management.commands.extract_contents."
+            "extract_contents_chunk",
+            side_effect=[(20, 2), KeyboardInterrupt],
+        )
+
+        with pytest.raises(KeyboardInterrupt):
+            call_command("extract_contents", checkpoint=str(checkpoint))
+
+        assert checkpoint.read_text() == "20"
+
+    def test_restart_ignores_checkpoint(self, mocker, tmp_path):
+        chunk = mocker.patch(
+            "web.datasets.management.commands.extract_contents."
+            "extract_contents_chunk",
+            return_value=None,
+        )
+        checkpoint = tmp_path / "extract_contents.checkpoint"
+        checkpoint.write_text("10")
+
+        call_command("extract_contents", checkpoint=str(checkpoint), restart=True)
+
+        assert chunk.call_args.args[0] == 0
@@ -6,6 +6,7 @@ from django.utils.timezone import make_aware
 from web.datasets.management.commands._gazette import (
     _extract_date,
     save_gazette,
+    save_gazettes,
     save_legacy_gazette,
 )
 
@@ -74,6 +75,84 @@ class TestSaveGazette:
         assert mock_backup_file.call_count == 1
 
 
+@pytest.mark.django_db
+class TestSaveGazettes:
+    def make_item(self, edition, events=None):
+        return {
+            "date": date(2019, 11, 5),
+            "power": "executivo",
+            "year_and_edition": f"Ano V - Edição Nº {edition}",
+            "crawled_at": make_aware(datetime(2019, 11, 6, 10, 11, 19)),
+            "crawled_from": f"http://www.diariooficial.br/st=1&edicao={edition}",
+            "events": events
+            or [
+                {
+                    "title": "DECRETO INDIVIDUAL Nº 1.294/2019",
+                    "secretariat": "Gabinete do Prefeito",
+                    "summary": "Joãozinho da Silva - NOMEIA",
+                }
+            ],
+            "files": [f"http://www.diariooficial.feira.ba.gov.br/{edition}.pdf"],
+        }
+
+    def test_save_gazettes(self, mock_backup_file, django_capture_on_commit_callbacks):
+        items = [self.make_item(1131), self.make_item(1132)]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            gazettes = save_gazettes(items)
+
+        assert len(gazettes) == 2
+        for gazette in gazettes:
+            assert gazette.pk
+            assert gazette.files.count() == 1
+            assert gazette.events.count() == 1
+        assert mock_backup_file.call_count == 2
+
+    def test_update_existing_gazette_and_add_new_events(
+        self, mock_backup_file, django_capture_on_commit_callbacks
+    ):
+        item = self.make_item(1131)
+        existing = save_gazette(item)
+        mock_backup_file.reset_mock()
+
+        item["crawled_at"] = make_aware(datetime(2020, 1, 1, 0, 0, 0))
+        item["events"].append(
+            {
+                "title": "Outro título aleatório",
+                "secretariat": "Gabinete do Prefeito",
+                "summary": "Joãozinho da Silva - NOMEIA",
+            }
+        )
+        with django_capture_on_commit_callbacks(execute=True):
+            gazettes = save_gazettes([item])
+
+        assert gazettes[0].pk == existing.pk
+        existing.refresh_from_db()
+        assert existing.crawled_at == item["crawled_at"]
+        assert existing.events.count() == 2
+        assert existing.files.count() == 1
+        assert mock_backup_file.called is False
+
+    def test_same_gazette_twice_in_batch(self, mock_backup_file):
+        first = self.make_item(1131)
+        second = self.make_item(
+            1131,
+            events=[
+                {
+                    "title": "Outro título aleatório",
+                    "secretariat": "Gabinete do Prefeito",
+                    "summary": "Joãozinho da Silva - NOMEIA",
+                }
+            ],
+        )
+
+        gazettes = save_gazettes([first, second])
+
+        assert len(gazettes) == 1
+        assert gazettes[0].events.count() == 2
+        assert gazettes[0].files.count() == 1
+
+
 @pytest.mark.django_db
 class TestSaveLegacyGazette:
     def test_save_legacy_gazette(self, mock_backup_file):
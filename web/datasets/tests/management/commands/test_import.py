@@ -0,0 +1,162 @@
+import csv
+
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+
+from web.datasets.cache import get_generation
+from web.datasets.models import CityCouncilRevenue, File
+
+REVENUE_FIELDS = [
+    "CODLINHA",
+    "CODUNIDGESTORA",
+    "DTPUBLICACAO",
+    "DTREGISTRO",
+    "TIPOREC",
+    "MODALIDADE",
+    "DSRECEITA",
+    "VALOR",
+    "FONTE",
+    "DSNATUREZA",
+    "DESTINACAO",
+    "EXCLUIDO",
+]
+
+
+def revenue_row(code, value="1000,00"):
+    return {
+        "CODLINHA": code,
+        "CODUNIDGESTORA": "101",
+        "DTPUBLICACAO": "10/2/2020",
+        "DTREGISTRO": "10/2/2020",
+        "TIPOREC": "ORC",
+        "MODALIDADE": "TRANSFERENCIA",
+        "DSRECEITA": "Repasse do Duodécimo",
+        "VALOR": value,
+        "FONTE": "PREFEITURA",
+        "DSNATUREZA": "Transferência financeira",
+        "DESTINACAO": "",
+        "EXCLUIDO": "N",
+    }
+
+
+def write_csv(path, fieldnames, rows):
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+@pytest.fixture
+def webservice(settings):
+    settings.CITY_COUNCIL_WEBSERVICE = "https://www.feiradesantana.ba.leg.br/"
+
+
+@pytest.mark.django_db
+class TestFastImport:
+    def test_insert_and_update_revenues(self, tmp_path, webservice, capsys):
+        existing = baker.make_recipe("datasets.CityCouncilRevenue", external_code=1)
+        path = write_csv(
+            tmp_path / "receitas.csv",
+            REVENUE_FIELDS,
+            [revenue_row("1", value="42,00"), revenue_row("2"), revenue_row("3")],
+        )
+
+        call_command("import", "citycouncil_revenues", path, "--fast")
+
+        assert CityCouncilRevenue.objects.count() == 3
+        existing.refresh_from_db()
+        assert existing.value == 42
+        assert existing.description == "Repasse do Duodécimo"
+        assert "Salvos: 2 Atualizados: 1 Rejeitados: 0" in capsys.readouterr().out
+        assert not (tmp_path / "receitas-rejeitados.csv").exists()
+
+    def test_do_not_rewrite_unchanged_rows(self, tmp_path, webservice, capsys):
+        path = write_csv(
+            tmp_path / "receitas.csv",
+            REVENUE_FIELDS,
+            [revenue_row("1"), revenue_row("2")],
+        )
+        call_command("import", "citycouncil_revenues", path, "--fast")
+        capsys.readouterr()
+        write_csv(
+            tmp_path / "receitas.csv",
+            REVENUE_FIELDS,
+            [revenue_row("1"), revenue_row("2", value="42,00")],
+        )
+
+        call_command("import", "citycouncil_revenues", path, "--fast")
+
+        assert "Salvos: 0 Atualizados: 1 Rejeitados: 0" in capsys.readouterr().out
+        assert CityCouncilRevenue.objects.get(external_code=2).value == 42
+
+    def test_invalidate_cached_responses(
+        self, tmp_path, webservice, django_capture_on_commit_callbacks
+    ):
+        generation = get_generation()
+        path = write_csv(tmp_path / "receitas.csv", REVENUE_FIELDS, [revenue_row("1")])
+
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command("import", "citycouncil_revenues", path, "--fast")
+
+        assert get_generation() != generation
+
+    def test_keep_last_row_with_the_same_key(self, tmp_path, webservice):
+        path = write_csv(
+            tmp_path / "receitas.csv",
+            REVENUE_FIELDS,
+            [revenue_row("1", value="1,00"), revenue_row("1", value="2,00")],
+        )
+
+        call_command("import", "citycouncil_revenues", path, "--fast")
+
+        assert CityCouncilRevenue.objects.get().value == 2
+
+    def test_write_rejected_rows(self, tmp_path, webservice, capsys):
+        path = write_csv(
+            tmp_path / "receitas.csv",
+            REVENUE_FIELDS,
+            [revenue_row("1"), revenue_row("dois")],
+        )
+
+        call_command("import", "citycouncil_revenues", path, "--fast")
+
+        assert CityCouncilRevenue.objects.count() == 1
+        assert "Salvos: 1 Atualizados: 0 Rejeitados: 1" in capsys.readouterr().out
+        with open(tmp_path / "receitas-rejeitados.csv") as rejected_file:
+            rejected = list(csv.DictReader(rejected_file))
+        assert len(rejected) == 1
+        assert rejected[0]["CODLINHA"] == "dois"
+        assert rejected[0]["erro"]
+
+    def test_schedule_backup_of_inserted_files(self, tmp_path, mock_backup_file):
+        bid = baker.make_recipe("datasets.CityCouncilBid", external_code="214")
+        path = write_csv(
+            tmp_path / "arquivos.csv",
+            ["CODARQLIC", "CODLIC", "CAMINHOARQLIC"],
+            [
+                {
+                    "CODARQLIC": "1396",
+                    "CODLIC": "214",
+                    "CAMINHOARQLIC": "upload/licitacao/edital.pdf",
+                },
+                {
+                    "CODARQLIC": "1397",
+                    "CODLIC": "999",
+                    "CAMINHOARQLIC": "upload/licitacao/outro.pdf",
+                },
+            ],
+        )
+
+        call_command("import", "citycouncil_bid_files", path, "--fast")
+
+        a_file = File.objects.get()
+        assert a_file.content_object == bid
+        assert a_file.external_code == "1396"
+        mock_backup_file.assert_called_once()
+        assert mock_backup_file.call_args[0][0] == (a_file.pk,)
+
+        # arquivos já existentes não são enviados de novo
+        call_command("import", "citycouncil_bid_files", path, "--fast")
+        assert mock_backup_file.call_count == 1
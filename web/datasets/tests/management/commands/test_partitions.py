@@ -0,0 +1,121 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from model_bakery import baker
+
+from web.datasets.models import CityCouncilExpense, CityCouncilExpenseSummary, File
+from web.datasets.partitions import PARTITION_KEYS, is_partitioned, partitions
+
+EXPENSES = CityCouncilExpense._meta.db_table
+
+
+def partition_years(table):
+    with connection.cursor() as cursor:
+        return partitions(cursor, table)
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN {sql}", params)
+        return "\n".join(line for line, in cursor.fetchall())
+
+
+@pytest.mark.django_db
+class TestPartitionsCommand:
+    def make_expense(self, day, **kwargs):
+        return baker.make_recipe(
+            "datasets.CityCouncilExpense",
+            date=day,
+            phase="pagamento",
+            value=Decimal("1.00"),
+            excluded=False,
+            **kwargs,
+        )
+
+    def test_convert_keeps_data_and_prunes_by_date(self, capsys):
+        old = self.make_expense(date(2019, 5, 1), summary="Material de escritório")
+        self.make_expense(date(2021, 5, 1))
+        current = date.today().year
+
+        call_command("partitions", "datasets.CityCouncilExpense", "--convert")
+
+        with connection.cursor() as cursor:
+            assert is_partitioned(cursor, EXPENSES)
+        assert partition_years(EXPENSES) == sorted({2019, 2021, current, current + 1})
+        assert "particionada" in capsys.readouterr().out
+
+        old.refresh_from_db()
+        assert old.summary == "Material de escritório"
+        assert CityCouncilExpense.objects.count() == 2
+
+        plan = explain(CityCouncilExpense.objects.filter(date__year=2019))
+        assert f"{EXPENSES}_2019" in plan
+        assert f"{EXPENSES}_2021" not in plan
+
+    def test_converted_table_keeps_defaults_and_triggers(self):
+        existing = self.make_expense(date(2020, 1, 1))
+        call_command("partitions", "datasets.CityCouncilExpense", "--convert")
+
+        new = self.make_expense(date(2020, 1, 2), summary="Passagens aéreas")
+        new.refresh_from_db()
+
+        assert new.pk > existing.pk
+        assert new.search_vector  # trigger `search_vector_update`
+        CityCouncilExpenseSummary.refresh()  # triggers dos resumos
+        summary = CityCouncilExpenseSummary.objects.get(month=date(2020, 1, 1))
+        assert summary.count == 2
+
+    def test_convert_table_with_unique_constraint(self):
+        baker.make("datasets.File", s3_url="https://example.com/a.pdf", content="a")
+
+        call_command("partitions", "datasets.File", "--convert")
+
+        with connection.cursor() as cursor:
+            assert is_partitioned(cursor, File._meta.db_table)
+        assert File.objects.count() == 1
+
+    def test_create_future_partitions(self, capsys):
+        current = date.today().year
+        call_command("partitions", "datasets.CityCouncilExpense", "--convert")
+        capsys.readouterr()
+        # cai na partição padrão enquanto a do ano não existe
+        future = self.make_expense(date(current + 3, 1, 1))
+
+        call_command("partitions", "datasets.CityCouncilExpense", "--years-ahead=3")
+
+        assert "partições criadas" in capsys.readouterr().out
+        assert partition_years(EXPENSES)[-2:] == [current + 2, current + 3]
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM {EXPENSES}_{current + 3}")
+            assert cursor.fetchall() == [(future.pk,)]
+
+        call_command("partitions", "datasets.CityCouncilExpense", "--years-ahead=3")
+        assert "partições em dia" in capsys.readouterr().out
+
+    def test_without_convert_only_reports_unpartitioned_tables(self, capsys):
+        call_command("partitions", "datasets.CityCouncilExpense")
+
+        assert "não particionada" in capsys.readouterr().out
+        with connection.cursor() as cursor:
+            assert not is_partitioned(cursor, EXPENSES)
+
+    def test_invalid_model(self):
+        with pytest.raises(CommandError):
+            call_command("partitions", "datasets.CityCouncilAgenda")
+
+    def test_convert_all_tables(self):
+        event = baker.make("datasets.GazetteEvent")
+        self.make_expense(date(2020, 1, 1))  # cria também um registro histórico
+
+        call_command("partitions", "--convert")
+
+        with connection.cursor() as cursor:
+            for model in PARTITION_KEYS:
+                assert is_partitioned(cursor, model._meta.db_table)
+        event.refresh_from_db()
+        assert event.gazette_id
+        assert CityCouncilExpense.history.count() == 1
@@ -1,9 +1,32 @@
+import json
 import re
 
 import pytest
+from django.core.management import call_command
+from django.db import connection
 from model_bakery import baker
 
-from web.datasets.management.commands.searchvector import Command
+from web.datasets.management.commands.searchvector import batches
+from web.datasets.models import CityHallBid, GazetteEvent
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    return tmp_path / "searchvector.checkpoint"
+
+
+@pytest.fixture
+def without_triggers():
+    """Desliga as triggers para simular vetores nulos ou desatualizados.
+
+    As triggers voltam a funcionar no rollback da transação do teste.
+    """
+    with connection.cursor() as cursor:
+        for model in [CityHallBid, GazetteEvent]:
+            cursor.execute(
+                f"ALTER TABLE {model._meta.db_table} "
+                "DISABLE TRIGGER search_vector_update"
+            )
 
 
 @pytest.mark.django_db
@@ -18,12 +41,11 @@ class TestCommandHandler:
             ),
         ],
     )
-    def test_handler(self, text, answer, capsys):
+    def test_handler(self, text, answer, capsys, checkpoint):
         gazette = baker.make("datasets.File", content=text)
         assert not gazette.search_vector
 
-        command = Command()
-        command.handle()
+        call_command("searchvector", checkpoint=str(checkpoint))
 
         gazette.refresh_from_db()
 
@@ -32,3 +54,98 @@ class TestCommandHandler:
         assert "Pronto!" in captured.out
 
         assert gazette.search_vector == answer
+        assert not checkpoint.exists()
+
+    def test_rebuild_other_models(self, checkpoint, without_triggers):
+        bid = baker.make_recipe(
+            "datasets.CityHallBid", description="Pavimentação", codes="Pregão 047"
+        )
+        event = baker.make_recipe(
+            "datasets.GazetteEvent", title="Decreto", secretariat=None, summary=None
+        )
+        assert bid.search_vector is None
+
+        call_command("searchvector", checkpoint=str(checkpoint))
+
+        bid.refresh_from_db()
+        event.refresh_from_db()
+        assert "'paviment':1" in bid.search_vector
+        assert "'047':3" in bid.search_vector
+        assert event.search_vector == "'decret':1"
+
+    def test_update_only_null_or_stale_vectors(
+        self, capsys, checkpoint, without_triggers
+    ):
+        bids = baker.make_recipe(
+            "datasets.CityHallBid", description="Merenda", _quantity=3
+        )
+        call_command("searchvector", checkpoint=str(checkpoint))
+        CityHallBid.objects.filter(pk=bids[0].pk).update(description="Fardamento")
+        capsys.readouterr()
+
+        call_command("searchvector", checkpoint=str(checkpoint), concurrently=True)
+
+        captured = capsys.readouterr()
+        assert "3/3 itens verificados, 1 atualizados" in captured.out
+        bids[0].refresh_from_db()
+        assert "'fardament':1" in bids[0].search_vector
+
+    def test_resume_from_checkpoint(self, capsys, checkpoint, without_triggers):
+        bids = baker.make_recipe("datasets.CityHallBid", _quantity=3)
+        checkpoint.write_text(json.dumps({"datasets.CityHallBid": bids[1].pk}))
+
+        call_command("searchvector", checkpoint=str(checkpoint), batch_size=1)
+
+        captured = capsys.readouterr()
+        assert "Retomando a partir do progresso salvo." in captured.out
+        assert "Prefeitura - Licitações. Total de itens: 1" in captured.out
+        vectors = CityHallBid.objects.order_by("pk").values_list(
+            "search_vector", flat=True
+        )
+        assert [vector is not None for vector in vectors] == [False, False, True]
+
+    def test_save_checkpoint_after_each_batch(self, mocker, checkpoint):
+        bids = baker.make_recipe("datasets.CityHallBid", _quantity=3)
+        mocker.patch(
+            "web.datasets.management.commands.searchvector.update_batch",
+            side_effect=[(bids[0].pk, 1, 0), KeyboardInterrupt],
+        )
+        mocker.patch(
+            "web.datasets.management.commands.searchvector.SEARCH_VECTOR_FIELDS",
+            {CityHallBid: ["description"]},
+        )
+
+        with pytest.raises(KeyboardInterrupt):
+            call_command("searchvector", checkpoint=str(checkpoint), batch_size=1)
+
+        assert json.loads(checkpoint.read_text()) == {
+            "datasets.CityHallBid": bids[0].pk
+        }
+
+
+@pytest.mark.django_db
+def test_batches():
+    pks = [bid.pk for bid in baker.make_recipe("datasets.CityHallBid", _quantity=5)]
+
+    assert list(batches(CityHallBid, 0, 2)) == [
+        (0, pks[1]),
+        (pks[1], pks[3]),
+        (pks[3], pks[4]),
+    ]
+    assert list(batches(CityHallBid, pks[4], 2)) == []
+
+
+@pytest.mark.django_db
+def test_search_vector_triggers():
+    event = baker.make_recipe(
+        "datasets.GazetteEvent", title=None, secretariat=None, summary="Servidores"
+    )
+    contract = baker.make_recipe(
+        "datasets.CityCouncilContract", description="Locação", company_or_person="ACME"
+    )
+
+    event.refresh_from_db()
+    contract.refresh_from_db()
+    assert event.search_vector == "'servidor':1"
+    assert "'acme'" in contract.search_vector
+    assert GazetteEvent.objects.filter(search_vector="servidor").exists()
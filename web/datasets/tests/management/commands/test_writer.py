@@ -0,0 +1,203 @@
+from datetime import date, datetime
+
+import pytest
+from django.utils.timezone import make_aware
+from scrapy.settings import Settings
+from scrapy.utils.test import get_crawler
+from twisted.internet.defer import Deferred, maybeDeferred
+
+from scraper.items import CityCouncilAgendaItem, CityCouncilAttendanceListItem
+from scraper.signals import items_not_saved, items_saved
+from web.datasets.management.commands._writer import (
+    BulkItemWriter,
+    ItemWriterPipeline,
+    use_item_writer,
+)
+from web.datasets.models import CityCouncilAttendanceList
+
+
+def attendance_item(council_member):
+    return CityCouncilAttendanceListItem(
+        date=date(2020, 2, 3),
+        council_member=council_member,
+        status="presente",
+        crawled_at=make_aware(datetime(2020, 3, 21, 7, 15, 17)),
+        crawled_from="https://www.feiradesantana.ba.leg.br/lista/7/03-02-2020",
+    )
+
+
+@pytest.mark.django_db
+class TestBulkItemWriter:
+    def test_flush_when_batch_size_is_reached(self):
+        writer = BulkItemWriter(batch_size=2, flush_interval=3600)
+
+        writer.add(attendance_item("Roberto Luis da Silva Tourinho"))
+        assert CityCouncilAttendanceList.objects.count() == 0
+
+        writer.add(attendance_item("Competente da Silva"))
+        assert CityCouncilAttendanceList.objects.count() == 2
+        assert writer.pending == 0
+
+    def test_flush_when_interval_is_reached(self):
+        writer = BulkItemWriter(batch_size=100, flush_interval=0)
+
+        writer.add(attendance_item("Roberto Luis da Silva Tourinho"))
+
+        assert CityCouncilAttendanceList.objects.count() == 1
+
+    def test_flush_saves_pending_items(self):
+        writer = BulkItemWriter(batch_size=100, flush_interval=3600)
+        writer.add(attendance_item("Roberto Luis da Silva Tourinho"))
+
+        writer.flush()
+
+        assert CityCouncilAttendanceList.objects.count() == 1
+        assert writer.pending == 0
+
+    def test_ignore_items_without_save_function(self):
+        writer = BulkItemWriter(batch_size=1)
+
+        writer.add(CityCouncilAgendaItem(title="Ordem do dia"))
+
+        assert writer.pending == 0
+
+    def test_save_items_one_by_one_when_batch_fails(self, mocker):
+        mocker.patch(
+            "web.datasets.management.commands._writer.SAVE_FUNCTIONS",
+            {
+                CityCouncilAttendanceListItem: (
+                    mocker.Mock(side_effect=Exception("falhou")),
+                    mocker.Mock(),
+                )
+            },
+        )
+        from web.datasets.management.commands._writer import SAVE_FUNCTIONS
+
+        save_in_bulk, save_one = SAVE_FUNCTIONS[CityCouncilAttendanceListItem]
+        writer = BulkItemWriter(batch_size=2)
+
+        writer.add(attendance_item("Roberto Luis da Silva Tourinho"))
+        writer.add(attendance_item("Competente da Silva"))
+
+        assert save_in_bulk.call_count == 1
+        assert save_one.call_count == 2
+
+    def test_return_items_not_saved(self, mocker):
+        item, broken = attendance_item("Competente da Silva"), attendance_item("")
+        save_one = mocker.Mock(side_effect=lambda i: i is broken and 1 / 0)
+        writer = BulkItemWriter(
+            save_functions={
+                CityCouncilAttendanceListItem: (
+                    mocker.Mock(side_effect=Exception("falhou")),
+                    save_one,
+                )
+            }
+        )
+        writer.add(item)
+        writer.add(broken)
+
+        assert writer.flush() == [broken]
+
+
+@pytest.fixture
+def write_in_place(mocker):
+    """Grava os lotes na própria thread (e na transação) do teste."""
+    return mocker.patch(
+        "web.datasets.management.commands._writer.deferToThreadPool",
+        side_effect=lambda reactor, pool, func, write, buffers: maybeDeferred(
+            write, buffers
+        ),
+    )
+
+
+def make_pipeline(**kwargs):
+    settings = Settings()
+    use_item_writer(settings, **kwargs)
+    pipeline = ItemWriterPipeline.from_crawler(get_crawler(settings_dict=settings))
+    pipeline.open_spider(spider=None)
+    return pipeline
+
+
+def test_use_item_writer():
+    settings = Settings({"ITEM_PIPELINES": {"scraper.pipelines.Pipeline": 300}})
+
+    use_item_writer(settings, batch_size=10)
+
+    assert settings.getint("ITEM_WRITER_BATCH_SIZE") == 10
+    assert list(settings.getdict("ITEM_PIPELINES")) == [
+        "scraper.pipelines.Pipeline",
+        "web.datasets.management.commands._writer.ItemWriterPipeline",
+    ]
+
+
+@pytest.mark.django_db
+class TestItemWriterPipeline:
+    def test_save_items_in_batches(self, write_in_place):
+        pipeline = make_pipeline(batch_size=2, flush_interval=3600)
+        item = attendance_item("Roberto Luis da Silva Tourinho")
+
+        assert pipeline.process_item(item, spider=None) is item
+        assert CityCouncilAttendanceList.objects.count() == 0
+        pipeline.process_item(attendance_item("Competente da Silva"), spider=None)
+
+        assert CityCouncilAttendanceList.objects.count() == 2
+        assert write_in_place.call_count == 1
+
+    def test_save_pending_items_when_spider_closes(self, write_in_place):
+        pipeline = make_pipeline(batch_size=100, flush_interval=3600)
+        pipeline.process_item(attendance_item("Competente da Silva"), spider=None)
+
+        finished = pipeline.close_spider(spider=None)
+
+        assert finished.called
+        assert CityCouncilAttendanceList.objects.count() == 1
+        assert not pipeline.threadpool.started
+
+    def test_hold_items_while_too_many_batches_are_pending(self, mocker):
+        writes = []
+
+        def defer_write(reactor, pool, func, write, buffers):
+            writes.append(Deferred())
+            return writes[-1]
+
+        mocker.patch(
+            "web.datasets.management.commands._writer.deferToThreadPool",
+            side_effect=defer_write,
+        )
+        pipeline = make_pipeline(batch_size=1, flush_interval=3600, max_pending=1)
+        item = attendance_item("Competente da Silva")
+
+        released = pipeline.process_item(item, spider=None)
+
+        assert isinstance(released, Deferred)
+        assert not released.called
+        writes[0].callback(None)
+        assert released.result is item
+        assert pipeline.in_flight == []
+
+    def test_report_saved_items(self, write_in_place, mocker):
+        mocker.patch(
+            "web.datasets.management.commands._writer.SAVE_FUNCTIONS",
+            {
+                CityCouncilAttendanceListItem: (
+                    mocker.Mock(side_effect=Exception("falhou")),
+                    lambda item: item["council_member"] or 1 / 0,
+                )
+            },
+        )
+        pipeline = make_pipeline(batch_size=2, flush_interval=3600)
+        reports = {}
+
+        def saved(items, spider):
+            reports["saved"] = items
+
+        def not_saved(items, spider):
+            reports["not_saved"] = items
+
+        pipeline.signals.connect(saved, items_saved)
+        pipeline.signals.connect(not_saved, items_not_saved)
+        item, broken = attendance_item("Competente da Silva"), attendance_item("")
+        pipeline.process_item(item, spider=None)
+        pipeline.process_item(broken, spider=None)
+
+        assert reports == {"saved": [item], "not_saved": [broken]}
@@ -0,0 +1,86 @@
+from datetime import date, datetime
+
+import pytest
+from model_bakery import baker
+
+from web.datasets.bulk import bulk_upsert, natural_key
+from web.datasets.models import CityCouncilAgenda, CityHallBid
+
+
+@pytest.mark.django_db
+class TestBulkUpsert:
+    def test_create_new_instances(self):
+        instances = [
+            baker.prepare_recipe("datasets.CityCouncilAgenda", title=title)
+            for title in ["Ordem do dia", "Sessão solene"]
+        ]
+
+        saved, created = bulk_upsert(CityCouncilAgenda, instances, ("date", "title"))
+
+        assert CityCouncilAgenda.objects.count() == 2
+        assert len(created) == 2
+        assert all(instance.pk for instance in saved.values())
+
+    def test_update_existing_instances(self):
+        existing = baker.make_recipe("datasets.CityCouncilAgenda", details="antigo")
+        instance = baker.prepare_recipe("datasets.CityCouncilAgenda", details="novo")
+
+        saved, created = bulk_upsert(
+            CityCouncilAgenda, [instance], ("date", "title"), update_fields=["details"]
+        )
+
+        existing.refresh_from_db()
+        assert created == set()
+        assert existing.details == "novo"
+        assert saved[natural_key(instance, ("date", "title"))].pk == existing.pk
+
+    def test_do_not_update_without_update_fields(self):
+        existing = baker.make_recipe("datasets.CityCouncilAgenda", details="antigo")
+        instance = baker.prepare_recipe("datasets.CityCouncilAgenda", details="novo")
+
+        bulk_upsert(CityCouncilAgenda, [instance], ("date", "title"))
+
+        existing.refresh_from_db()
+        assert existing.details == "antigo"
+
+    def test_deduplicate_instances_with_same_key(self):
+        instances = [
+            baker.prepare_recipe("datasets.CityCouncilAgenda", details=details)
+            for details in ["primeiro", "segundo"]
+        ]
+
+        saved, created = bulk_upsert(CityCouncilAgenda, instances, ("date", "title"))
+
+        assert CityCouncilAgenda.objects.get().details == "segundo"
+        assert len(saved) == len(created) == 1
+
+    def test_match_naive_datetimes_with_stored_values(self):
+        existing = baker.make_recipe(
+            "datasets.CityHallBid",
+            session_at=datetime(2020, 3, 26, 9, 0, 0),
+            public_agency="PMFS",
+            codes="Pregão 1",
+        )
+        instance = baker.prepare_recipe(
+            "datasets.CityHallBid",
+            session_at=datetime(2020, 3, 26, 9, 0, 0),
+            public_agency="PMFS",
+            codes="Pregão 1",
+        )
+
+        _, created = bulk_upsert(
+            CityHallBid, [instance], ("session_at", "public_agency", "codes")
+        )
+
+        assert created == set()
+        assert CityHallBid.objects.get().pk == existing.pk
+
+    def test_empty_list(self):
+        assert bulk_upsert(CityCouncilAgenda, [], ("date",)) == ({}, set())
+
+    def test_natural_key_normalizes_dates(self):
+        agenda = CityCouncilAgenda(date=date(2020, 1, 1), title="Ordem do dia")
+        assert natural_key(agenda, ("date", "title")) == (
+            date(2020, 1, 1),
+            "Ordem do dia",
+        )
@@ -0,0 +1,51 @@
+import pytest
+from django.core.cache import cache
+
+from web.datasets.cache import bump_generation, get_generation, invalidates_cache
+from web.datasets.management.commands._cityhall import save_bids
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def test_generation_starts_when_missing():
+    generation = get_generation()
+
+    assert generation is not None
+    assert get_generation() == generation
+
+
+def test_bump_generation():
+    generation = get_generation()
+
+    assert bump_generation() == generation + 1
+    assert get_generation() == generation + 1
+
+
+@pytest.mark.django_db
+def test_invalidates_cache_after_commit(django_capture_on_commit_callbacks):
+    @invalidates_cache
+    def save():
+        return "salvo"
+
+    generation = get_generation()
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        assert save() == "salvo"
+        assert get_generation() == generation
+
+    assert len(callbacks) == 1
+    assert get_generation() == generation + 1
+
+
+@pytest.mark.django_db
+def test_save_functions_invalidate_cache(
+    mock_backup_file, django_capture_on_commit_callbacks
+):
+    generation = get_generation()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        save_bids([])
+
+    assert get_generation() > generation
@@ -0,0 +1,136 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from model_bakery import baker
+
+from web.datasets.bulk import bulk_upsert
+from web.datasets.history import changed_fields
+from web.datasets.models import Change, CityCouncilAttendanceList, CityCouncilExpense
+
+
+@pytest.mark.django_db
+class TestDiffHistory:
+    def make_expense(self, **kwargs):
+        return baker.make_recipe(
+            "datasets.CityCouncilExpense",
+            date=date(2020, 1, 1),
+            value=Decimal("10.00"),
+            summary="Material de escritório",
+            **kwargs,
+        )
+
+    def test_record_creation_without_values(self):
+        expense = self.make_expense()
+
+        change = expense.history.get()
+        assert change.change_type == "+"
+        assert change.changes == {}
+        assert change.content_object == expense
+
+    def test_record_only_changed_fields(self):
+        expense = self.make_expense()
+
+        expense.value = Decimal("12.50")
+        expense.save()
+
+        change = expense.history.latest()
+        assert change.change_type == "~"
+        assert change.changes == {"value": ["10.00", "12.50"]}
+
+    def test_skip_saves_without_changes(self):
+        expense = self.make_expense()
+
+        expense.value = "10.00"  # mesmo valor, em outro tipo
+        expense.date = "2020-01-01"
+        expense.save()
+        CityCouncilExpense.objects.get(pk=expense.pk).save()
+
+        assert expense.history.count() == 1
+
+    def test_changed_fields(self):
+        expense = self.make_expense()
+        expense.summary = "Passagens aéreas"
+
+        assert changed_fields(expense) == {
+            "summary": ["Material de escritório", "Passagens aéreas"]
+        }
+
+    def test_refresh_from_db_updates_the_snapshot(self):
+        expense = self.make_expense()
+        CityCouncilExpense.objects.filter(pk=expense.pk).update(summary="Outro")
+
+        expense.refresh_from_db()
+        expense.save()
+
+        assert expense.history.count() == 1
+
+    def test_record_deletion_with_previous_values(self):
+        expense = self.make_expense()
+        pk = expense.pk
+
+        expense.delete()
+
+        change = CityCouncilExpense.history.get(object_id=pk, change_type="-")
+        assert change.changes["summary"] == ["Material de escritório", None]
+
+    def test_as_of(self):
+        expense = self.make_expense()
+        created_at = timezone.now()
+        expense.summary = "Passagens aéreas"
+        expense.value = Decimal("12.50")
+        expense.save()
+        changed_at = timezone.now()
+        expense.value = Decimal("15.00")
+        expense.save()
+
+        old = expense.history.as_of(created_at)
+        assert old.summary == "Material de escritório"
+        assert old.value == Decimal("10.00")
+        assert expense.history.as_of(changed_at).value == Decimal("12.50")
+        assert expense.history.as_of(timezone.now()).value == Decimal("15.00")
+
+    def test_as_of_before_creation(self):
+        before = timezone.now()
+        expense = self.make_expense()
+
+        assert expense.history.as_of(before) is None
+
+    def test_as_of_deleted_instance(self):
+        expense = self.make_expense()
+        pk = expense.pk
+        before_deletion = timezone.now()
+        expense.delete()
+
+        assert CityCouncilExpense.history.as_of(timezone.now(), pk=pk) is None
+        old = CityCouncilExpense.history.as_of(before_deletion, pk=pk)
+
+        assert old.pk == pk
+        assert old.summary == "Material de escritório"
+        assert old.date == date(2020, 1, 1)
+
+    def test_bulk_upsert_records_changes(self):
+        existing = baker.make_recipe(
+            "datasets.CityCouncilAttendanceList", status="presente"
+        )
+        instances = [
+            baker.prepare_recipe(
+                "datasets.CityCouncilAttendanceList", status="ausente"
+            ),
+            baker.prepare_recipe(
+                "datasets.CityCouncilAttendanceList",
+                council_member="Fulano",
+                status="presente",
+            ),
+        ]
+
+        bulk_upsert(
+            CityCouncilAttendanceList,
+            instances,
+            ("date", "council_member"),
+            update_fields=["status"],
+        )
+
+        assert existing.history.latest().changes == {"status": ["presente", "ausente"]}
+        assert Change.objects.filter(change_type="+").count() == 2
@@ -0,0 +1,74 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+
+from web.datasets import http
+from web.datasets.http import PooledHTTPAdapter, get_session, log_pool_stats, pool_stats
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def new_session(monkeypatch):
+    monkeypatch.setattr(http, "_session", None)
+    yield
+    if http._session is not None:
+        http._session.close()
+
+
+@pytest.fixture
+def server(new_session):
+    server = ThreadingHTTPServer(("localhost", 0), KeepAliveHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://localhost:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_share_session_in_the_process(new_session):
+    session = get_session()
+
+    assert get_session() is session
+    assert session.headers["User-Agent"] == "Maria Quitéria"
+    assert isinstance(
+        session.get_adapter("https://www.feiradesantana.ba.gov.br"), PooledHTTPAdapter
+    )
+
+
+def test_reuse_connections_to_the_same_host(server):
+    for _ in range(3):
+        response = get_session().get(f"{server}/arquivo.pdf")
+        assert response.content == b"ok"
+
+    stats = pool_stats()
+
+    assert len(stats) == 1
+    host_stats = list(stats.values())[0]
+    assert host_stats == {"requests": 3, "hits": 2, "misses": 1}
+
+
+def test_pool_stats_without_session(new_session):
+    assert pool_stats() == {}
+
+
+def test_log_pool_stats_after_tasks(server, caplog):
+    get_session().get(f"{server}/arquivo.pdf")
+
+    with caplog.at_level("DEBUG"):
+        log_pool_stats(task_id="1")
+
+    assert "1 requisições, 0 conexões reaproveitadas, 1 abertas" in caplog.text
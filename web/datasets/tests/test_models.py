@@ -1,4 +1,5 @@
 from datetime import date, datetime, timedelta
+from decimal import Decimal
 
 import pytest
 from django.utils.timezone import make_aware
@@ -10,9 +11,12 @@ from web.datasets.models import (
     CityCouncilBid,
     CityCouncilContract,
     CityCouncilExpense,
+    CityCouncilExpenseSummary,
     CityCouncilMinute,
     CityCouncilRevenue,
+    CityCouncilRevenueSummary,
     CityHallBid,
+    File,
     Gazette,
 )
 
@@ -78,7 +82,9 @@ class TestCityCouncilAttendanceList:
 
         assert attendance_list.status == "falta_justificada"
         assert attendance_list.history.count() == 2
-        assert attendance_list.history.earliest().status == "presente"
+        assert attendance_list.history.latest().changes == {
+            "status": ["presente", "falta_justificada"]
+        }
 
     def test_save_should_create_historical_data_bulk_save(self):
         attendance_lists = [
@@ -270,3 +276,109 @@ class TestCityHallBid:
         assert bids.first().session_at == newer_datetime
         assert bids[1].session_at == older_datetime
         assert bids.last().session_at is None
+
+
+@pytest.mark.django_db
+class TestFile:
+    def test_defer_content_and_search_vector_by_default(self, mock_backup_file):
+        gazette = baker.make_recipe("datasets.Gazette")
+        baker.make_recipe("datasets.File", content_object=gazette, content="texto")
+
+        a_file = gazette.files.get()
+
+        assert a_file.get_deferred_fields() == {"content", "search_vector"}
+        assert a_file.content == "texto"
+
+    def test_with_content(self, mock_backup_file):
+        baker.make_recipe("datasets.File", content="texto")
+
+        a_file = File.objects.with_content().get()
+
+        assert not a_file.get_deferred_fields()
+        assert a_file.content == "texto"
+
+
+@pytest.mark.django_db
+class TestCityCouncilExpenseSummary:
+    def make_expense(self, day, value, **kwargs):
+        kwargs.setdefault("excluded", False)
+        return baker.make_recipe(
+            "datasets.CityCouncilExpense",
+            date=day,
+            value=Decimal(value),
+            phase="pagamento",
+            company_or_person="Fulano",
+            document="123",
+            function="01 - LEGISLATIVA",
+            modality="isento",
+            **kwargs,
+        )
+
+    def test_refresh_sums_the_pending_months(self):
+        self.make_expense(date(2020, 1, 10), "10.50")
+        self.make_expense(date(2020, 1, 20), "4.50")
+        self.make_expense(date(2020, 1, 25), "100.00", excluded=True)
+        self.make_expense(date(2020, 2, 1), "7.00")
+
+        assert CityCouncilExpenseSummary.refresh() == 2
+
+        summaries = CityCouncilExpenseSummary.objects.order_by("month")
+        assert [(s.month, s.total, s.count) for s in summaries] == [
+            (date(2020, 1, 1), Decimal("15.00"), 2),
+            (date(2020, 2, 1), Decimal("7.00"), 1),
+        ]
+        assert summaries[0].company_or_person == "Fulano"
+        assert CityCouncilExpenseSummary.refresh() == 0
+
+    def test_refresh_only_the_changed_months(self):
+        expense = self.make_expense(date(2020, 1, 10), "10.00")
+        self.make_expense(date(2020, 2, 10), "5.00")
+        CityCouncilExpenseSummary.refresh()
+
+        expense.date = date(2020, 2, 20)
+        expense.save()
+        assert CityCouncilExpenseSummary.refresh() == 2
+
+        summary = CityCouncilExpenseSummary.objects.get()
+        assert summary.month == date(2020, 2, 1)
+        assert summary.total == Decimal("15.00")
+        assert summary.count == 2
+
+    def test_refresh_after_bulk_exclusion_and_deletion(self):
+        expense = self.make_expense(date(2020, 1, 10), "10.00")
+        self.make_expense(date(2020, 1, 11), "5.00")
+        CityCouncilExpenseSummary.refresh()
+
+        CityCouncilExpense.objects.filter(pk=expense.pk).update(excluded=True)
+        CityCouncilExpenseSummary.refresh()
+        assert CityCouncilExpenseSummary.objects.get().total == Decimal("5.00")
+
+        CityCouncilExpense.objects.all().delete()
+        CityCouncilExpenseSummary.refresh()
+        assert not CityCouncilExpenseSummary.objects.exists()
+
+
+@pytest.mark.django_db
+class TestCityCouncilRevenueSummary:
+    def test_revenues_without_publication_date(self):
+        baker.make_recipe(
+            "datasets.CityCouncilRevenue",
+            published_at=None,
+            revenue_type="orcamentaria",
+            value=Decimal("3.00"),
+            excluded=False,
+            _quantity=2,
+        )
+        baker.make_recipe(
+            "datasets.CityCouncilRevenue",
+            published_at=date(2020, 3, 3),
+            revenue_type="orcamentaria",
+            value=Decimal("1.00"),
+            excluded=False,
+        )
+
+        assert CityCouncilRevenueSummary.refresh() == 2
+        assert CityCouncilRevenueSummary.refresh() == 0
+
+        totals = {s.month: s.total for s in CityCouncilRevenueSummary.objects.all()}
+        assert totals == {None: Decimal("6.00"), date(2020, 3, 1): Decimal("1.00")}
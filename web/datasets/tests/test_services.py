@@ -1,9 +1,11 @@
+import hashlib
+import io
 import os
 from pathlib import Path
 
 from django.conf import settings
 
-from web.datasets.services import get_s3_client
+from web.datasets.services import ChecksumReader, get_s3_client
 
 client = get_s3_client(settings)
 
@@ -11,7 +13,7 @@ client = get_s3_client(settings)
 class TestS3Client:
     def test_upload_file(self):
         relative_path = "TestModel/2020/10/23/"
-        s3_url, bucket_file_path = client.upload_file(
+        s3_url, bucket_file_path, _ = client.upload_file(
             "https://www.google.com/robots.txt", relative_path
         )
 
@@ -70,7 +72,7 @@ class TestS3Client:
 
     def test_download_file(self):
         relative_path = "TestModel/2020/10/23/"
-        s3_url, relative_file_path = client.upload_file(
+        s3_url, relative_file_path, _ = client.upload_file(
             "https://www.google.com/robots.txt", relative_path
         )
 
@@ -90,11 +92,51 @@ class TestS3Client:
         local_path = Path("conteudo.txt")
         local_path.write_text("Testando")
         relative_path = "TestModel/2021/06/23/"
-        s3_url, bucket_file_path = client.upload_file(str(local_path), relative_path)
+        s3_url, bucket_file_path, checksum = client.upload_file(
+            str(local_path), relative_path
+        )
 
         expected_file_path = f"maria-quiteria-local/files/{relative_path}conteudo.txt"
         expected_s3_url = f"https://teste.s3.brasil.amazonaws.com/{bucket_file_path}"
 
         assert s3_url == expected_s3_url
         assert bucket_file_path == expected_file_path
+        assert checksum == hashlib.sha256(b"Testando").hexdigest()
         assert Path(local_path).exists() is False
+
+    def test_upload_file_streaming_from_url(self, mocker):
+        session = mocker.patch("web.datasets.services.get_session").return_value
+        response = session.get.return_value
+        response.__enter__.return_value.raw = io.BytesIO(b"%PDF-1.4 diario oficial")
+        relative_path = "gazette/2021/06/23/"
+
+        uploaded = client.upload_file(
+            "http://www.feiradesantana.ba.gov.br/diario.pdf", relative_path
+        )
+
+        assert uploaded.file_path == (
+            f"maria-quiteria-local/files/{relative_path}diario.pdf"
+        )
+        assert uploaded.checksum == (
+            hashlib.sha256(b"%PDF-1.4 diario oficial").hexdigest()
+        )
+        assert Path(f"{os.getcwd()}/data/tmp/{relative_path}").exists() is False
+
+
+def test_fake_client_opens_the_local_copy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    local_path = tmp_path / "data/tmp/mq/arquivo.pdf"
+    local_path.parent.mkdir(parents=True)
+    local_path.write_bytes(b"%PDF-1.4")
+
+    with client.open_file("mq/arquivo.pdf") as body:
+        assert body.read() == b"%PDF-1.4"
+    assert client.open_file("mq/outro.pdf") is None
+
+
+def test_checksum_reader():
+    reader = ChecksumReader(io.BytesIO(b"quarenta e dois"))
+
+    assert reader.read(8) == b"quarenta"
+    assert reader.read() == b" e dois"
+    assert reader.checksum == hashlib.sha256(b"quarenta e dois").hexdigest()
@@ -1,5 +1,8 @@
+import hashlib
+import io
 import json
 from datetime import date, datetime, timedelta
+from itertools import cycle
 from unittest.mock import Mock
 
 import pytest
@@ -11,26 +14,36 @@ from web.datasets.models import (
     CityCouncilBid,
     CityCouncilContract,
     CityCouncilExpense,
+    CityCouncilExpenseSummary,
     CityCouncilRevenue,
     SyncInformation,
 )
 from web.datasets.tasks import (
     WebserviceException,
     add_citycouncil_bid,
+    add_citycouncil_bid_batch,
     add_citycouncil_contract,
     add_citycouncil_expense,
+    add_citycouncil_expense_batch,
     add_citycouncil_revenue,
+    add_citycouncil_revenue_batch,
     backup_file,
+    client,
     content_from_file,
     distribute_city_council_objects_to_sync,
+    extract_contents,
+    extract_contents_chunk,
     get_city_council_updates,
     notify_about_retrieved_city_council_data,
+    refresh_summaries,
     remove_citycouncil_bid,
     remove_citycouncil_contract,
     remove_citycouncil_expense,
     remove_citycouncil_revenue,
     update_citycouncil_bid,
+    update_citycouncil_bid_batch,
     update_citycouncil_contract,
+    update_citycouncil_contract_batch,
     update_citycouncil_expense,
     update_citycouncil_revenue,
 )
@@ -40,9 +53,18 @@ from web.datasets.tasks import (
 def parser(mocker):
     parser_mock = mocker.patch("web.datasets.tasks.parser")
     parser_mock.from_file.return_value = {"content": "quarenta e dois"}
+    parser_mock.from_buffer.return_value = {"content": "quarenta e dois"}
     return parser_mock
 
 
+@pytest.fixture
+def s3_file(mocker):
+    return mocker.patch(
+        "web.datasets.tasks.client.open_file",
+        side_effect=lambda s3_file_path: io.BytesIO(b"%PDF-1.4"),
+    )
+
+
 @pytest.fixture
 def path(mocker):
     path_mock = mocker.patch("web.datasets.tasks.Path")
@@ -59,7 +81,7 @@ def mock_notifiers(mocker):
 
 class TestContentFromFile:
     @pytest.mark.django_db
-    def test_content_from_file_saved_to_db(self, parser, path):
+    def test_content_from_file_saved_to_db(self, parser, s3_file):
         gazette = baker.make("datasets.Gazette")
         a_file = baker.make(
             "datasets.File",
@@ -75,7 +97,7 @@ class TestContentFromFile:
         result = content_from_file.delay(a_file.pk)
 
         a_file.refresh_from_db()
-        assert parser.from_file.called
+        assert parser.from_buffer.called
         assert a_file.content == "quarenta e dois"
         assert result.get() == "quarenta e dois"
 
@@ -86,9 +108,9 @@ class TestContentFromFile:
         assert parser.from_file.called
 
     @pytest.mark.django_db
-    def test_save_empty_string_when_nothing_is_parsed(self, mocker, path):
+    def test_save_empty_string_when_nothing_is_parsed(self, mocker, s3_file):
         parser_mock = mocker.patch("web.datasets.tasks.parser")
-        parser_mock.from_file.return_value = {
+        parser_mock.from_buffer.return_value = {
             "content": None
         }  # casos onde o pdf é uma imagem
         gazette = baker.make("datasets.Gazette")
@@ -106,10 +128,126 @@ class TestContentFromFile:
         result = content_from_file.delay(a_file.pk)
         a_file.refresh_from_db()
 
-        assert parser_mock.from_file.called
+        assert parser_mock.from_buffer.called
         assert result.get() == ""
         assert a_file.content == ""
 
+    @pytest.mark.django_db
+    def test_skip_files_not_found(self, parser):
+        a_file = baker.make(
+            "datasets.File",
+            url="https://url.com",
+            content_object=baker.make("datasets.Gazette"),
+            s3_file_path="mq/arquivo-que-nao-existe.pdf",
+            content=None,
+        )
+
+        assert content_from_file.delay(a_file.pk).get() is None
+
+        a_file.refresh_from_db()
+        assert parser.from_buffer.called is False
+        assert a_file.content is None
+
+
+@pytest.mark.django_db
+class TestExtractContents:
+    def make_files(self, quantity, **kwargs):
+        gazette = baker.make("datasets.Gazette")
+        return [
+            baker.make(
+                "datasets.File",
+                content_object=gazette,
+                s3_file_path=f"mq/arquivo-{index}.pdf",
+                content=None,
+                **kwargs,
+            )
+            for index in range(quantity)
+        ]
+
+    def test_extract_contents_chunk(
+        self, parser, path, settings, mock_backup_file, s3_file
+    ):
+        settings.TIKA_SERVER_ENDPOINTS = ["http://tika-1:9998", "http://tika-2:9998"]
+        files = self.make_files(3)
+        already_extracted = self.make_files(1)[0]
+        already_extracted.content = "conteúdo"
+        already_extracted.save()
+
+        last_pk, extracted = extract_contents_chunk(chunk_size=2, workers=2)
+
+        assert last_pk == files[1].pk
+        assert extracted == 2
+        endpoints = {
+            call.kwargs["serverEndpoint"] for call in parser.from_buffer.call_args_list
+        }
+        assert endpoints == {"http://tika-1:9998", "http://tika-2:9998"}
+        for a_file in files[:2]:
+            a_file.refresh_from_db()
+            assert a_file.content == "quarenta e dois"
+        files[2].refresh_from_db()
+        assert files[2].content is None
+
+    def test_keep_content_empty_when_extraction_fails(
+        self, parser, mock_backup_file, s3_file
+    ):
+        parser.from_buffer.side_effect = [
+            Exception("Tika fora do ar"),
+            {"content": "ok"},
+        ]
+        files = self.make_files(2)
+
+        last_pk, extracted = extract_contents_chunk(workers=1)
+
+        assert last_pk == files[1].pk
+        assert extracted == 1
+        files[0].refresh_from_db()
+        assert files[0].content is None
+
+    def test_reuse_content_of_files_with_the_same_checksum(
+        self, parser, mock_backup_file, s3_file
+    ):
+        extracted_file = self.make_files(1, checksum="abc")[0]
+        extracted_file.content = "conteúdo conhecido"
+        extracted_file.save()
+        same_file, new_file, same_new_file = self.make_files(1, checksum="abc") + (
+            self.make_files(2, checksum="def")
+        )
+
+        _, extracted = extract_contents_chunk()
+
+        assert extracted == 3
+        assert parser.from_buffer.call_count == 1
+        same_file.refresh_from_db()
+        assert same_file.content == "conteúdo conhecido"
+        for a_file in (new_file, same_new_file):
+            a_file.refresh_from_db()
+            assert a_file.content == "quarenta e dois"
+
+    def test_return_none_when_there_is_nothing_to_extract(self):
+        assert extract_contents_chunk() is None
+
+    def test_extract_contents_in_chunks(self, parser, mock_backup_file, s3_file):
+        files = self.make_files(3)
+
+        extract_contents.delay(chunk_size=2)
+
+        assert parser.from_buffer.call_count == 3
+        for a_file in files:
+            a_file.refresh_from_db()
+            assert a_file.content == "quarenta e dois"
+
+
+@pytest.fixture
+def remote_file(mocker):
+    def respond(*args, **kwargs):
+        response = mocker.MagicMock()
+        response.__enter__.return_value.raw = io.BytesIO(b"%PDF-1.4 diario")
+        return response
+
+    session = mocker.patch("web.datasets.services.get_session").return_value
+    session.get.side_effect = respond
+    return session
+
 
 @pytest.mark.django_db
 class TestBackupFile:
@@ -119,21 +257,66 @@ class TestBackupFile:
         a_file = baker.make(
             "datasets.File", url=url, content_object=gazette, checksum="random"
         )
+
+        backup_file.delay(a_file.pk)
+
+        a_file.refresh_from_db()
         expected_s3_file_path = (
-            f"maria-quiteria-local/files/gazette/"
-            f"{a_file.created_at.year}/{a_file.created_at.month}/"
-            f"{a_file.created_at.day}/random-fake_file.pdf"
+            f"maria-quiteria-local/files/sha256/{a_file.checksum}.pdf"
         )
         expected_s3_url = (
             f"https://teste.s3.brasil.amazonaws.com/{expected_s3_file_path}"
         )
 
-        backup_file.delay(a_file.pk)
+        assert a_file.s3_url == expected_s3_url
+        assert a_file.s3_file_path == expected_s3_file_path
+
+    def test_store_file_by_checksum(self, remote_file, mock_backup_file):
+        gazette = baker.make("datasets.Gazette")
+        a_file = baker.make(
+            "datasets.File", url="https://url.com/diario.PDF", content_object=gazette
+        )
+
+        s3_url = backup_file(a_file.pk)
 
         a_file.refresh_from_db()
+        checksum = hashlib.sha256(b"%PDF-1.4 diario").hexdigest()
+        assert a_file.checksum == checksum
+        assert (
+            a_file.s3_file_path == f"maria-quiteria-local/files/sha256/{checksum}.pdf"
+        )
+        assert a_file.s3_url == s3_url
 
-        assert a_file.s3_url == expected_s3_url
-        assert a_file.s3_file_path == expected_s3_file_path
+    def test_reuse_backup_and_content_of_the_same_file(
+        self, mocker, remote_file, mock_backup_file
+    ):
+        checksum = hashlib.sha256(b"%PDF-1.4 diario").hexdigest()
+        existing_file = baker.make(
+            "datasets.File",
+            url="https://url.com/diario.pdf",
+            content_object=baker.make("datasets.Gazette"),
+            checksum=checksum,
+            s3_url="https://teste.s3.brasil.amazonaws.com/diario.pdf",
+            s3_file_path="maria-quiteria-local/files/diario.pdf",
+            content="quarenta e dois",
+        )
+        a_file = baker.make(
+            "datasets.File",
+            url="https://url.com/diario-republicado.pdf",
+            content_object=baker.make("datasets.CityHallBid"),
+        )
+        move_file = mocker.spy(client, "move_file")
+        delete_file = mocker.spy(client, "delete_file")
+
+        backup_file(a_file.pk)
+
+        a_file.refresh_from_db()
+        assert a_file.checksum == checksum
+        assert a_file.s3_url == existing_file.s3_url
+        assert a_file.s3_file_path == existing_file.s3_file_path
+        assert a_file.content == "quarenta e dois"
+        assert move_file.called is False
+        assert delete_file.called is True
 
     def test_return_none_when_file_does_not_exist(self):
         result = backup_file.delay(9)
@@ -178,7 +361,7 @@ class TestGetCityCouncilUpdates:
             "alteracoesDespesa": [],
             "exclusoesDespesa": [],
         }
-        post_mock = mocker.patch("web.datasets.tasks.requests.get")
+        post_mock = mocker.patch("web.datasets.tasks.get_session").return_value.get
         post_mock.return_value.status_code = 200
         post_mock.return_value.json.return_value = expected_payload
         yesterday = date.today() - timedelta(days=1)
@@ -200,7 +383,7 @@ class TestGetCityCouncilUpdates:
         self, mocker, mock_notifiers
     ):
         expected_payload = {"erro": "Os parametros enviados são inválidos."}
-        post_mock = mocker.patch("web.datasets.tasks.requests.get")
+        post_mock = mocker.patch("web.datasets.tasks.get_session").return_value.get
         post_mock.return_value.json.return_value = expected_payload
         tomorrow = date.today() + timedelta(days=1)
 
@@ -217,7 +400,7 @@ class TestGetCityCouncilUpdates:
         assert sync_info.response == expected_payload
 
     def test_raise_exception_if_request_is_not_successful(self, mocker):
-        post_mock = mocker.patch("web.datasets.tasks.requests.get")
+        post_mock = mocker.patch("web.datasets.tasks.get_session").return_value.get
         post_mock.return_value.raise_for_status.side_effect = HTTPError()
         yesterday = date.today() - timedelta(days=1)
 
@@ -254,14 +437,28 @@ class TestDistributeCityCouncilObjectsToSync:
             "alteracoesDespesa": [],
             "exclusoesDespesa": [],
         }
-        task = mocker.patch("web.datasets.tasks.update_citycouncil_bid.delay")
+        task = mocker.patch("web.datasets.tasks.update_citycouncil_bid_batch.delay")
         task.return_value.queue_name = "default"
 
         distribute_city_council_objects_to_sync.delay(payload)
 
         assert task.called is True
         assert task.call_count == 1
-        assert task.call_args_list[0][0][0] == record_data
+        assert task.call_args_list[0][0][0] == [record_data]
+
+    def test_distribute_records_in_batches(self, mocker):
+        mocker.patch("web.datasets.tasks.SYNC_BATCH_SIZE", 2)
+        records = [{"codLinha": str(code)} for code in range(5)]
+        task = mocker.patch("web.datasets.tasks.add_citycouncil_revenue_batch.delay")
+
+        distribute_city_council_objects_to_sync.delay({"inclusoesReceita": records})
+
+        assert task.call_count == 3
+        assert [call[0][0] for call in task.call_args_list] == [
+            records[:2],
+            records[2:4],
+            records[4:],
+        ]
 
     def test_do_not_call_task_if_there_is_no_records(self, mocker):
         payload = {
@@ -279,7 +476,7 @@ class TestDistributeCityCouncilObjectsToSync:
             "exclusoesDespesa": [],
         }
 
-        task = mocker.patch("web.datasets.tasks.update_citycouncil_bid.delay")
+        task = mocker.patch("web.datasets.tasks.update_citycouncil_bid_batch.delay")
         task.return_value.queue_name = "default"
 
         distribute_city_council_objects_to_sync.delay(payload)
@@ -828,6 +1025,134 @@ class TestCityCouncilExpense:
             expense.refresh_from_db()
             assert expense.excluded is True
 
+    def test_remove_citycouncil_expense_refreshes_summary(
+        self, django_capture_on_commit_callbacks
+    ):
+        expenses = baker.make_recipe(
+            "datasets.CityCouncilExpense",
+            date=date(2020, 1, 1),
+            phase="pagamento",
+            value=1,
+            excluded=False,
+            external_file_code="1",
+            external_file_line=cycle(["1", "2", "3"]),
+            _quantity=3,
+        )
+        CityCouncilExpenseSummary.refresh()
+        records = [
+            {"codigo": expense.external_file_code, "linha": expense.external_file_line}
+            for expense in expenses[:2]
+        ]
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            remove_citycouncil_expense.delay(records)
+
+        assert refresh_summaries.delay in callbacks
+        summary = CityCouncilExpenseSummary.objects.get()
+        assert summary.count == 1
+        assert summary.total == 1
+
+
+@pytest.mark.django_db
+class TestCityCouncilSyncBatch:
+    def bid_record(self, code, files=None):
+        return {
+            "codLic": code,
+            "codTipoLic": "7",
+            "numLic": f"{code}/2020",
+            "numTipoLic": f"{code}/2020",
+            "objetoLic": "Contratação de pessoa jurídica",
+            "dtLic": "2020-03-26 09:00:00",
+            "arquivos": [
+                {"codLic": code, "caminhoArqLic": f"upload/licitacao/{name}"}
+                for name in files or []
+            ],
+        }
+
+    def test_add_citycouncil_bid_batch(self, mock_backup_file):
+        baker.make_recipe("datasets.CityCouncilBid", external_code="214")
+        records = [
+            self.bid_record("214"),
+            self.bid_record("215", files=["edital.pdf", "anexo.pdf"]),
+            self.bid_record("216"),
+        ]
+
+        bids = add_citycouncil_bid_batch.delay(records).get()
+
+        assert len(bids) == 3
+        assert CityCouncilBid.objects.count() == 3
+        new_bid = CityCouncilBid.objects.get(external_code="215")
+        assert new_bid.crawled_from == settings.CITY_COUNCIL_WEBSERVICE_ENDPOINT
+        assert new_bid.files.count() == 2
+        assert new_bid.history.count() == 1
+
+    def test_update_citycouncil_bid_batch(self, mock_backup_file):
+        bid = baker.make_recipe("datasets.CityCouncilBid", external_code="214")
+        record = self.bid_record("214", files=["publicacao.doc"])
+
+        updated_bid = update_citycouncil_bid_batch.delay([record]).get()[0]
+
+        bid.refresh_from_db()
+        assert updated_bid.pk == bid.pk
+        assert bid.code == record["numLic"]
+        assert bid.description == record["objetoLic"]
+        assert bid.files.count() == 1
+        assert bid.history.count() == 2
+
+    def test_send_missing_records_to_be_updated_individually(self, mocker):
+        baker.make_recipe("datasets.CityCouncilContract", external_code=43)
+        task = mocker.patch("web.datasets.tasks.update_citycouncil_contract.delay")
+        records = [
+            {"codCon": "43", "dsCon": "CONTRATO Nº 004/2014"},
+            {"codCon": "44", "dsCon": "CONTRATO Nº 005/2014"},
+        ]
+
+        contracts = update_citycouncil_contract_batch.delay(records).get()
+
+        assert [contract.external_code for contract in contracts] == [43]
+        assert task.call_count == 1
+        assert task.call_args_list[0][0][0] == records[1]
+
+    def test_retry_records_individually_when_batch_fails(self, mocker):
+        mocker.patch(
+            "web.datasets.tasks.bulk_upsert", side_effect=Exception("Erro no lote")
+        )
+        task = mocker.patch("web.datasets.tasks.add_citycouncil_revenue.delay")
+        records = [{"codLinha": "1"}, {"codLinha": "2"}]
+
+        add_citycouncil_revenue_batch.delay(records)
+
+        assert CityCouncilRevenue.objects.count() == 0
+        assert [call[0][0] for call in task.call_args_list] == records
+
+    def test_retry_only_malformed_records_individually(self, mocker):
+        task = mocker.patch("web.datasets.tasks.add_citycouncil_bid.delay")
+        malformed = {**self.bid_record("215"), "campoDesconhecido": "?"}
+        records = [self.bid_record("214"), malformed, self.bid_record("216")]
+
+        bids = add_citycouncil_bid_batch.delay(records).get()
+
+        assert sorted(bid.external_code for bid in bids) == ["214", "216"]
+        assert [call[0][0] for call in task.call_args_list] == [malformed]
+
+    def test_add_citycouncil_expense_batch(self):
+        record = {
+            "codArquivo": "253",
+            "codEtapa": "EMP",
+            "codLinha": "2",
+            "dtPublicacao": "2/1/2014",
+            "dtRegistro": "2/1/2014",
+            "excluido": "N",
+            "nmCredor": "VEREADORES      ",
+            "numProcadm": "001/2014      ",
+            "valor": "3790000,00",
+        }
+        another_record = {**record, "codLinha": "3"}
+
+        add_citycouncil_expense_batch.delay([record, another_record, record])
+
+        assert CityCouncilExpense.objects.count() == 2
+
 
 def test_notify_about_retrieved_city_council_data_when_get_error(mock_notifiers):
     response = {"erro": "Os parametros enviados são inválidos."}